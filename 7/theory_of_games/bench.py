@@ -0,0 +1,245 @@
+"""
+Замеры EGESolver.solve_all без GUI (Qt не импортируется).
+
+Набор случаев — пресеты из окна и синтетические семейства:
+  preset/*   — задачи №24115 и №18064;
+  target/*   — растущий порог при одинаковых правилах;
+  range/*    — растущий диапазон S;
+  heaps/*    — одни и те же правила на одной и на двух кучах;
+  rules/*    — только сдвиги, много умножений, деления.
+Каждый случай решается каждым из методов (--method, по умолчанию все доступные).
+
+Для случая записываются:
+  time — медиана времени solve_all по --repeat запускам (с нуля, новый решатель);
+  expanded, positions — из EGESolver.stats();
+  peak_bytes — пик памяти по tracemalloc (отдельный запуск: трассировка замедляет счёт);
+  counts — сколько S в ответах 19/20/21 (сверка: ускорение не должно менять ответы).
+
+Примеры:
+  python bench.py run -o baseline.json
+  python bench.py run -o current.json --filter target/ --repeat 5
+  python bench.py compare baseline.json current.json --time-tol 0.15
+  python bench.py compare baseline.json            # текущие замеры считаются заново
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from core.rules import GameRules
+from core.solver import EGESolver, METHODS, np
+
+Case = Dict[str, Any]
+
+FORMAT_VERSION = 1
+
+# Разница меньше этих значений не считается регрессией (шум таймера и аллокатора)
+MIN_TIME_DELTA = 0.005
+MIN_BYTES_DELTA = 256 * 1024
+
+
+def _case(name: str, rules: Dict[str, Any], start_template: Sequence[Optional[int]],
+          s_min: int, s_max: int) -> Case:
+    return dict(name=name, rules=rules, start_template=list(start_template), s_min=s_min, s_max=s_max)
+
+
+def default_cases() -> List[Case]:
+    """Случаи по умолчанию (имена стабильны — по ним сравниваются замеры)."""
+    cases = [
+        _case("preset/24115", dict(target_mode="heap", heap_index=0, heaps=1, target=444, finish_cmp="ge",
+                                   adds=[2, 5], mults=[3], divs=[]), [None], 1, 400),
+        _case("preset/18064", dict(target_mode="heap", heap_index=0, heaps=1, target=27, finish_cmp="lt",
+                                   adds=[-4, -3], mults=[], divs=[3]), [None], 27, 200),
+    ]
+    for target in (50, 100, 200, 400):
+        cases.append(_case(f"target/{target}", dict(target_mode="sum", heaps=2, target=target,
+                                                    adds=[1], mults=[2]), [7, None], 1, target - 8))
+    for s_max in (100, 300, 900):
+        cases.append(_case(f"range/{s_max}", dict(target_mode="sum", heaps=1, target=1000,
+                                                  adds=[1, 4], mults=[2]), [None], 1, s_max))
+    one = dict(target_mode="sum", target=120, adds=[1, 2], mults=[2])
+    cases.append(_case("heaps/1", dict(one, heaps=1), [None], 1, 119))
+    cases.append(_case("heaps/2", dict(one, heaps=2), [9, None], 1, 110))
+    cases.append(_case("rules/add-only", dict(target_mode="sum", heaps=2, target=150, adds=[1, 2, 3], mults=[]),
+                       [10, None], 1, 139))
+    cases.append(_case("rules/mul-heavy", dict(target_mode="sum", heaps=2, target=300, adds=[1],
+                                               mults=[2, 3, 4, 5]), [4, None], 1, 295))
+    cases.append(_case("rules/div", dict(target_mode="max", heaps=2, target=20, finish_cmp="lt",
+                                         adds=[-1], mults=[], divs=[2, 3]), [30, None], 20, 120))
+    return cases
+
+
+def available_methods() -> Tuple[str, ...]:
+    return tuple(m for m in METHODS if m != "numpy" or np is not None)
+
+
+def _solver(case: Case, method: str) -> EGESolver:
+    return EGESolver(GameRules(**case["rules"]), tuple(case["start_template"]), case["s_min"], case["s_max"],
+                     method=method)
+
+
+def measure(case: Case, method: str, repeat: int = 3) -> Dict[str, Any]:
+    """Замеры одного случая одним методом (или {"error": ...}, если метод к случаю неприменим)."""
+    try:
+        times = []
+        for _ in range(max(1, repeat)):
+            solver = _solver(case, method)
+            t0 = time.perf_counter()
+            results = solver.solve_all()
+            times.append(time.perf_counter() - t0)
+        stats = solver.stats()
+
+        tracemalloc.start()
+        try:
+            _solver(case, method).solve_all()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    except (ValueError, RuntimeError) as e:
+        return {"error": str(e)}
+    return dict(
+        time=round(statistics.median(times), 6),
+        time_min=round(min(times), 6),
+        expanded=stats["expanded"],
+        positions=stats["positions"],
+        peak_bytes=peak,
+        counts=[len(r) for r in results],
+    )
+
+
+def run(cases: Sequence[Case], methods: Sequence[str], repeat: int = 3, log=None) -> Dict[str, Any]:
+    """Прогнать все случаи; результат — словарь для JSON (ключ замера — 'имя случая:метод')."""
+    results: Dict[str, Any] = {}
+    for case in cases:
+        for method in methods:
+            key = f"{case['name']}:{method}"
+            res = measure(case, method, repeat)
+            results[key] = dict(res, case=case["name"], method=method)
+            if log:
+                if "error" in res:
+                    log.write(f"{key:32} ошибка: {res['error']}\n")
+                else:
+                    log.write(f"{key:32} {res['time'] * 1000:9.1f} мс  раскрыто {res['expanded']:>8}  "
+                              f"пик {res['peak_bytes'] / 1024 / 1024:7.2f} МБ\n")
+                log.flush()
+    return dict(
+        version=FORMAT_VERSION,
+        created=time.strftime("%Y-%m-%d %H:%M:%S"),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        numpy=None if np is None else np.__version__,
+        repeat=repeat,
+        cases={c["name"]: c for c in cases},
+        results=results,
+    )
+
+
+def compare(base: Dict[str, Any], cur: Dict[str, Any], time_tol: float = 0.25, mem_tol: float = 0.25,
+            expanded_tol: float = 0.0) -> List[Dict[str, Any]]:
+    """
+    Сравнить замеры с базовыми. Возвращает строки отчёта {key, metric, base, current, ratio, regression}
+    по всем общим ключам. Регрессия — рост больше допуска (и больше MIN_*_DELTA для времени и памяти),
+    а также изменившиеся ответы или ошибка там, где раньше её не было.
+    """
+    rows: List[Dict[str, Any]] = []
+    for key in sorted(set(base["results"]) & set(cur["results"])):
+        b, c = base["results"][key], cur["results"][key]
+        if "error" in c or "error" in b:
+            if "error" in c and "error" not in b:
+                rows.append(dict(key=key, metric="error", base=None, current=c["error"], ratio=None,
+                                 regression=True))
+            continue
+        if b["counts"] != c["counts"]:
+            rows.append(dict(key=key, metric="counts", base=b["counts"], current=c["counts"], ratio=None,
+                             regression=True))
+        for metric, tol, min_delta in (("time", time_tol, MIN_TIME_DELTA),
+                                       ("peak_bytes", mem_tol, MIN_BYTES_DELTA),
+                                       ("expanded", expanded_tol, 0)):
+            bv, cv = b[metric], c[metric]
+            ratio = cv / bv if bv else None
+            worse = cv > bv * (1 + tol) and cv - bv > min_delta
+            rows.append(dict(key=key, metric=metric, base=bv, current=cv, ratio=ratio, regression=worse))
+    return rows
+
+
+def _fmt(metric: str, value: Any) -> str:
+    if metric == "time":
+        return f"{value * 1000:.1f} мс"
+    if metric == "peak_bytes":
+        return f"{value / 1024 / 1024:.2f} МБ"
+    return str(value)
+
+
+def _select(cases: List[Case], patterns: Optional[List[str]]) -> List[Case]:
+    if not patterns:
+        return cases
+    return [c for c in cases if any(p in c["name"] for p in patterns)]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Замеры решателя задач 19–21 (без GUI).")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    def add_run_args(p: argparse.ArgumentParser):
+        p.add_argument("--method", action="append", choices=METHODS,
+                       help="метод (можно несколько раз; по умолчанию все доступные)")
+        p.add_argument("--filter", action="append", metavar="TEXT",
+                       help="только случаи, в имени которых есть TEXT (можно несколько раз)")
+        p.add_argument("--repeat", type=int, default=3, help="запусков на замер времени (берётся медиана)")
+
+    p_run = sub.add_parser("run", help="прогнать набор и записать замеры в JSON")
+    p_run.add_argument("-o", "--output", default="-", help="куда писать JSON (по умолчанию stdout)")
+    add_run_args(p_run)
+
+    p_cmp = sub.add_parser("compare", help="сравнить замеры с базовыми; код выхода 1 при регрессии")
+    p_cmp.add_argument("baseline", help="базовый JSON (из bench.py run)")
+    p_cmp.add_argument("current", nargs="?", help="текущий JSON; без него набор прогоняется заново")
+    p_cmp.add_argument("--time-tol", type=float, default=0.25, help="допустимый рост времени (доля)")
+    p_cmp.add_argument("--mem-tol", type=float, default=0.25, help="допустимый рост пика памяти (доля)")
+    p_cmp.add_argument("--expanded-tol", type=float, default=0.0, help="допустимый рост числа раскрытий (доля)")
+    p_cmp.add_argument("--all", action="store_true", help="печатать все метрики, а не только регрессии")
+    add_run_args(p_cmp)
+    args = ap.parse_args(argv)
+
+    if args.command == "run":
+        report = run(_select(default_cases(), args.filter), args.method or available_methods(), args.repeat,
+                     log=sys.stderr)
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if args.output == "-":
+            print(text)
+        else:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        base = json.load(f)
+    if args.current:
+        with open(args.current, encoding="utf-8") as f:
+            cur = json.load(f)
+    else:
+        # Те же случаи, что в базе (по сохранённым описаниям), — набор по умолчанию мог измениться
+        cases = _select(list(base["cases"].values()), args.filter)
+        methods = args.method or sorted({r["method"] for r in base["results"].values()})
+        cur = run(cases, [m for m in methods if m in available_methods()], args.repeat, log=sys.stderr)
+
+    rows = compare(base, cur, args.time_tol, args.mem_tol, args.expanded_tol)
+    bad = [r for r in rows if r["regression"]]
+    for r in rows if args.all else bad:
+        ratio = f"x{r['ratio']:.2f}" if r["ratio"] is not None else ""
+        mark = "РЕГРЕССИЯ" if r["regression"] else "ok"
+        print(f"{mark:9} {r['key']:32} {r['metric']:10} {_fmt(r['metric'], r['base']):>12} -> "
+              f"{_fmt(r['metric'], r['current']):>12} {ratio}")
+    missing = sorted(set(base["results"]) - set(cur["results"]))
+    if missing and not (args.filter or args.method):
+        print(f"Нет текущих замеров для: {', '.join(missing)}", file=sys.stderr)
+    print(f"Сравнено замеров: {len({r['key'] for r in rows})}, регрессий: {len(bad)}", file=sys.stderr)
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Пакетный расчёт задач 19–21 без GUI (Qt не импортируется).
+
+Вход — JSONL (по объекту на строку) или CSV с разделителем ';' (как у экспорта CSV из окна).
+Поля строки:
+  target_mode, target, finish_cmp, heap_index, adds, mults, divs, heaps — как в GameRules;
+  start_template — например [null] или [5, null] (в CSV: "S" или "5,S");
+  s_min, s_max — диапазон S; необязательные: id, method.
+В CSV списки adds/mults/divs пишутся через запятую: "2,5".
+
+Выход — JSONL, по строке на каждую входную строку, в том же порядке:
+  {"id": ..., "rules": {...}, "start_template": [...], "s_min": .., "s_max": ..,
+   "task19": [...], "task20": [...], "task21": [...], "elapsed": ..}
+  или {"id": ..., "error": "..."} для некорректной строки.
+
+Примеры:
+  python cli.py variants.jsonl -o answers.jsonl --jobs 4
+  python cli.py variants.csv --method numpy --cache
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.parallel import mp_context
+from core.rules import GameRules
+from core.solver import EGESolver, METHODS
+
+RULE_FIELDS = ("target_mode", "target", "finish_cmp", "heap_index", "adds", "mults", "divs", "heaps")
+
+# Ключ строки-заглушки, которую read_rows отдаёт вместо нечитаемой строки JSONL
+BAD_ROW = "__bad_row__"
+
+
+def _int_list(raw: Any) -> List[int]:
+    if isinstance(raw, list):
+        return [int(x) for x in raw]
+    return [int(x) for x in str(raw or "").replace(";", ",").split(",") if x.strip()]
+
+
+def _template(raw: Any) -> Tuple[Optional[int], ...]:
+    if isinstance(raw, list):
+        return tuple(None if x is None else int(x) for x in raw)
+    parts = [x.strip() for x in str(raw).split(",")]
+    return tuple(None if x.upper() == "S" else int(x) for x in parts)
+
+
+def parse_row(row: Dict[str, Any]) -> Tuple[GameRules, Tuple[Optional[int], ...], int, int]:
+    """Строка входа (JSON-объект или строка CSV) -> правила, шаблон старта, диапазон S."""
+    heaps = int(row.get("heaps") or 2)
+    heap_index = row.get("heap_index")
+    rules = GameRules(
+        target_mode=row.get("target_mode") or "sum",
+        target=int(row["target"]),
+        finish_cmp=row.get("finish_cmp") or "ge",
+        heap_index=None if heap_index in (None, "") else int(heap_index),
+        adds=_int_list(row.get("adds")),
+        mults=_int_list(row.get("mults")),
+        divs=_int_list(row.get("divs")),
+        heaps=heaps,
+    )
+    raw_tmpl = row.get("start_template")
+    tmpl = _template(raw_tmpl) if raw_tmpl not in (None, "") else (None,) if heaps == 1 else (0, None)
+    return rules, tmpl, int(row["s_min"]), int(row["s_max"])
+
+
+def read_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Строки JSONL или CSV (по расширению файла; '-' — JSONL из stdin).
+    Вместо строки, которая не разбирается как JSON-объект, отдаётся {BAD_ROW: причина} —
+    solve_row превращает её в строку с ошибкой, остальные строки решаются как обычно.
+    """
+    if path != "-" and path.lower().endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f, delimiter=";"):
+                yield row
+        return
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {BAD_ROW: f"некорректный JSON: {e}"}
+                continue
+            yield row if isinstance(row, dict) else {BAD_ROW: "строка должна быть JSON-объектом"}
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def solve_row(job: Tuple[int, Dict[str, Any], str, Optional[str]]) -> Dict[str, Any]:
+    """Решить одну строку. Функция верхнего уровня — выполняется и в процессах пула."""
+    line_no, row, default_method, cache_path = job
+    if BAD_ROW in row:
+        return {"id": line_no, "error": row[BAD_ROW]}
+    out: Dict[str, Any] = {"id": row.get("id", line_no)}
+    try:
+        rules, tmpl, s_min, s_max = parse_row(row)
+        method = row.get("method") or default_method
+        t0 = time.perf_counter()
+        cache = None
+        if cache_path is not None:
+            from core.result_cache import ResultCache
+            cache = ResultCache(cache_path or None)
+        found = cache.get(rules, tmpl, s_min, s_max) if cache else None
+        if found is None:
+            found = EGESolver(rules, tmpl, s_min, s_max, method=method).solve_all()
+            if cache:
+                cache.put(rules, tmpl, s_min, s_max, found)
+        s19, s20, s21 = found
+        out.update(
+            rules=rules.to_dict(),
+            start_template=list(tmpl),
+            s_min=min(s_min, s_max),
+            s_max=max(s_min, s_max),
+            method=method,
+            task19=s19,
+            task20=s20,
+            task21=s21,
+            elapsed=round(time.perf_counter() - t0, 6),
+        )
+    except Exception as e:
+        out["error"] = str(e)
+    return out
+
+
+def run(rows: Iterable[Dict[str, Any]], out, method: str = "recursive", jobs: int = 1,
+        cache_path: Optional[str] = None) -> int:
+    """Решить все строки и писать JSONL по мере готовности (порядок входа сохраняется). Возвращает число ошибок."""
+    tasks = ((i, row, method, cache_path) for i, row in enumerate(rows, start=1))
+    errors = 0
+    if jobs > 1:
+        pool = ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context())
+        results = pool.map(solve_row, tasks, chunksize=1)
+    else:
+        pool = None
+        results = map(solve_row, tasks)
+    try:
+        for res in results:
+            errors += "error" in res
+            out.write(json.dumps(res, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return errors
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Пакетный расчёт задач 19–21 ЕГЭ (без GUI).")
+    ap.add_argument("input", help="файл JSONL или CSV (';') с наборами правил; '-' — JSONL из stdin")
+    ap.add_argument("-o", "--output", default="-", help="куда писать JSONL (по умолчанию stdout)")
+    ap.add_argument("--method", choices=METHODS, default="recursive", help="метод по умолчанию для строк")
+    ap.add_argument("-j", "--jobs", type=int, default=1,
+                    help=f"число процессов (0 — по числу ядер, сейчас {os.cpu_count()})")
+    ap.add_argument("--cache", nargs="?", const="", default=None, metavar="PATH",
+                    help="использовать постоянный кэш результатов (без PATH — файл по умолчанию)")
+    args = ap.parse_args(argv)
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        errors = run(read_rows(args.input), out, method=args.method, jobs=jobs, cache_path=args.cache)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 from .rules import GameRules
 from .solver import EGESolver
+from .engine import GameEngine, TranspositionTable
 
-__all__ = ["GameRules", "EGESolver"]
+__all__ = ["GameRules", "EGESolver", "GameEngine", "TranspositionTable"]
@@ -0,0 +1,221 @@
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только для method='numpy'
+    np = None
+
+from .actions import Action
+from .game import Game
+
+# Защита от случайного «взрыва» памяти: 50 млн состояний ≈ 1–2 ГБ таблиц
+MAX_STATES = 50_000_000
+
+
+def _apply(act: Action, x):
+    """Action.apply для массивов (и для скаляров)."""
+    if act.kind == "add":
+        return x + act.arg
+    elif act.kind == "mul":
+        return x * act.arg
+    elif act.kind == "div":
+        return x // act.arg
+    raise ValueError(f"Unknown action kind: {act.kind}")
+
+
+class ArrayStateSpace:
+    """
+    Плотная таблица состояний на NumPy для одной или двух куч.
+
+    - Состояния — индексы в прямоугольнике [lo, hi] по каждой куче:
+      одна куча — смещение значения, две кучи — row-major индекс.
+    - succ: матрица int32 (n, heaps * len(actions)) — по столбцу на пару (куча, Action);
+      ход за пределы прямоугольника ведёт в одного из двух «стражей»:
+      n — нетерминальная позиция (значение неизвестно), n + 1 — любая терминальная позиция.
+    - terminal, has_term, win_depth, lose_depth считаются векторно, слоями по k.
+
+    Прямоугольник строится так, чтобы в нём лежали все нетерминальные позиции, достижимые от стартов
+    за horizon = 2 * max_depth + 1 полуходов (терминалы не раскрываются) — как в RetrogradeTable.
+    Терминальные ходы в прямоугольнике не нужны — они сворачиваются в стража n + 1,
+    поэтому для монотонных игр прямоугольник не выходит за порог (ср. core.bounds).
+    """
+
+    def __init__(self, game: Game, starts: Sequence[Tuple[int, ...]], max_depth: int = 2,
+                 max_states: int = MAX_STATES, cancel_cb: Optional[Callable[[], bool]] = None):
+        if np is None:
+            raise RuntimeError("Для method='numpy' нужен пакет numpy (pip install numpy)")
+        if game.rules.heaps > 2:
+            raise ValueError("method='numpy' поддерживает только одну или две кучи")
+        if not starts:
+            raise ValueError("Нужна хотя бы одна стартовая позиция")
+        if max_depth < 1:
+            raise ValueError("max_depth должен быть >= 1")
+        self.game = game
+        self.rules = game.rules
+        self.heaps = self.rules.heaps
+        self.max_depth = max_depth
+        self.horizon = 2 * max_depth + 1
+        self.max_states = max_states
+
+        self.lo: List[int] = [min(st[i] for st in starts) for i in range(self.heaps)]
+        self.hi: List[int] = [max(st[i] for st in starts) for i in range(self.heaps)]
+        self._grow_box(cancel_cb)
+
+        self.n = int(np.prod(self.shape))
+        coords = self._coords()
+        self.terminal = np.zeros(self.n + 2, dtype=bool)
+        self.terminal[:self.n] = self.terminal_mask(coords)
+        self.terminal[self.n + 1] = True
+        self.succ = self._successors(coords)
+        del coords
+        self.has_term = np.zeros(self.n + 2, dtype=bool)
+        self.has_term[:self.n] = self.terminal[self.succ].any(axis=1)
+        self._solve(cancel_cb)
+
+    # ---------- Геометрия ----------
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return tuple(h - l + 1 for l, h in zip(self.lo, self.hi))
+
+    def _check_size(self, shape: Sequence[int]):
+        size = 1
+        for w in shape:
+            size *= w
+        if size > self.max_states:
+            raise ValueError(f"Слишком большое пространство состояний: {size} > {self.max_states}. "
+                             f"Уменьшите порог или диапазон S.")
+
+    def _coords(self) -> List["np.ndarray"]:
+        """Значения куч для каждого индекса (по массиву на кучу)."""
+        self._check_size(self.shape)
+        if self.heaps == 1:
+            return [np.arange(self.lo[0], self.hi[0] + 1, dtype=np.int64)]
+        w1 = self.shape[1]
+        idx = np.arange(self.shape[0] * w1, dtype=np.int64)
+        return [self.lo[0] + idx // w1, self.lo[1] + idx % w1]
+
+    def _grow_box(self, cancel_cb: Optional[Callable[[], bool]]):
+        for ply in range(self.horizon):
+            if cancel_cb and cancel_cb():
+                raise RuntimeError("CANCELLED")
+            coords = self._coords()
+            if ply == 0:
+                # Старты раскрываются всегда (в т.ч. терминальные — для проверки W1)
+                mask = None
+            else:
+                mask = ~self.terminal_mask(coords)
+                if not mask.any():
+                    break
+            if mask is not None:
+                coords = [c[mask] for c in coords]
+            new_lo, new_hi = list(self.lo), list(self.hi)
+            for i in range(self.heaps):
+                for act in self.game.actions:
+                    # Расширяемся только на нетерминальные ходы — терминальные уходят в стража
+                    new = _apply(act, coords[i])
+                    keep = ~self.terminal_mask(coords[:i] + [new] + coords[i + 1:])
+                    if keep.any():
+                        vals = new[keep]
+                        new_lo[i] = min(new_lo[i], int(vals.min()))
+                        new_hi[i] = max(new_hi[i], int(vals.max()))
+            if new_lo == self.lo and new_hi == self.hi:
+                break
+            self._check_size([h - l + 1 for l, h in zip(new_lo, new_hi)])
+            self.lo, self.hi = new_lo, new_hi
+
+    def index(self, state: Tuple[int, ...]) -> int:
+        """Индекс состояния или -1, если оно вне прямоугольника."""
+        idx = 0
+        for i, v in enumerate(state):
+            if not (self.lo[i] <= v <= self.hi[i]):
+                return -1
+            idx = idx * self.shape[i] + (v - self.lo[i])
+        return idx
+
+    def state(self, idx: int) -> Tuple[int, ...]:
+        if self.heaps == 1:
+            return (self.lo[0] + idx,)
+        w1 = self.shape[1]
+        return self.lo[0] + idx // w1, self.lo[1] + idx % w1
+
+    # ---------- Векторные правила ----------
+    def terminal_mask(self, coords: List["np.ndarray"]) -> "np.ndarray":
+        """Game.is_terminal для массивов значений куч."""
+        mode = self.rules.target_mode
+        if mode == "sum":
+            val = coords[0] if self.heaps == 1 else coords[0] + coords[1]
+        elif mode == "max":
+            val = coords[0] if self.heaps == 1 else np.maximum(coords[0], coords[1])
+        elif mode == "heap":
+            idx = self.rules.heap_index
+            assert idx is not None
+            val = coords[idx]
+        else:
+            raise ValueError(f"Unknown target_mode: {mode}")
+        if self.rules.finish_cmp == "ge":
+            return val >= self.rules.target
+        return val < self.rules.target
+
+    def _successors(self, coords: List["np.ndarray"]) -> "np.ndarray":
+        cols = self.heaps * len(self.game.actions)
+        succ = np.empty((self.n, cols), dtype=np.int32)
+        col = 0
+        for i in range(self.heaps):
+            for act in self.game.actions:
+                new = _apply(act, coords[i])
+                inside = (new >= self.lo[i]) & (new <= self.hi[i])
+                if self.heaps == 1:
+                    idx = new - self.lo[0]
+                elif i == 0:
+                    idx = (new - self.lo[0]) * self.shape[1] + (coords[1] - self.lo[1])
+                else:
+                    idx = (coords[0] - self.lo[0]) * self.shape[1] + (new - self.lo[1])
+                outside = np.where(self.terminal_mask(coords[:i] + [new] + coords[i + 1:]), self.n + 1, self.n)
+                succ[:, col] = np.where(inside, idx, outside)
+                col += 1
+        return succ
+
+    # ---------- Глубины ----------
+    def _solve(self, cancel_cb: Optional[Callable[[], bool]]):
+        """
+        Слои W_k / L_k (k — число собственных ходов победителя, как в EGESolver._can_win_in):
+          L_0 = терминал или нет ходов
+          W_k = не терминал и есть ход в L_(k-1)
+          L_k = терминал или все ходы ведут в W_k
+        Страж неизвестных позиций (индекс n) не попадает ни в W, ни в L; терминальный страж (n + 1) — L_0.
+        """
+        n = self.n
+        self.win_depth = np.full(n + 2, -1, dtype=np.int8)
+        self.lose_depth = np.full(n + 2, -1, dtype=np.int8)
+
+        lose = self.terminal.copy()
+        if self.succ.shape[1] == 0:
+            lose[:n] = True
+        self.lose_depth[lose] = 0
+        for k in range(1, self.max_depth + 1):
+            if cancel_cb and cancel_cb():
+                raise RuntimeError("CANCELLED")
+            win = np.zeros(n + 2, dtype=bool)
+            win[:n] = ~self.terminal[:n] & lose[self.succ].any(axis=1)
+            self.win_depth[win & (self.win_depth < 0)] = k
+            lose = self.terminal.copy()
+            lose[:n] |= win[self.succ].all(axis=1)
+            self.lose_depth[lose & (self.lose_depth < 0)] = k
+
+    def approx_bytes(self) -> int:
+        """Память под массивы таблицы."""
+        return sum(a.nbytes for a in (self.terminal, self.succ, self.has_term, self.win_depth, self.lose_depth))
+
+    def iter_depths(self, chunk: int = 1 << 16) -> Iterator[Tuple[Tuple[int, ...], Optional[int], Optional[int]]]:
+        """(позиция, win_depth, lose_depth) для всех ячеек прямоугольника (без стражей), кусками по chunk."""
+        for start in range(0, self.n, chunk):
+            stop = min(start + chunk, self.n)
+            wins = self.win_depth[start:stop].tolist()
+            loses = self.lose_depth[start:stop].tolist()
+            for i, (w, l) in enumerate(zip(wins, loses)):
+                yield self.state(start + i), w if w >= 0 else None, l if l >= 0 else None
+
+    def can_win(self, idx, k: int):
+        """W_k для индекса или массива индексов."""
+        d = self.win_depth[idx]
+        return (d >= 0) & (d <= k)
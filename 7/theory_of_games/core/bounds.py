@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+from .rules import GameRules
+
+State = Tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class StateBounds:
+    """
+    Границы нетерминальных позиций монотонной игры (см. GameRules.monotone_direction).
+
+    - lo, hi: границы каждой кучи, None — без ограничения с этой стороны;
+    - sentinel: одна терминальная позиция, в которую сворачиваются все терминальные ходы
+      (для 'up' с финишем 'ge' — любая позиция за порогом ничем не отличается от другой).
+
+    Любой ход из нетерминальной позиции внутри границ ведёт либо внутрь границ, либо в терминал.
+    """
+    direction: str
+    lo: Tuple[Optional[int], ...]
+    hi: Tuple[Optional[int], ...]
+    sentinel: State
+
+    def contains(self, state: State) -> bool:
+        for v, lo, hi in zip(state, self.lo, self.hi):
+            if (lo is not None and v < lo) or (hi is not None and v > hi):
+                return False
+        return True
+
+    def size(self) -> Optional[int]:
+        """Число позиций в прямоугольнике границ или None, если он бесконечен."""
+        size = 1
+        for lo, hi in zip(self.lo, self.hi):
+            if lo is None or hi is None:
+                return None
+            size *= max(0, hi - lo + 1)
+        return size
+
+
+def _sentinel(rules: GameRules) -> State:
+    """Терминальная позиция: нужное значение в одной куче (последней или heap_index), остальные — 0."""
+    val = rules.target if rules.finish_cmp == "ge" else rules.target - 1
+    idx = rules.heap_index if rules.target_mode == "heap" else rules.heaps - 1
+    st = [0] * rules.heaps
+    st[idx] = val
+    return tuple(st)
+
+
+def derive_bounds(rules: GameRules, starts: Sequence[State], symmetric: bool = False) -> Optional[StateBounds]:
+    """
+    Границы для партий из позиций starts или None, если игра не монотонна на этих позициях.
+
+    'up' (финиш 'ge'): кучи не убывают, поэтому lo — минимум стартов, а hi следует из того,
+    что нетерминальная позиция ещё не дошла до порога:
+      sum: hi_i = target - 1 - сумма lo остальных куч; max: hi_i = target - 1; heap: только у heap_index.
+    'down' (финиш 'lt') — зеркально: hi — максимум стартов, lo — из условия «ещё не ниже порога».
+    Умножение растит, а деление уменьшает только неотрицательные кучи — это проверяется
+    по получившимся границам (и по самим стартам: из терминального старта тоже ходят).
+
+    symmetric — позиции будут канонизироваться (Game.canonical), кучи переставляются, поэтому
+    границы берутся одинаковыми для всех куч.
+    """
+    direction = rules.monotone_direction()
+    if direction is None or not starts:
+        return None
+    n = rules.heaps
+    t = rules.target
+    start_lo = [min(st[i] for st in starts) for i in range(n)]
+    start_hi = [max(st[i] for st in starts) for i in range(n)]
+    if symmetric:
+        start_lo = [min(start_lo)] * n
+        start_hi = [max(start_hi)] * n
+    lo: list = [None] * n
+    hi: list = [None] * n
+
+    if direction == "up":
+        lo = list(start_lo)
+        for i in range(n):
+            if rules.target_mode == "sum":
+                hi[i] = t - 1 - sum(lo[j] for j in range(n) if j != i)
+            elif rules.target_mode == "max" or i == rules.heap_index:
+                hi[i] = t - 1
+        if rules.mults and min(lo) < 0:
+            return None
+    else:
+        hi = list(start_hi)
+        for i in range(n):
+            if rules.target_mode == "sum":
+                lo[i] = t - sum(hi[j] for j in range(n) if j != i)
+            elif rules.target_mode == "heap" and i == rules.heap_index:
+                lo[i] = t
+        # Деление уменьшает только кучи >= 0: нужна нижняя граница >= 0 у всех куч (и у стартов)
+        if rules.divs and any(v is None or min(v, s) < 0 for v, s in zip(lo, start_lo)):
+            return None
+
+    return StateBounds(direction, tuple(lo), tuple(hi), _sentinel(rules))
+
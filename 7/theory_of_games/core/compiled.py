@@ -0,0 +1,167 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .actions import Action
+from .rules import GameRules
+
+State = Tuple[int, ...]
+
+_OPS = {"add": "+", "mul": "*", "div": "//"}
+
+
+def _build(name: str, src: str, env: Optional[Dict[str, object]] = None) -> Callable:
+    """Выполнить сгенерированный исходник и вернуть функцию name (исходник — в name.source)."""
+    ns: Dict[str, object] = dict(env or {})
+    exec(compile(src, f"<compiled {name}>", "exec"), ns)
+    fn = ns[name]
+    fn.source = src
+    return fn
+
+
+def _action_expr(act: Action, var: str) -> str:
+    op = _OPS.get(act.kind)
+    if op is None:
+        raise ValueError(f"Unknown action kind: {act.kind}")
+    return f"{var} {op} {act.arg}"
+
+
+def terminal_expr(rules: GameRules, heaps: Sequence[str]) -> str:
+    """Условие терминальности для этих правил — выражение над переменными куч heaps."""
+    n = rules.heaps
+    if rules.target_mode == "sum":
+        val = " + ".join(heaps)
+    elif rules.target_mode == "max":
+        if n == 1:
+            val = heaps[0]
+        elif n == 2:
+            val = f"({heaps[0]} if {heaps[0]} >= {heaps[1]} else {heaps[1]})"
+        else:
+            val = f"max({', '.join(heaps)})"
+    elif rules.target_mode == "heap":
+        assert rules.heap_index is not None
+        val = heaps[rules.heap_index]
+    else:
+        raise ValueError(f"Unknown target_mode: {rules.target_mode}")
+    cmp = ">=" if rules.finish_cmp == "ge" else "<"
+    return f"{val} {cmp} {rules.target}"
+
+
+def box_expr(lo: Sequence[Optional[int]], hi: Sequence[Optional[int]], heaps: Sequence[str]) -> Optional[str]:
+    """Условие «позиция внутри границ» — выражение над переменными куч; None, если границ нет."""
+    parts = []
+    for v, a, b in zip(heaps, lo, hi):
+        if a is not None and b is not None:
+            parts.append(f"{a} <= {v} <= {b}")
+        elif a is not None:
+            parts.append(f"{v} >= {a}")
+        elif b is not None:
+            parts.append(f"{v} <= {b}")
+    return " and ".join(parts) or None
+
+
+def terminal_source(rules: GameRules) -> str:
+    """Исходник is_terminal(s) для этих правил: одна проверка без разбора строк режима."""
+    return f"def is_terminal(s):\n    return {terminal_expr(rules, [f's[{i}]' for i in range(rules.heaps)])}\n"
+
+
+def compile_terminal(rules: GameRules) -> Callable[[State], bool]:
+    return _build("is_terminal", terminal_source(rules))
+
+
+def successors_source(heaps: int, actions: Sequence[Action], canonical: bool = False,
+                      guarded: bool = False, collapse: bool = False, tabled: bool = False,
+                      terminal: Optional[str] = None, box: Optional[str] = None) -> str:
+    """
+    Исходник successors(s) -> кортеж позиций после одного хода (меняется ровно одна куча).
+
+    Кучи распаковываются в локальные переменные, каждое действие — готовое выражение.
+    Порядок ходов — как в Game.iter_moves: по кучам, внутри кучи — по actions; повторы убираются
+    (dict.fromkeys сохраняет первое вхождение). canonical — каждый ход сразу в каноническом виде
+    (кучи по возрастанию); collapse — терминальные ходы заменяются одной позицией SENTINEL
+    (проверка — is_terminal из окружения); guarded — фильтр через state_guard из окружения
+    (guard видит ход в том виде, в каком он возвращается).
+    tabled — ходы (до свёртки и фильтра) берутся из словаря TABLE и дописываются в него: так одну
+    таблицу могут делить правила, отличающиеся только порогом (см. core.sweep).
+    terminal и box (только вместе с collapse) — условия терминальности и «внутри границ» готовыми
+    выражениями над t0, t1, … (см. terminal_expr, box_expr): они встраиваются в цикл свёртки вместо
+    вызова is_terminal, а ход вне границ, не ставший терминалом, отбрасывается (см. core.bounds).
+    """
+    names = [f"h{i}" for i in range(heaps)]
+    lines = ["def successors(s):"]
+    ind = "    "
+    if tabled:
+        lines.append("    out = TABLE.get(s)")
+        lines.append("    if out is None:")
+        ind = "        "
+    unpack = ", ".join(names) + ("," if heaps == 1 else "")
+    lines.append(f"{ind}{unpack} = s")
+    items: List[str] = []
+    for i in range(heaps):
+        for act in actions:
+            parts = list(names)
+            parts[i] = f"({_action_expr(act, names[i])})"
+            if canonical and heaps == 2:
+                v = f"v{len(items)}"
+                other = names[1 - i]
+                lines.append(f"{ind}{v} = {parts[i]}")
+                items.append(f"(({v}, {other}) if {v} <= {other} else ({other}, {v}))" if i == 0
+                             else f"(({other}, {v}) if {other} <= {v} else ({v}, {other}))")
+            elif canonical and heaps > 2:
+                items.append(f"tuple(sorted(({', '.join(parts)},)))")
+            else:
+                items.append(f"({', '.join(parts)},)")
+    if not items:
+        lines.append(f"{ind}out = ()" if tabled else "    return ()")
+        if not tabled:
+            return "\n".join(lines) + "\n"
+    else:
+        body = f",\n{ind}    ".join(items)
+        lines.append(f"{ind}out = (\n{ind}    {body},\n{ind})")
+    if tabled:
+        lines.append("        TABLE[s] = out")
+    if collapse and (terminal is not None or box is not None):
+        ts = ", ".join(f"t{i}" for i in range(heaps)) + ("," if heaps == 1 else "")
+        lines += ["    res = {}",
+                  "    for t in out:",
+                  f"        {ts} = t",
+                  f"        if {terminal or 'is_terminal(t)'}:",
+                  "            t = SENTINEL"]
+        if box is not None:
+            lines += [f"        elif not ({box}):",
+                      "            continue"]
+        if guarded:
+            lines += ["        if state_guard(t):",
+                      "            res[t] = None"]
+        else:
+            lines.append("        res[t] = None")
+        lines.append("    return tuple(res)")
+        return "\n".join(lines) + "\n"
+    if collapse:
+        lines.append("    out = [SENTINEL if is_terminal(t) else t for t in out]")
+    if guarded:
+        lines.append("    return tuple(t for t in dict.fromkeys(out) if state_guard(t))")
+    else:
+        lines.append("    return tuple(dict.fromkeys(out))")
+    return "\n".join(lines) + "\n"
+
+
+def compile_successors(heaps: int, actions: Sequence[Action], canonical: bool = False,
+                       state_guard: Optional[Callable[[State], bool]] = None,
+                       sentinel: Optional[State] = None,
+                       is_terminal: Optional[Callable[[State], bool]] = None,
+                       table: Optional[Dict[State, Tuple[State, ...]]] = None,
+                       rules: Optional[GameRules] = None,
+                       bounds: Optional[Tuple[Sequence[Optional[int]], Sequence[Optional[int]]]] = None,
+                       ) -> Callable[[State], Tuple[State, ...]]:
+    """
+    successors по successors_source; при заданных sentinel и is_terminal терминальные ходы сворачиваются,
+    при заданном table ходы запоминаются в нём (ключ — позиция, значение — ходы до свёртки и фильтра).
+    rules и bounds (lo, hi) при свёртке — проверки терминала и границ встраиваются в исходник.
+    """
+    collapse = sentinel is not None and is_terminal is not None
+    ts = [f"t{i}" for i in range(heaps)]
+    terminal = terminal_expr(rules, ts) if collapse and rules is not None else None
+    box = box_expr(bounds[0], bounds[1], ts) if collapse and bounds is not None else None
+    src = successors_source(heaps, actions, canonical, state_guard is not None, collapse, table is not None,
+                            terminal, box)
+    return _build("successors", src, {"state_guard": state_guard, "SENTINEL": sentinel,
+                                      "is_terminal": is_terminal, "TABLE": table})
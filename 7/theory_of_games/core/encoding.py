@@ -0,0 +1,53 @@
+from math import isqrt
+from typing import Tuple
+
+
+def _zigzag(v: int) -> int:
+    """Целое -> натуральное: 0, -1, 1, -2, 2, … -> 0, 1, 2, 3, 4, …"""
+    return v << 1 if v >= 0 else (-v << 1) - 1
+
+
+def _unzigzag(z: int) -> int:
+    return z >> 1 if not z & 1 else -((z + 1) >> 1)
+
+
+def _pair(x: int, y: int) -> int:
+    """Спаривание Шудзика: биекция N×N -> N без ограничения на размер чисел."""
+    return x * x + x + y if x >= y else y * y + x
+
+
+def _unpair(z: int) -> Tuple[int, int]:
+    s = isqrt(z)
+    r = z - s * s
+    if r < s:
+        return r, s
+    return s, r - s
+
+
+class StateCodec:
+    """
+    Упаковка состояния (кортежа куч) в одно неотрицательное целое и обратно.
+    - одна куча: zigzag(значение) — для неотрицательных куч код просто 2·S;
+    - несколько куч: коды куч сворачиваются попарно спариванием Шудзика.
+    Кодирование взаимно однозначно для любых целых (в т.ч. отрицательных и очень больших).
+    """
+    __slots__ = ("heaps",)
+
+    def __init__(self, heaps: int):
+        if heaps < 1:
+            raise ValueError("heaps должен быть >= 1")
+        self.heaps = heaps
+
+    def encode(self, state: Tuple[int, ...]) -> int:
+        code = _zigzag(state[0])
+        for v in state[1:]:
+            code = _pair(code, _zigzag(v))
+        return code
+
+    def decode(self, code: int) -> Tuple[int, ...]:
+        vals = []
+        for _ in range(self.heaps - 1):
+            code, z = _unpair(code)
+            vals.append(_unzigzag(z))
+        vals.append(_unzigzag(code))
+        return tuple(reversed(vals))
@@ -0,0 +1,199 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from .encoding import StateCodec
+from .game import Game
+from .rules import GameRules
+
+POLICIES = ("lru", "depth")
+
+# Значение записи GameEngine для проигрышной позиции (у выигрышной — номер выигрывающего хода)
+NO_WIN = -1
+
+# Грубая оценка памяти на запись таблицы (ключ-кортеж, значение, служебные поля словаря/списка)
+ENTRY_BYTES = 160
+
+
+class TranspositionTable:
+    """
+    Ограниченная по размеру таблица уже посчитанных позиций.
+
+    - policy='lru': OrderedDict, при переполнении выбрасывается давно не использованная запись;
+    - policy='depth': max_entries ячеек, позиция попадает в ячейку по хэшу ключа; при коллизии
+      запись заменяется, только если новая посчитана на не меньшую глубину (дорогие результаты живут дольше).
+
+    Ведёт счётчики попаданий/промахов/вытеснений.
+    """
+
+    def __init__(self, max_entries: int = 1_000_000, policy: str = "lru"):
+        if policy not in POLICIES:
+            raise ValueError(f"policy должен быть одним из: {', '.join(POLICIES)}")
+        if max_entries < 1:
+            raise ValueError("max_entries должен быть >= 1")
+        self.max_entries = max_entries
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lru: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._slots: List[Optional[Tuple[Hashable, int, object]]] = [None] * max_entries if policy == "depth" else []
+        self._used = 0
+
+    @classmethod
+    def from_memory(cls, max_mb: float, policy: str = "lru") -> "TranspositionTable":
+        """Таблица, укладывающаяся примерно в max_mb мегабайт."""
+        return cls(max(1, int(max_mb * 1024 * 1024 / ENTRY_BYTES)), policy)
+
+    def __len__(self) -> int:
+        return len(self._lru) if self.policy == "lru" else self._used
+
+    def get(self, key: Hashable) -> Optional[object]:
+        if self.policy == "lru":
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+        else:
+            entry = self._slots[hash(key) % self.max_entries]
+            value = entry[2] if entry is not None and entry[0] == key else None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def peek(self, key: Hashable) -> Optional[object]:
+        """Значение без учёта в счётчиках и без обновления порядка LRU (для подсказок упорядочения ходов)."""
+        if self.policy == "lru":
+            return self._lru.get(key)
+        entry = self._slots[hash(key) % self.max_entries]
+        return entry[2] if entry is not None and entry[0] == key else None
+
+    def put(self, key: Hashable, value: object, depth: int = 0) -> None:
+        if self.policy == "lru":
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            if len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+                self.evictions += 1
+            return
+        i = hash(key) % self.max_entries
+        entry = self._slots[i]
+        if entry is None:
+            self._used += 1
+        elif entry[0] != key:
+            if entry[1] > depth:
+                return  # в ячейке более дорогой результат — новый не сохраняем
+            self.evictions += 1
+        self._slots[i] = (key, depth, value)
+
+    def clear(self) -> None:
+        self._lru.clear()
+        if self.policy == "depth":
+            self._slots = [None] * self.max_entries
+        self._used = 0
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return dict(
+            policy=self.policy,
+            entries=len(self),
+            max_entries=self.max_entries,
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / lookups if lookups else 0.0,
+            evictions=self.evictions,
+        )
+
+
+class GameEngine:
+    """
+    Поиск «выигрыш за k собственных ходов» для любого числа куч и любой глубины.
+
+    Смысл can_win(state, k) — тот же, что у EGESolver._can_win_in. win_depth ищет минимальное k
+    итеративным углублением k = 1, 2, …: результаты мелких глубин остаются в таблице, а найденный
+    на прошлой итерации выигрышный ход пробуется первым.
+
+    Кэш — TranspositionTable с ограничением по числу записей, ключ — (код позиции, k),
+    значение — номер выигрывающего хода или NO_WIN. Подсказка для упорядочения ходов берётся
+    из записи той же позиции на глубине k - 1 и вытесняется вместе с ней.
+    При symmetry=True и симметричных правилах позиции ищутся в каноническом виде (Game.canonical).
+    """
+
+    def __init__(self, rules: GameRules, table: Optional[TranspositionTable] = None,
+                 cancel_cb: Optional[Callable[[], bool]] = None, symmetry: bool = True):
+        self.rules = rules
+        self.game = Game(rules, symmetry=symmetry)
+        self.codec = StateCodec(rules.heaps)
+        self.table = table if table is not None else TranspositionTable()
+        self.cancel_cb = cancel_cb
+        self.nodes = 0
+
+    def _ordered_moves(self, state: Tuple[int, ...], best: Optional[int]) -> List[Tuple[int, Tuple[int, ...]]]:
+        """Ходы с их номерами; ход best (выигрывавший на меньшей глубине) — первым."""
+        moves = list(enumerate(self.game.successors(state)))
+        if best is not None and 0 <= best < len(moves):
+            moves.insert(0, moves.pop(best))
+        return moves
+
+    def can_win(self, state: Tuple[int, ...], k: int) -> bool:
+        """Текущий игрок выигрывает не более чем за k своих ходов при любой игре соперника."""
+        if k <= 0 or self.game.terminal(state):
+            return False
+        state = self.game.canonical(state)
+        code = self.codec.encode(state)
+        key = (code, k)
+        cached = self.table.get(key)
+        if cached is not None:
+            return cached != NO_WIN
+
+        self.nodes += 1
+        if self.cancel_cb and self.nodes % 4096 == 0 and self.cancel_cb():
+            raise RuntimeError("CANCELLED")
+
+        # Выигрыш за k - 1 ходов — это и выигрыш за k: тот же ход, позицию не раскрываем
+        prev = self.table.peek((code, k - 1))
+        if prev is not None and prev != NO_WIN:
+            self.table.put(key, prev, depth=k)
+            return True
+
+        best = NO_WIN
+        for i, s1 in self._ordered_moves(state, prev):
+            if self.game.terminal(s1):
+                res = True
+            else:
+                opp_moves = self.game.successors(s1)
+                res = not opp_moves or all(self.can_win(s2, k - 1) for s2 in opp_moves)
+            if res:
+                best = i
+                break
+
+        self.table.put(key, best, depth=k)
+        return best != NO_WIN
+
+    def win_depth(self, state: Tuple[int, ...], max_k: int) -> Optional[int]:
+        """Минимальное k <= max_k, при котором can_win(state, k), иначе None (итеративное углубление)."""
+        for k in range(1, max_k + 1):
+            if self.can_win(state, k):
+                return k
+        return None
+
+    def lose_depth(self, state: Tuple[int, ...], max_k: int) -> Optional[int]:
+        """
+        Минимальное k <= max_k, при котором текущий игрок проигрывает: соперник при любом ходе
+        выигрывает не более чем за k своих ходов (0 — позиция уже терминальная). Иначе None.
+        """
+        if self.game.terminal(state):
+            return 0
+        moves = self.game.successors(state)
+        if not moves:
+            return 0
+        for k in range(1, max_k + 1):
+            if all(self.can_win(s1, k) for s1 in moves):
+                return k
+        return None
+
+    def stats(self) -> Dict[str, object]:
+        st = self.table.stats()
+        st["nodes"] = self.nodes
+        st["approx_bytes"] = len(self.table) * ENTRY_BYTES
+        return st
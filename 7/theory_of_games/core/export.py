@@ -0,0 +1,184 @@
+"""
+Потоковый экспорт ответов 19/20/21 и таблиц глубин (без Qt).
+
+Источник ответов — функция source(bit) -> значения S, для которых в ответе есть бит TASK_* (по возрастанию).
+Каждый вызов отдаёт значения заново; писатели проходят источник по разу на задание,
+поэтому в памяти не держится ни полный список ответов, ни весь файл:
+  source_from_lists(s19, s20, s21) — из готовых отсортированных списков (без копий);
+  source_from_solver(solver)       — из памяти EGESolver (см. EGESolver.iter_task).
+
+Форматы (export выбирает по расширению):
+  .csv  — столбцы S19;S20;S21, короткие столбцы дополняются пустыми ячейками (как раньше в окне);
+  .json — {"meta": ..., "results": {"task19": [...], "task20": [...], "task21": [...]}};
+  .npz  — NumPy: отсортированные int64-массивы task19/task20/task21, s_min, s_max, meta (строка JSON);
+  .bits — заголовок и по одной битовой маске на задание над [s_min, s_max] (см. write_bitmap).
+"""
+import csv
+import itertools
+import json
+import os
+import struct
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .solver import TASK_19, TASK_20, TASK_21, np
+
+AnswerSource = Callable[[int], Iterable[int]]
+
+TASK_BITS = ((19, TASK_19), (20, TASK_20), (21, TASK_21))
+FORMATS = ("csv", "json", "npz", "bits")
+
+BITMAP_MAGIC = b"EGEBITS1"
+# s_min, s_max, длина meta в байтах
+BITMAP_HEADER = struct.Struct("<qqI")
+
+# Сколько чисел или байтов копится перед записью в файл
+CHUNK = 1 << 16
+
+
+def source_from_lists(s19: Sequence[int], s20: Sequence[int], s21: Sequence[int]) -> AnswerSource:
+    """Источник из трёх списков, отсортированных по возрастанию."""
+    by_bit = {TASK_19: s19, TASK_20: s20, TASK_21: s21}
+    return lambda bit: iter(by_bit[bit])
+
+
+def source_from_solver(solver) -> AnswerSource:
+    """Источник из уже посчитанных ответов EGESolver для его текущего диапазона S."""
+    return solver.iter_task
+
+
+def write_csv(path: str, source: AnswerSource) -> None:
+    """CSV (';') со столбцами S19;S20;S21: три прохода по источнику идут параллельно, строка за строкой."""
+    columns = [source(bit) for _, bit in TASK_BITS]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(["S19", "S20", "S21"])
+        w.writerows(itertools.zip_longest(*columns, fillvalue=""))
+
+
+def _write_numbers(f, values: Iterable[int]) -> None:
+    buf: List[str] = []
+    first = True
+    for v in values:
+        buf.append(str(v))
+        if len(buf) >= CHUNK:
+            f.write(("" if first else ", ") + ", ".join(buf))
+            buf, first = [], False
+    if buf:
+        f.write(("" if first else ", ") + ", ".join(buf))
+
+
+def write_json(path: str, source: AnswerSource, meta: Optional[Dict[str, Any]] = None) -> None:
+    """JSON той же структуры, что и прежний экспорт окна; списки ответов пишутся кусками."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{\n  "meta": ')
+        f.write(json.dumps(meta or {}, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+        f.write(',\n  "results": {')
+        for i, (task, bit) in enumerate(TASK_BITS):
+            f.write(f'{"," if i else ""}\n    "task{task}": [')
+            _write_numbers(f, source(bit))
+            f.write("]")
+        f.write("\n  }\n}\n")
+
+
+def write_npz(path: str, source: AnswerSource, s_min: int, s_max: int,
+              meta: Optional[Dict[str, Any]] = None) -> None:
+    """Сжатый .npz: task19/task20/task21 — отсортированные int64-массивы S (память — только на сами ответы)."""
+    if np is None:
+        raise RuntimeError("Для экспорта в .npz нужен пакет numpy (pip install numpy)")
+    arrays = {f"task{task}": np.fromiter(source(bit), dtype=np.int64) for task, bit in TASK_BITS}
+    np.savez_compressed(path, s_min=np.int64(s_min), s_max=np.int64(s_max),
+                        meta=np.array(json.dumps(meta or {}, ensure_ascii=False)), **arrays)
+
+
+def write_bitmap(path: str, source: AnswerSource, s_min: int, s_max: int,
+                 meta: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Битовые маски заданий над [s_min, s_max]:
+      BITMAP_MAGIC, BITMAP_HEADER (s_min, s_max, длина meta), meta (JSON в UTF-8),
+      затем для 19, 20, 21 по ceil(n / 8) байт; бит i (младший бит байта — первый) — S = s_min + i.
+    Маска пишется окнами по CHUNK байт, память не зависит от длины диапазона.
+    """
+    n = s_max - s_min + 1
+    if n <= 0:
+        raise ValueError("s_max должен быть не меньше s_min")
+    nbytes = (n + 7) // 8
+    raw_meta = json.dumps(meta or {}, ensure_ascii=False).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(BITMAP_MAGIC)
+        f.write(BITMAP_HEADER.pack(s_min, s_max, len(raw_meta)))
+        f.write(raw_meta)
+        for _, bit in TASK_BITS:
+            window = bytearray(CHUNK)
+            base = 0  # номер первого байта окна
+            for S in source(bit):
+                if not s_min <= S <= s_max:
+                    continue
+                i = S - s_min
+                byte = i >> 3
+                while byte >= base + CHUNK:
+                    f.write(window[:min(CHUNK, nbytes - base)])
+                    window = bytearray(CHUNK)
+                    base += CHUNK
+                window[byte - base] |= 1 << (i & 7)
+            while base < nbytes:
+                f.write(window[:min(CHUNK, nbytes - base)])
+                window = bytearray(CHUNK)
+                base += CHUNK
+
+
+def read_bitmap(path: str) -> Tuple[int, int, Dict[str, Any], Tuple[List[int], List[int], List[int]]]:
+    """Прочитать файл write_bitmap: (s_min, s_max, meta, (s19, s20, s21))."""
+    with open(path, "rb") as f:
+        if f.read(len(BITMAP_MAGIC)) != BITMAP_MAGIC:
+            raise ValueError(f"{path}: это не файл битовых масок ответов")
+        s_min, s_max, meta_len = BITMAP_HEADER.unpack(f.read(BITMAP_HEADER.size))
+        meta = json.loads(f.read(meta_len).decode("utf-8"))
+        n = s_max - s_min + 1
+        nbytes = (n + 7) // 8
+        lists: List[List[int]] = []
+        for _ in TASK_BITS:
+            raw = f.read(nbytes)
+            if len(raw) != nbytes:
+                raise ValueError(f"{path}: файл обрезан")
+            lists.append([s_min + (byte << 3) + b for byte, v in enumerate(raw) if v
+                          for b in range(8) if v >> b & 1])
+    return s_min, s_max, meta, (lists[0], lists[1], lists[2])
+
+
+def format_of(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext not in FORMATS:
+        raise ValueError(f"Неизвестный формат экспорта: .{ext} (поддерживаются: {', '.join(FORMATS)})")
+    return ext
+
+
+def export(path: str, source: AnswerSource, s_min: int, s_max: int,
+           meta: Optional[Dict[str, Any]] = None, fmt: Optional[str] = None) -> None:
+    """Записать ответы в формате fmt (по умолчанию — по расширению path)."""
+    fmt = fmt or format_of(path)
+    if fmt == "csv":
+        write_csv(path, source)
+    elif fmt == "json":
+        write_json(path, source, meta)
+    elif fmt == "npz":
+        write_npz(path, source, s_min, s_max, meta)
+    elif fmt == "bits":
+        write_bitmap(path, source, s_min, s_max, meta)
+    else:
+        raise ValueError(f"fmt должен быть одним из: {', '.join(FORMATS)}")
+
+
+def write_depths_csv(path: str, rows: Iterable[Tuple[Tuple[int, ...], Optional[int], Optional[int]]],
+                     heaps: int) -> int:
+    """
+    Таблица глубин (см. EGESolver.iter_depths) в CSV: heap0;…;win;lose, пустая ячейка — глубина неизвестна.
+    Возвращает число записанных позиций.
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow([f"heap{i}" for i in range(heaps)] + ["win", "lose"])
+        for state, win, lose in rows:
+            w.writerow([*state, "" if win is None else win, "" if lose is None else lose])
+            count += 1
+    return count
@@ -1,6 +1,8 @@
-from typing import Callable, Iterable, Tuple, Optional, Set
+from typing import Callable, Dict, Iterable, Tuple, Optional
 
 from .actions import Action
+from .bounds import StateBounds
+from .compiled import compile_successors, compile_terminal
 from .rules import GameRules
 
 
@@ -9,52 +11,70 @@ class Game:
     Инкапсулирует правила и операции:
     - проверка терминала;
     - генерация ходов из состояния (меняется ровно одна куча);
-    - описание хода.
+    - описание хода;
+    - канонизация: при symmetry=True и симметричных правилах (GameRules.is_symmetric)
+      позиции, отличающиеся перестановкой куч, сводятся к одной — с кучами по возрастанию.
+
+    Правила один раз компилируются в функции (см. core.compiled), без разбора строк на каждом вызове:
+    - terminal(state) -> bool;
+    - successors(state) -> кортеж ходов (в каноническом виде, если канонизация включена);
+    - plain_successors(state) -> кортеж настоящих ходов (для печати стратегий).
+    Переборы в солверах зовут их напрямую.
+
+    bounds (см. core.bounds.derive_bounds) сужают перебор монотонной игры: successors сворачивает
+    все терминальные ходы в bounds.sentinel и отбрасывает ходы за границами (проверки встроены в исходник).
+    plain_successors границами не ограничивается.
+
+    move_table — общий словарь «позиция -> ходы» для successors: ходы зависят только от действий,
+    числа куч и канонизации, поэтому его могут делить игры с разными порогами.
     """
+    __slots__ = ("rules", "state_guard", "actions", "symmetric", "bounds",
+                 "terminal", "successors", "plain_successors")
 
     def __init__(self, rules: GameRules,
-                 state_guard: Optional[Callable[[Tuple[int, ...]], bool]] = None):
+                 state_guard: Optional[Callable[[Tuple[int, ...]], bool]] = None,
+                 symmetry: bool = False,
+                 bounds: Optional[StateBounds] = None,
+                 move_table: Optional[Dict[Tuple[int, ...], Tuple[Tuple[int, ...], ...]]] = None):
         self.rules = rules
         self.state_guard = state_guard
+        self.symmetric = symmetry and rules.is_symmetric()
+        self.bounds = bounds
         self.actions: Tuple[Action, ...] = tuple(
             [Action("add", a) for a in self.rules.adds] +
             [Action("mul", m) for m in self.rules.mults] +
             [Action("div", d) for d in self.rules.divs]
         )
-
-    def is_terminal(self, state: Tuple[int, ...]) -> bool:
-        if self.rules.target_mode == "sum":
-            val = sum(state)
-        elif self.rules.target_mode == "max":
-            val = max(state)
-        elif self.rules.target_mode == "heap":
-            idx = self.rules.heap_index  # валидируется в GameRules.__post_init__
-            assert idx is not None
-            val = state[idx]
+        self.terminal = compile_terminal(rules)
+        self.plain_successors = compile_successors(rules.heaps, self.actions, False, state_guard)
+        if bounds is not None:
+            self.successors = compile_successors(rules.heaps, self.actions, self.symmetric, state_guard,
+                                                 self.canonical(bounds.sentinel), self.terminal, move_table,
+                                                 rules=rules, bounds=(bounds.lo, bounds.hi))
+        elif self.symmetric or move_table is not None:
+            self.successors = compile_successors(rules.heaps, self.actions, self.symmetric, state_guard,
+                                                 table=move_table)
         else:
-            raise ValueError(f"Unknown target_mode: {self.rules.target_mode}")
+            self.successors = self.plain_successors
 
-        if self.rules.finish_cmp == "ge":
-            return val >= self.rules.target
-        else:  # "lt"
-            return val < self.rules.target
+    def is_terminal(self, state: Tuple[int, ...]) -> bool:
+        return self.terminal(state)
 
     def iter_moves(self, state: Tuple[int, ...]) -> Iterable[Tuple[int, ...]]:
-        """Итерирует все позиции, достижимые за 1 ход (меняется ровно одна куча)."""
-        n = len(state)
-        seen: Set[Tuple[int, ...]] = set()
-        for i in range(n):
-            old = state[i]
-            for act in self.actions:
-                new_state = list(state)
-                new_state[i] = act.apply(old)
-                t = tuple(new_state)
-                if t in seen:
-                    continue
-                if self.state_guard and not self.state_guard(t):
-                    continue
-                seen.add(t)
-                yield t
+        """Все позиции, достижимые за 1 ход (меняется ровно одна куча), без повторов."""
+        return self.plain_successors(state)
+
+    def canonical(self, state: Tuple[int, ...]) -> Tuple[int, ...]:
+        """Представитель класса симметричных позиций (сама позиция, если канонизация выключена)."""
+        if not self.symmetric:
+            return state
+        if len(state) == 2:
+            return state if state[0] <= state[1] else (state[1], state[0])
+        return tuple(sorted(state))
+
+    def iter_canonical_moves(self, state: Tuple[int, ...]) -> Iterable[Tuple[int, ...]]:
+        """Как iter_moves, но ходы приводятся к каноническому виду (совпавшие после этого — один раз)."""
+        return self.successors(state)
 
     def describe_move(self, a: Tuple[int, ...], b: Tuple[int, ...]) -> str:
         if len(a) != len(b):
@@ -0,0 +1,145 @@
+"""
+Двумерная сетка стартов для двух куч: обе кучи перебираются по диапазонам, для каждой пары (a, b) —
+биты TASK_* ответов 19/20/21.
+
+Все старты сетки решаются одной общей таблицей глубин (RetrogradeTable или ArrayStateSpace),
+а не отдельным EGESolver на каждое значение фиксированной кучи: позиции, общие для соседних стартов,
+раскрываются один раз.
+"""
+import csv
+import json
+import os
+from array import array
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .arrays import ArrayStateSpace, np
+from .bounds import derive_bounds
+from .game import Game
+from .retrograde import RetrogradeTable
+from .rules import GameRules
+from .solver import TASK_19, TASK_20, TASK_21, classify_space, classify_start
+
+GRID_METHODS = ("retrograde", "numpy")
+
+TASK_BITS = {19: TASK_19, 20: TASK_20, 21: TASK_21}
+
+
+@dataclass
+class HeapGrid:
+    """
+    Ответы для стартов (a, b), a в rows = [a_min, a_max], b в cols = [b_min, b_max] (включительно).
+    masks — биты TASK_* построчно: ячейка (a, b) — masks[(a - a_min) * ширина + (b - b_min)].
+    """
+    rules: GameRules
+    rows: Tuple[int, int]
+    cols: Tuple[int, int]
+    masks: array
+    method: str = "retrograde"
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.rows[1] - self.rows[0] + 1, self.cols[1] - self.cols[0] + 1
+
+    def mask(self, a: int, b: int) -> int:
+        if not (self.rows[0] <= a <= self.rows[1] and self.cols[0] <= b <= self.cols[1]):
+            raise KeyError(f"Старт ({a}, {b}) вне сетки")
+        return self.masks[(a - self.rows[0]) * self.shape[1] + (b - self.cols[0])]
+
+    def cells(self, task: int) -> List[Tuple[int, int]]:
+        """Старты (a, b), подходящие под задание task, построчно."""
+        bit = TASK_BITS[task]
+        width = self.shape[1]
+        return [(self.rows[0] + i // width, self.cols[0] + i % width)
+                for i, m in enumerate(self.masks) if m & bit]
+
+    def counts(self) -> Dict[str, int]:
+        return {str(task): sum(1 for m in self.masks if m & bit) for task, bit in TASK_BITS.items()}
+
+    def to_arrays(self) -> Dict[str, "np.ndarray"]:
+        """Массивы NumPy: значения куч по осям, маски (uint8, строки — первая куча) и по bool-матрице на задание."""
+        if np is None:
+            raise RuntimeError("Для массивов нужен пакет numpy (pip install numpy)")
+        grid = np.frombuffer(self.masks, dtype=np.uint8).reshape(self.shape)
+        out = dict(
+            heap0=np.arange(self.rows[0], self.rows[1] + 1, dtype=np.int64),
+            heap1=np.arange(self.cols[0], self.cols[1] + 1, dtype=np.int64),
+            masks=grid.copy(),
+        )
+        for task, bit in TASK_BITS.items():
+            out[f"task{task}"] = (grid & bit) != 0
+        return out
+
+    def save(self, path: str) -> None:
+        """
+        .npz — массивы to_arrays и правила (строка JSON);
+        .csv — матрица масок: первая строка — значения второй кучи, далее строка на значение первой кучи.
+        """
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".npz":
+            if np is None:
+                raise RuntimeError("Для экспорта в .npz нужен пакет numpy (pip install numpy)")
+            np.savez_compressed(path, rules=np.array(json.dumps(self.rules.to_dict())), **self.to_arrays())
+        elif ext == ".csv":
+            width = self.shape[1]
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                w = csv.writer(f, delimiter=";")
+                w.writerow(["a\\b"] + list(range(self.cols[0], self.cols[1] + 1)))
+                for i, a in enumerate(range(self.rows[0], self.rows[1] + 1)):
+                    w.writerow([a] + self.masks[i * width:(i + 1) * width].tolist())
+        else:
+            raise ValueError(f"Сетка сохраняется в .npz или .csv, а не в {ext or 'файл без расширения'}")
+
+
+def solve_grid(
+        rules: GameRules,
+        rows: Tuple[int, int],
+        cols: Tuple[int, int],
+        method: str = "retrograde",
+        symmetry: bool = True,
+        bounding: bool = True,
+        progress_cb: Optional[Callable[[int, int], None]] = None,
+        cancel_cb: Optional[Callable[[], bool]] = None,
+) -> HeapGrid:
+    """
+    Ответы 19/20/21 для всех стартов (a, b) из rows x cols по одной таблице глубин.
+    - method: 'retrograde' (RetrogradeTable от всех стартов сразу) или 'numpy' (ArrayStateSpace на прямоугольник);
+    - symmetry, bounding — как у EGESolver; symmetry по умолчанию включена: меняются обе кучи,
+      и (a, b), (b, a) занимают в таблице одну запись;
+    - progress_cb(готово строк, всего строк); отмена — RuntimeError("CANCELLED").
+    """
+    if rules.heaps != 2:
+        raise ValueError("Двумерная сетка — только для двух куч")
+    if method not in GRID_METHODS:
+        raise ValueError(f"method должен быть одним из: {', '.join(GRID_METHODS)}")
+    rows = (min(rows), max(rows))
+    cols = (min(cols), max(cols))
+    corners = [(rows[0], cols[0]), (rows[1], cols[1])]
+    bounds = derive_bounds(rules, corners, symmetry and rules.is_symmetric()) if bounding else None
+    game = Game(rules, symmetry=symmetry, bounds=bounds)
+    n_rows = rows[1] - rows[0] + 1
+    width = cols[1] - cols[0] + 1
+
+    if method == "numpy":
+        sp = ArrayStateSpace(game, corners, max_depth=2, cancel_cb=cancel_cb)
+        a = np.arange(rows[0], rows[1] + 1, dtype=np.int64)[:, None]
+        b = np.arange(cols[0], cols[1] + 1, dtype=np.int64)[None, :]
+        starts = ((a - sp.lo[0]) * sp.shape[1] + (b - sp.lo[1])).ravel()
+        masks = array("B", classify_space(sp, starts).astype(np.uint8).tobytes())
+        if progress_cb:
+            progress_cb(n_rows, n_rows)
+        return HeapGrid(rules, rows, cols, masks, method)
+
+    starts = [(a, b) for a in range(rows[0], rows[1] + 1) for b in range(cols[0], cols[1] + 1)]
+    table = RetrogradeTable(game, starts, max_depth=2, cancel_cb=cancel_cb)
+    node = game.canonical
+    masks = array("B")
+    for i in range(n_rows):
+        if cancel_cb and cancel_cb():
+            raise RuntimeError("CANCELLED")
+        for st in starts[i * width:(i + 1) * width]:
+            masks.append(classify_start(node(st), game.terminal, table.moves,
+                                        table.has_move_to_terminal, table.can_win_in))
+        if progress_cb:
+            progress_cb(i + 1, n_rows)
+    return HeapGrid(rules, rows, cols, masks, method)
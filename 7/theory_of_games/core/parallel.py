@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, List, Optional, Tuple
+
+from .rules import GameRules
+from .solver import EGESolver
+
+# Процессы пулов (здесь, в core.sweep и cli) запускаются через spawn, а не fork: пулы создаются и из окна
+# (из QThread при живом GUI-потоке), а копия многопоточного процесса с Qt/GL может зависнуть в воркере.
+MP_START_METHOD = "spawn"
+
+
+def mp_context():
+    """Контекст multiprocessing для пулов воркеров (см. MP_START_METHOD)."""
+    return multiprocessing.get_context(MP_START_METHOD)
+
+
+def split_range(s_min: int, s_max: int, chunks: int) -> List[Tuple[int, int]]:
+    """Разбить [s_min, s_max] на не более чем chunks подряд идущих кусков примерно равной длины."""
+    s_min, s_max = min(s_min, s_max), max(s_min, s_max)
+    total = s_max - s_min + 1
+    chunks = max(1, min(chunks, total))
+    base, extra = divmod(total, chunks)
+    parts = []
+    lo = s_min
+    for i in range(chunks):
+        hi = lo + base - 1 + (1 if i < extra else 0)
+        parts.append((lo, hi))
+        lo = hi + 1
+    return parts
+
+
+# Событие отмены, общее для всех процессов пула (ставится _init_worker при запуске процесса)
+_cancel_event = None
+
+
+def _init_worker(event) -> None:
+    global _cancel_event
+    _cancel_event = event
+
+
+def _solve_chunk(rules: GameRules, start_template: Tuple[Optional[int], ...], s_min: int, s_max: int,
+                 method: str) -> Tuple[List[int], List[int], List[int]]:
+    """Задача для процесса-воркера (функция верхнего уровня — чтобы её можно было передать в пул)."""
+    cancel_cb = _cancel_event.is_set if _cancel_event is not None else None
+    return EGESolver(rules, start_template, s_min, s_max, method=method).solve_all(cancel_cb=cancel_cb)
+
+
+def solve_all_parallel(
+        rules: GameRules,
+        start_template: Tuple[Optional[int], ...],
+        s_min: int,
+        s_max: int,
+        method: str = "recursive",
+        workers: Optional[int] = None,
+        chunks_per_worker: int = 4,
+        progress_cb: Optional[Callable[[int, int], None]] = None,
+        cancel_cb: Optional[Callable[[], bool]] = None,
+        chunk_cb: Optional[Callable[[int, int, Tuple[List[int], List[int], List[int]]], None]] = None,
+) -> Tuple[List[int], List[int], List[int]]:
+    """
+    EGESolver.solve_all, распараллеленный по S через ProcessPoolExecutor.
+
+    Диапазон режется на workers * chunks_per_worker кусков (мелкие куски выравнивают нагрузку),
+    каждый кусок решается своим EGESolver в отдельном процессе, результаты склеиваются по порядку S.
+    progress_cb(i, total) вызывается по мере готовности кусков (i — число уже решённых S),
+    chunk_cb(lo, hi, ответы куска) — сразу с ответами готового куска (куски приходят не по порядку).
+    Отмена проверяется, пока ждём кусков: ещё не начатые куски снимаются, а уже идущие получают
+    общее событие отмены (cancel_cb их EGESolver) и прерываются внутри перебора.
+    """
+    workers = workers or os.cpu_count() or 1
+    parts = split_range(s_min, s_max, workers * chunks_per_worker)
+    total = sum(hi - lo + 1 for lo, hi in parts)
+    results: List[Optional[Tuple[List[int], List[int], List[int]]]] = [None] * len(parts)
+
+    ctx = mp_context()
+    cancel_event = ctx.Event()
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(parts)), mp_context=ctx,
+                               initializer=_init_worker, initargs=(cancel_event,))
+    try:
+        futures = {pool.submit(_solve_chunk, rules, start_template, lo, hi, method): i
+                   for i, (lo, hi) in enumerate(parts)}
+        pending = set(futures)
+        done_S = 0
+        while pending:
+            if cancel_cb and cancel_cb():
+                cancel_event.set()
+                raise RuntimeError("CANCELLED")
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for fut in done:
+                i = futures[fut]
+                results[i] = fut.result()
+                lo, hi = parts[i]
+                done_S += hi - lo + 1
+                if chunk_cb:
+                    chunk_cb(lo, hi, results[i])
+                if progress_cb:
+                    progress_cb(done_S, total)
+    except BaseException:
+        cancel_event.set()
+        raise
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    s19: List[int] = []
+    s20: List[int] = []
+    s21: List[int] = []
+    for part in results:
+        assert part is not None
+        s19.extend(part[0])
+        s20.extend(part[1])
+        s21.extend(part[2])
+    return s19, s20, s21
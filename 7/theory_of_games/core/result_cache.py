@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from array import array
+from typing import List, Optional, Tuple
+
+from .rules import GameRules
+
+# Меняется, если меняется смысл ответов 19/20/21 — старые записи тогда просто не находятся
+CACHE_VERSION = 1
+
+Results = Tuple[List[int], List[int], List[int]]
+
+
+def default_cache_path() -> str:
+    """Файл кэша в пользовательском каталоге данных (без зависимостей от Qt)."""
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "ege-tools", "game-19-21-solver", "results.sqlite3")
+
+
+def rules_fingerprint(rules: GameRules, start_template: Tuple[Optional[int], ...]) -> str:
+    """Стабильный хэш нормализованных правил и шаблона старта."""
+    d = rules.to_dict()
+    if d["target_mode"] != "heap":
+        d["heap_index"] = None  # в режимах sum/max индекс ни на что не влияет
+    d["start_template"] = list(start_template)
+    d["version"] = CACHE_VERSION
+    raw = json.dumps(d, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _pack(nums: List[int]) -> bytes:
+    return array("q", nums).tobytes()
+
+
+def _unpack(raw: bytes) -> List[int]:
+    a = array("q")
+    a.frombytes(raw)
+    return a.tolist()
+
+
+class ResultCache:
+    """
+    Постоянный кэш ответов 19/20/21 в SQLite.
+
+    - Ключ: rules_fingerprint(rules, start_template) + диапазон [s_min, s_max].
+    - Ответ для S не зависит от остальных S, поэтому запрос на более узкий диапазон
+      отвечается из любой записи, которая его покрывает.
+    - Вытеснение: при превышении max_bytes удаляются давно не использованные записи (LRU).
+    - Соединение открывается на каждую операцию — кэш можно звать из любого потока.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path or default_cache_path()
+        self.max_bytes = max_bytes
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._connect() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    fp TEXT NOT NULL,
+                    s_min INTEGER NOT NULL,
+                    s_max INTEGER NOT NULL,
+                    s19 BLOB NOT NULL,
+                    s20 BLOB NOT NULL,
+                    s21 BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (fp, s_min, s_max)
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, rules: GameRules, start_template: Tuple[Optional[int], ...],
+            s_min: int, s_max: int) -> Optional[Results]:
+        s_min, s_max = min(s_min, s_max), max(s_min, s_max)
+        fp = rules_fingerprint(rules, start_template)
+        con = self._connect()
+        try:
+            with con:
+                row = con.execute(
+                    "SELECT s_min, s_max, s19, s20, s21 FROM results "
+                    "WHERE fp = ? AND s_min <= ? AND s_max >= ? "
+                    "ORDER BY s_max - s_min LIMIT 1",
+                    (fp, s_min, s_max),
+                ).fetchone()
+                if row is None:
+                    return None
+                con.execute("UPDATE results SET last_used = ? WHERE fp = ? AND s_min = ? AND s_max = ?",
+                            (time.time(), fp, row[0], row[1]))
+        finally:
+            con.close()
+        return tuple([S for S in _unpack(raw) if s_min <= S <= s_max] for raw in row[2:])
+
+    def put(self, rules: GameRules, start_template: Tuple[Optional[int], ...],
+            s_min: int, s_max: int, results: Results) -> None:
+        s_min, s_max = min(s_min, s_max), max(s_min, s_max)
+        fp = rules_fingerprint(rules, start_template)
+        blobs = [_pack(sorted(r)) for r in results]
+        size = sum(len(b) for b in blobs)
+        con = self._connect()
+        try:
+            with con:
+                covered = con.execute(
+                    "SELECT 1 FROM results WHERE fp = ? AND s_min <= ? AND s_max >= ? LIMIT 1",
+                    (fp, s_min, s_max),
+                ).fetchone()
+                if covered:
+                    return
+                # Записи внутри нового диапазона больше не нужны
+                con.execute("DELETE FROM results WHERE fp = ? AND s_min >= ? AND s_max <= ?",
+                            (fp, s_min, s_max))
+                con.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            (fp, s_min, s_max, *blobs, size, time.time()))
+                self._evict(con)
+        finally:
+            con.close()
+
+    def _evict(self, con: sqlite3.Connection):
+        total = con.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = con.execute("SELECT fp, s_min, s_max, size FROM results ORDER BY last_used").fetchall()
+        for fp, s_min, s_max, size in rows:
+            if total <= self.max_bytes:
+                break
+            con.execute("DELETE FROM results WHERE fp = ? AND s_min = ? AND s_max = ?", (fp, s_min, s_max))
+            total -= size
+
+    def invalidate(self, rules: GameRules, start_template: Tuple[Optional[int], ...]) -> int:
+        """Удалить все записи для этих правил. Возвращает число удалённых записей."""
+        fp = rules_fingerprint(rules, start_template)
+        con = self._connect()
+        try:
+            with con:
+                return con.execute("DELETE FROM results WHERE fp = ?", (fp,)).rowcount
+        finally:
+            con.close()
+
+    def clear(self) -> None:
+        con = self._connect()
+        try:
+            with con:
+                con.execute("DELETE FROM results")
+            con.execute("VACUUM")
+        finally:
+            con.close()
+
+    def stats(self) -> Tuple[int, int]:
+        """(число записей, суммарный размер ответов в байтах)"""
+        con = self._connect()
+        try:
+            return tuple(con.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone())
+        finally:
+            con.close()
@@ -0,0 +1,242 @@
+import sys
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .game import Game
+
+# Метки позиций в таблице
+UNKNOWN = 0
+WIN = 1
+LOSE = 2
+DRAW = 3  # только в полном графе: ни выигрыша, ни проигрыша — партия может идти бесконечно
+
+OUTCOMES = {WIN: "win", LOSE: "lose", DRAW: "draw"}
+
+# Предел числа позиций полного графа (max_depth=None): у игр с циклами и ростом куч граф может быть бесконечным
+MAX_STATES = 5_000_000
+
+
+class RetrogradeTable:
+    """
+    Таблица глубин выигрыша/проигрыша, построенная ретроградным (обратным) анализом.
+
+    1) Прямой проход: BFS от всех стартовых позиций сразу, не дальше horizon полуходов
+       (по умолчанию 2 * max_depth + 1 — этого хватает для вопросов о стартах и их детях).
+       Терминальные позиции не раскрываются (кроме самих стартов — для проверки W1).
+    2) Обратный проход: счётчики необработанных ходов + очередь в порядке возрастания глубины.
+       - LOSE 0: терминал или нет ходов;
+       - WIN d: есть ход в LOSE (d-1), d минимально;
+       - LOSE d: все ходы ведут в WIN, d — максимальная из их глубин.
+
+    Глубина считается в собственных ходах выигрывающего игрока — так же, как в EGESolver._can_win_in.
+    Для позиции на расстоянии r от старта глубины до k точны, если r + 2k <= horizon.
+    Если граф исчерпан раньше горизонта (complete == True), точны все метки.
+
+    max_depth=None — без горизонта: раскрывается весь достижимый граф (не больше max_states позиций,
+    иначе ValueError). Тогда это полный классификатор для игр с циклами: каждое ребро обрабатывается
+    один раз (O(V + E)), глубины точные, а позиции, оставшиеся без метки, — ничьи (DRAW):
+    из них ни один игрок не может форсировать конец партии.
+
+    Позиции хранятся в каноническом виде (Game.canonical): запросы принимают канонические
+    позиции, moves возвращает канонические ходы. Без канонизации в Game это обычные позиции.
+    """
+
+    def __init__(self, game: Game, starts: Iterable[Tuple[int, ...]], max_depth: Optional[int] = 2,
+                 cancel_cb: Optional[Callable[[], bool]] = None, max_states: int = MAX_STATES):
+        if max_depth is not None and max_depth < 1:
+            raise ValueError("max_depth должен быть >= 1")
+        self.game = game
+        self.max_depth = max_depth
+        self.horizon = 2 * max_depth + 1 if max_depth is not None else None
+        self.max_states = max_states
+        self.complete = True
+        self.expanded = 0  # сколько позиций раскрыто прямым проходом
+
+        self._index: Dict[Tuple[int, ...], int] = {}
+        self._states: List[Tuple[int, ...]] = []
+        self._terminal = bytearray()
+        self._succ: List[Optional[Tuple[int, ...]]] = []
+        self._label = bytearray()
+        self._depth: List[int] = []
+
+        self._build(starts, cancel_cb)
+        self._solve(cancel_cb)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def approx_bytes(self) -> int:
+        """Грубая оценка памяти таблицы: словарь и списки плюс кортежи позиций и ходов."""
+        n = len(self._states)
+        edges = sum(len(s) for s in self._succ if s is not None)
+        heaps = len(self._states[0]) if n else 0
+        return (sys.getsizeof(self._index) + sys.getsizeof(self._states) + sys.getsizeof(self._succ)
+                + sys.getsizeof(self._depth) + len(self._terminal) + len(self._label)
+                + n * (56 + 8 * heaps + 32 * heaps) + edges * 8)
+
+    # ---------- Построение ----------
+    def _add_state(self, state: Tuple[int, ...]) -> int:
+        idx = self._index.get(state)
+        if idx is not None:
+            return idx
+        idx = len(self._states)
+        self._index[state] = idx
+        self._states.append(state)
+        self._terminal.append(1 if self.game.terminal(state) else 0)
+        self._succ.append(None)
+        self._label.append(UNKNOWN)
+        self._depth.append(-1)
+        return idx
+
+    def _build(self, starts: Iterable[Tuple[int, ...]], cancel_cb: Optional[Callable[[], bool]]):
+        layer = []
+        for st in starts:
+            st = self.game.canonical(st)
+            if st not in self._index:
+                layer.append(self._add_state(st))
+        start_ids = set(layer)
+
+        ply = 0
+        while layer:
+            if cancel_cb and cancel_cb():
+                raise RuntimeError("CANCELLED")
+            if self.horizon is not None and ply >= self.horizon:
+                # Дальше горизонта не раскрываем: граф усечён
+                if any(not self._terminal[i] for i in layer):
+                    self.complete = False
+                break
+            nxt_layer = []
+            for idx in layer:
+                if self._terminal[idx] and idx not in start_ids:
+                    continue
+                succ = []
+                for nxt in self.game.successors(self._states[idx]):
+                    known = nxt in self._index
+                    j = self._add_state(nxt)
+                    succ.append(j)
+                    if not known:
+                        nxt_layer.append(j)
+                self._succ[idx] = tuple(succ)
+                self.expanded += 1
+            if len(self._states) > self.max_states:
+                raise ValueError(f"Слишком большой граф позиций: больше {self.max_states}. "
+                                 f"Уменьшите порог или диапазон S.")
+            layer = nxt_layer
+            ply += 1
+
+    def _solve(self, cancel_cb: Optional[Callable[[], bool]]):
+        n = len(self._states)
+        preds: List[List[int]] = [[] for _ in range(n)]
+        counter = [0] * n
+        queue = deque()
+
+        for u in range(n):
+            if self._terminal[u]:
+                # Из терминала никто не ходит: обратных рёбер нет
+                self._label[u] = LOSE
+                self._depth[u] = 0
+                queue.append(u)
+                continue
+            succ = self._succ[u]
+            if succ is None:
+                continue  # не раскрыта (за горизонтом) — значение неизвестно
+            if not succ:
+                self._label[u] = LOSE
+                self._depth[u] = 0
+                queue.append(u)
+                continue
+            counter[u] = len(succ)
+            for v in succ:
+                preds[v].append(u)
+
+        processed = 0
+        while queue:
+            v = queue.popleft()
+            processed += 1
+            if cancel_cb and processed % 65536 == 0 and cancel_cb():
+                raise RuntimeError("CANCELLED")
+            d = self._depth[v]
+            if self._label[v] == LOSE:
+                for u in preds[v]:
+                    if self._label[u] == UNKNOWN:
+                        self._label[u] = WIN
+                        self._depth[u] = d + 1
+                        queue.append(u)
+            else:
+                for u in preds[v]:
+                    if self._label[u] == UNKNOWN:
+                        counter[u] -= 1
+                        if counter[u] == 0:
+                            # Очередь упорядочена по глубине: последний WIN-ход — самый долгий
+                            self._label[u] = LOSE
+                            self._depth[u] = d
+                            queue.append(u)
+
+        if self.complete:
+            # Граф исчерпан: у оставшихся без метки позиций есть ход, не ведущий в WIN соперника,
+            # и нет хода в LOSE — лучшая игра обеих сторон не заканчивается
+            for u in range(n):
+                if self._label[u] == UNKNOWN:
+                    self._label[u] = DRAW
+
+    # ---------- Запросы ----------
+    def _id(self, state: Tuple[int, ...]) -> int:
+        idx = self._index.get(state)
+        if idx is None or (self._succ[idx] is None and not self._terminal[idx]):
+            raise KeyError(f"Позиция {state} не раскрыта в таблице")
+        return idx
+
+    def is_terminal(self, state: Tuple[int, ...]) -> bool:
+        return bool(self._terminal[self._index[state]])
+
+    def moves(self, state: Tuple[int, ...]) -> Tuple[Tuple[int, ...], ...]:
+        succ = self._succ[self._id(state)]
+        if succ is None:
+            return self.game.successors(state)
+        return tuple(self._states[j] for j in succ)
+
+    def has_move_to_terminal(self, state: Tuple[int, ...]) -> bool:
+        succ = self._succ[self._id(state)]
+        if succ is None:
+            return any(self.game.terminal(nxt) for nxt in self.game.successors(state))
+        return any(self._terminal[j] for j in succ)
+
+    def win_depth(self, state: Tuple[int, ...]) -> Optional[int]:
+        """Минимальное число собственных ходов до выигрыша или None."""
+        idx = self._index[state]
+        return self._depth[idx] if self._label[idx] == WIN else None
+
+    def lose_depth(self, state: Tuple[int, ...]) -> Optional[int]:
+        """Сколько ходов соперника нужно для его выигрыша при лучшей защите, или None."""
+        idx = self._index[state]
+        return self._depth[idx] if self._label[idx] == LOSE else None
+
+    def iter_depths(self) -> Iterator[Tuple[Tuple[int, ...], Optional[int], Optional[int]]]:
+        """(позиция, win_depth, lose_depth) для всех позиций таблицы в порядке обхода."""
+        for state, label, d in zip(self._states, self._label, self._depth):
+            yield state, d if label == WIN else None, d if label == LOSE else None
+
+    def outcome(self, state: Tuple[int, ...]) -> Tuple[Optional[str], Optional[int]]:
+        """
+        ('win' | 'lose' | 'draw', глубина) для игрока, который ходит из позиции; у ничьей глубины нет.
+        (None, None) — значение неизвестно (позиция за горизонтом неполной таблицы).
+        """
+        idx = self._index[state]
+        label = self._label[idx]
+        if label in (WIN, LOSE):
+            return OUTCOMES[label], self._depth[idx]
+        return OUTCOMES.get(label), None
+
+    def counts(self) -> Dict[str, int]:
+        """Сколько позиций таблицы получили каждую метку (unknown — без метки)."""
+        out = {"win": 0, "lose": 0, "draw": 0, "unknown": 0}
+        for label in self._label:
+            out[OUTCOMES.get(label, "unknown")] += 1
+        return out
+
+    def can_win_in(self, state: Tuple[int, ...], k: int) -> bool:
+        """Аналог EGESolver._can_win_in по таблице."""
+        if self.max_depth is not None and k > self.max_depth and not self.complete:
+            raise ValueError(f"Таблица построена для глубины не больше {self.max_depth}")
+        d = self.win_depth(state)
+        return d is not None and d <= k
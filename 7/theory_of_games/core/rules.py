@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 
 @dataclass
@@ -13,7 +13,7 @@ class GameRules:
     - adds: целочисленные сдвиги (могут быть отрицательными), 0 исключается
     - mults: множители (целые >= 2)
     - divs: делители (целые >= 2), результат — целочисленное деление (округление вниз)
-    - heaps: количество куч (1 или 2)
+    - heaps: количество куч (в окне — 1 или 2; ядро и GameEngine принимают любое >= 1)
     """
     target_mode: str = "sum"
     target: int = 100
@@ -27,8 +27,8 @@ class GameRules:
     heaps: int = 2
 
     def __post_init__(self):
-        if self.heaps not in (1, 2):
-            raise ValueError("heaps должен быть 1 или 2")
+        if self.heaps < 1:
+            raise ValueError("heaps должен быть >= 1")
 
         if self.finish_cmp not in ("ge", "lt"):
             raise ValueError("finish_cmp должен быть 'ge' или 'lt'")
@@ -46,3 +46,36 @@ class GameRules:
                 raise ValueError("heap_index must be set for target_mode='heap'")
             if not (0 <= self.heap_index < self.heaps):
                 raise ValueError("heap_index вне диапазона куч")
+
+    def is_symmetric(self) -> bool:
+        """
+        Правила не меняются при перестановке куч: все действия применяются к любой куче одинаково,
+        а финиш по 'sum'/'max' от порядка куч не зависит. В режиме 'heap' куча выделена — симметрии нет.
+        """
+        return self.heaps >= 2 and self.target_mode in ("sum", "max")
+
+    def monotone_direction(self) -> Optional[str]:
+        """
+        Направление, в котором ходы ведут к финишу, если оно одно для всех действий:
+        - 'up': финиш 'ge', все сдвиги положительны, делений нет (умножения растят только кучи >= 0);
+        - 'down': финиш 'lt', все сдвиги отрицательны, умножений нет (деления уменьшают только кучи >= 0).
+        Иначе None. Ограничения на знак куч проверяет core.bounds.derive_bounds.
+        """
+        if self.finish_cmp == "ge" and all(a > 0 for a in self.adds) and not self.divs:
+            return "up"
+        if self.finish_cmp == "lt" and all(a < 0 for a in self.adds) and not self.mults:
+            return "down"
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Нормализованные поля правил (для meta, экспорта и ключей кэша)."""
+        return dict(
+            target_mode=self.target_mode,
+            target=self.target,
+            finish_cmp=self.finish_cmp,
+            heap_index=self.heap_index,
+            adds=list(self.adds),
+            mults=list(self.mults),
+            divs=list(self.divs),
+            heaps=self.heaps,
+        )
@@ -1,8 +1,77 @@
-from typing import List, Tuple, Optional, Dict, Callable
+import sys
+from array import array
+from typing import List, Tuple, Optional, Dict, Callable, Iterable, Iterator
 
+from .arrays import ArrayStateSpace, np
+from .bounds import StateBounds, derive_bounds
+from .encoding import StateCodec
 from .game import Game
+from .retrograde import MAX_STATES as RETRO_MAX_STATES, RetrogradeTable
 from .rules import GameRules
 
+METHODS = ("recursive", "retrograde", "numpy")
+
+# Биты ответа для одного S в EGESolver._answers
+TASK_19 = 1
+TASK_20 = 2
+TASK_21 = 4
+
+CANCEL_CHECK_EVERY = 2048
+
+# Плотные таблицы слотов (по клетке прямоугольника границ): у клетки 11 байт таблиц, у позиции в словаре
+# кодов — порядка 130 байт. Плотные таблицы заводятся, только если клеток не больше DENSE_MAX_CELLS
+# (до ~45 МБ) и не больше DENSE_CELLS_PER_START на одно S (иначе прямоугольник почти пуст, и словарь меньше).
+DENSE_MAX_CELLS = 4_000_000
+DENSE_CELLS_PER_START = 384
+
+
+def classify_start(start, is_terminal: Callable, moves: Callable, has_move_to_terminal: Callable,
+                   can_win_in: Callable) -> int:
+    """
+    Биты TASK_* для одной стартовой позиции. Позиция — в том виде, который понимают переданные функции
+    (кортеж для RetrogradeTable, слот для кэшей EGESolver).
+    """
+    # 19: Петя не выигрывает за 1; для любого хода Пети Ваня выигрывает за 1
+    w1_petya = has_move_to_terminal(start)
+    petya_moves = [pm for pm in moves(start) if not is_terminal(pm)]
+    all_vanya_w1 = bool(petya_moves) and all(has_move_to_terminal(pm) for pm in petya_moves)
+    mask = TASK_19 if (not w1_petya) and all_vanya_w1 else 0
+
+    # 20: Петя не выигрывает за 1; выигрывает своим вторым при любой игре Вани
+    w2_petya = can_win_in(start, 2)
+    if (not w1_petya) and w2_petya:
+        mask |= TASK_20
+
+    # 21: у Вани W2 при любой игре Пети; и нет гарантии W1
+    petya_moves_all = moves(start)
+    if any(is_terminal(pm) for pm in petya_moves_all):
+        ok_21 = False
+    else:
+        all_vanya_w2 = all(can_win_in(pm, 2) for pm in petya_moves_all)
+        exists_not_w1 = any(not has_move_to_terminal(pm) for pm in petya_moves_all)
+        ok_21 = all_vanya_w2 and exists_not_w1
+    if ok_21:
+        mask |= TASK_21
+    return mask
+
+
+def classify_space(sp: ArrayStateSpace, starts: "np.ndarray") -> "np.ndarray":
+    """Те же условия, что в classify_start, сразу для массива индексов стартов в ArrayStateSpace."""
+    moves = sp.succ[starts]  # (число стартов, столбцы ходов)
+    term = sp.terminal[moves]
+
+    w1_petya = sp.has_term[starts]
+    # 19: все нетерминальные ходы Пети (и хотя бы один такой есть) дают Ване W1
+    all_vanya_w1 = (~term).any(axis=1) & (term | sp.has_term[moves]).all(axis=1)
+    ok_19 = ~w1_petya & all_vanya_w1
+    # 20
+    ok_20 = ~w1_petya & sp.can_win(starts, 2)
+    # 21
+    ok_21 = (~term.any(axis=1)
+             & sp.can_win(moves, 2).all(axis=1)
+             & (~sp.has_term[moves]).any(axis=1))
+    return (ok_19 * TASK_19) | (ok_20 * TASK_20) | (ok_21 * TASK_21)
+
 
 class EGESolver:
     """
@@ -11,10 +80,27 @@ class EGESolver:
     - start_template: кортеж начальных куч, где ровно одно значение — None (там будет S)
       Примеры: (None,), (5, None)
     - s_min, s_max: диапазон S, включительно
+    - method: 'recursive' — поиск с кэшем для каждого S отдельно;
+              'retrograde' — одна таблица глубин на весь диапазон (см. RetrogradeTable)
+              'numpy' — плотные массивы состояний и векторные слои глубин (см. ArrayStateSpace)
+    - symmetry: при симметричных правилах (sum/max, см. GameRules.is_symmetric) кэшировать и раскрывать
+      позиции с точностью до перестановки куч. Стратегии печатаются в исходных позициях.
+      По умолчанию выключено: в шаблоне старта одна куча фиксирована, (a, b) и (b, a) встречаются редко,
+      а канонизация стоит на каждом ходе. Окупается, когда меняются обе кучи (см. core.grid).
+      На method='numpy' не влияет (там прямоугольная сетка состояний).
+    - bounding: для монотонных правил (GameRules.monotone_direction) заранее вычислить границы
+      нетерминальных позиций (core.bounds) и сворачивать все терминальные ходы в одну позицию.
+    - move_table: общий словарь ходов (см. Game); его можно передать нескольким решателям,
+      правила которых отличаются только порогом (так делает core.sweep).
     """
 
-    def __init__(self, rules: GameRules, start_template: Tuple[Optional[int], ...], s_min: int, s_max: int):
+    def __init__(self, rules: GameRules, start_template: Tuple[Optional[int], ...], s_min: int, s_max: int,
+                 method: str = "recursive", symmetry: bool = False, bounding: bool = True,
+                 move_table: Optional[Dict[Tuple[int, ...], Tuple[Tuple[int, ...], ...]]] = None):
+        if method not in METHODS:
+            raise ValueError(f"method должен быть одним из: {', '.join(METHODS)}")
         self.rules = rules
+        self.method = method
         self.start_tmpl = start_template
         self.s_min = min(s_min, s_max)
         self.s_max = max(s_min, s_max)
@@ -26,35 +112,355 @@ class EGESolver:
 
         self.var_idx = next(i for i, x in enumerate(start_template) if x is None)
 
-        # Game + кэши
-        self.game = Game(self.rules)
-        self._moves_cache: Dict[Tuple[int, ...], Tuple[Tuple[int, ...], ...]] = {}
-        self._w1_cache: Dict[Tuple[int, ...], bool] = {}
-        self._can_cache: Dict[Tuple[Tuple[int, ...], int], bool] = {}
+        self.symmetry = symmetry
+        self.bounding = bounding
+        self.move_table = move_table
+        self._codec = StateCodec(self.rules.heaps)
+        self._answers: Dict[int, int] = {}  # S -> биты TASK_19 | TASK_20 | TASK_21
+        # Отмена внутри глубокого перебора: проверяется раз в CANCEL_CHECK_EVERY раскрытий позиций
+        self._cancel_cb: Optional[Callable[[], bool]] = None
+        self._expanded = 0
+        # Счётчики для stats(): попадания/промахи кэшей и пиковые размеры (сохраняются при сбросе кэшей)
+        self._hits = dict(slots=0, moves=0, w1=0, can_win=0)
+        self._misses = dict(slots=0, w1=0, can_win=0)
+        self._peak = dict(positions=0, move_links=0, can_deep=0, table=0, space=0, approx_bytes=0)
+        # Стратегии строятся по настоящим позициям и от границ/канонизации не зависят — память общая на сессию
+        self._w1_move_memo: Dict[Tuple[int, ...], Optional[Tuple[int, ...]]] = {}
+        self._w2_memo: Dict[Tuple[int, ...], Optional[Tuple[Tuple[int, ...], List[Tuple[Tuple[int, ...], Tuple[int, ...]]]]]] = {}
+        self._tree_memo: Dict[Tuple[int, int], Optional[Dict]] = {}
+        self._setup_game(self.s_min, self.s_max)
+
+    def _setup_game(self, s_min: int, s_max: int) -> None:
+        """
+        Game и пустые кэши позиций для стартов из [s_min, s_max] (ответы _answers не трогаются).
+        Границы монотонной игры зависят от стартов, поэтому запоминается, для какого диапазона они верны.
+        """
+        if hasattr(self, "_codes"):
+            self._note_peaks()
+        self.bounds: Optional[StateBounds] = None
+        if self.bounding:
+            starts = [self._start_from_S(s_min), self._start_from_S(s_max)]
+            self.bounds = derive_bounds(self.rules, starts, self.symmetry and self.rules.is_symmetric())
+        self._bounds_range = (s_min, s_max)
+
+        # Game + кэши.
+        # Каждое состояние получает номер слота; все кэши — плоские array/bytearray, индексируемые слотом.
+        # Состояние упаковывается в целый код: внутри конечного прямоугольника границ — номер клетки
+        # (a - lo0) * W + (b - lo1) для двух куч, иначе — StateCodec (вне прямоугольника — отрицательный).
+        # - Плотные таблицы (см. DENSE_CELLS_PER_START): слот клетки — сам её номер, таблицы заведены
+        #   сразу на все клетки, словаря нет.
+        # - Остальные позиции получают слоты после клеток через словарь код -> слот; сами позиции не хранятся.
+        # Кэши и таблицы живут в канонических позициях (self.game.canonical); для симметричных правил
+        # (a, b) и (b, a) — одна запись. Стратегии (_moves, _find_*) ходят по настоящим позициям.
+        self.game = Game(self.rules, symmetry=self.symmetry, bounds=self.bounds, move_table=self.move_table)
+        box = self.bounds.size() if self.bounds is not None else None
+        cells = 0
+        if box is not None and box <= min(DENSE_MAX_CELLS, DENSE_CELLS_PER_START * (s_max - s_min + 1)):
+            cells = box
+        self._box = box is not None
+        self._cells = cells
+        self._sentinel = self.game.canonical(self.bounds.sentinel) if self.bounds is not None else None
+        self._box_lo: Tuple[int, ...] = ()
+        self._box_strides: Tuple[int, ...] = ()
+        if self._box:
+            lo, hi = self.bounds.lo, self.bounds.hi
+            strides = [1] * len(lo)
+            for i in range(len(lo) - 2, -1, -1):
+                strides[i] = strides[i + 1] * (hi[i + 1] - lo[i + 1] + 1)
+            self._box_lo, self._box_strides = tuple(lo), tuple(strides)
+        self._positions = 0  # сколько слотов уже встречалось (клетки считаются при первом обращении)
+        self._seen = bytearray(cells)  # клетка -> 1, если позиция уже встречалась
+        self._slot_of: Dict[int, int] = {}  # код -> слот (только для слотов после клеток)
+        self._codes: List[int] = []  # слот - cells -> код
+        self._terminal = bytearray(cells)  # слот -> 0/1
+        self._moves_off = array("i", [-1]) * cells  # слот -> начало ходов в _moves_flat (-1 — ещё не считали)
+        self._moves_cnt = array("H", bytes(2 * cells))  # слот -> число ходов
+        self._moves_flat = array("i")  # слоты-преемники подряд
+        self._w1 = bytearray(cells)  # слот -> 0 неизвестно / 1 нет / 2 есть ход в терминал
+        self._can_known = bytearray(cells)  # слот -> битовая маска посчитанных k (k < 8)
+        self._can_val = bytearray(cells)  # слот -> битовая маска k, при которых выигрыш за k
+        self._can_deep: Dict[Tuple[int, int], bool] = {}  # (слот, k) для k >= 8
+        self._table: Optional[RetrogradeTable] = None
+        self._outcomes: Optional[RetrogradeTable] = None  # полный граф (outcome_table)
+        self._space: Optional[ArrayStateSpace] = None
+        # Слот стража заводится сразу: в него сворачиваются все терминальные ходы
+        self._sentinel_slot = self._slot(self._sentinel) if self._sentinel is not None else -1
 
     def _start_from_S(self, S: int) -> Tuple[int, ...]:
         st = list(self.start_tmpl)
         st[self.var_idx] = S
         return tuple(st)
 
-    def _moves(self, state: Tuple[int, ...]) -> Tuple[Tuple[int, ...], ...]:
-        res = self._moves_cache.get(state)
-        if res is not None:
-            return res
-        res = tuple(self.game.iter_moves(state))
-        self._moves_cache[state] = res
+    # ---------- Слоты ----------
+    def _code(self, state: Tuple[int, ...]) -> int:
+        """Целый код канонического состояния: номер клетки прямоугольника границ или код StateCodec."""
+        if not self._box:
+            return self._codec.encode(state)
+        if self.bounds.contains(state):
+            return sum((v - lo) * st for v, lo, st in zip(state, self._box_lo, self._box_strides))
+        return -1 - self._codec.encode(state)
+
+    def _decode(self, code: int) -> Tuple[int, ...]:
+        if not self._box:
+            return self._codec.decode(code)
+        if code < 0:
+            return self._codec.decode(-1 - code)
+        vals = []
+        for lo, st in zip(self._box_lo, self._box_strides):
+            v, code = divmod(code, st)
+            vals.append(lo + v)
+        return tuple(vals)
+
+    def _slot(self, state: Tuple[int, ...]) -> int:
+        state = self.game.canonical(state)
+        code = self._code(state)
+        if 0 <= code < self._cells:
+            if self._seen[code]:
+                self._hits["slots"] += 1
+            else:
+                self._misses["slots"] += 1
+                self._seen[code] = 1
+                self._positions += 1
+                self._terminal[code] = 1 if self.game.terminal(state) else 0
+            return code
+        slot = self._slot_of.get(code)
+        if slot is not None:
+            self._hits["slots"] += 1
+            return slot
+        return self._new_slot(code, self.game.terminal(state))
+
+    def _new_slot(self, code: int, terminal: bool) -> int:
+        """Завести слот после клеток для кода, которого ещё нет в _slot_of."""
+        self._misses["slots"] += 1
+        slot = self._cells + len(self._codes)
+        self._slot_of[code] = slot
+        self._codes.append(code)
+        self._positions += 1
+        self._reserve(slot + 1)
+        if terminal:
+            self._terminal[slot] = 1
+        return slot
+
+    def _reserve(self, size: int) -> None:
+        """Таблицы — не короче size слотов; слоты после клеток добавляются с запасом (удвоением)."""
+        have = len(self._terminal)
+        if have >= size:
+            return
+        n = max(size - have, have - self._cells + 64)
+        self._terminal.extend(bytes(n))
+        self._moves_off.extend(array("i", [-1]) * n)
+        self._moves_cnt.extend(array("H", bytes(2 * n)))
+        self._w1.extend(bytes(n))
+        self._can_known.extend(bytes(n))
+        self._can_val.extend(bytes(n))
+
+    def _state(self, slot: int) -> Tuple[int, ...]:
+        code = slot if slot < self._cells else self._codes[slot - self._cells]
+        if code >= 0 and len(self._box_lo) == 2:
+            a, b = divmod(code, self._box_strides[0])
+            return self._box_lo[0] + a, self._box_lo[1] + b
+        return self._decode(code)
+
+    def _expand(self, slot: int) -> int:
+        """Начало ходов слота в _moves_flat (число ходов — _moves_cnt[slot]); при первом обращении раскрыть."""
+        off = self._moves_off[slot]
+        if off >= 0:
+            self._hits["moves"] += 1
+            return off
+        self._expanded += 1
+        if self._cancel_cb and self._expanded % CANCEL_CHECK_EVERY == 0 and self._cancel_cb():
+            raise RuntimeError("CANCELLED")
+        # game.successors уже отдаёт канонические позиции
+        flat = self._moves_flat
+        off = len(flat)
+        moves = self.game.successors(self._state(slot))
+        if self._box:
+            self._link_box(moves)
+        else:
+            get, encode, terminal = self._slot_of.get, self._codec.encode, self.game.terminal
+            found = 0
+            for nxt in moves:
+                code = encode(nxt)
+                s = get(code)
+                if s is None:
+                    s = self._new_slot(code, terminal(nxt))
+                else:
+                    found += 1
+                flat.append(s)
+            self._hits["slots"] += found
+        self._moves_off[slot] = off
+        self._moves_cnt[slot] = len(flat) - off
+        return off
+
+    def _link_box(self, moves: Tuple[Tuple[int, ...], ...]) -> None:
+        """
+        Дописать в _moves_flat слоты ходов игры с конечным прямоугольником границ. Ход свёрнутой игры —
+        либо страж терминалов, либо нетерминальная позиция внутри границ, поэтому код — сразу номер клетки.
+        """
+        flat = self._moves_flat
+        sentinel, sentinel_slot, cells = self._sentinel, self._sentinel_slot, self._cells
+        seen, slot_of, codes = self._seen, self._slot_of, self._codes
+        lo, strides = self._box_lo, self._box_strides
+        if len(lo) == 2:
+            w, base = strides[0], lo[0] * strides[0] + lo[1]
+            move_codes = [-1 if nxt == sentinel else nxt[0] * w + nxt[1] - base for nxt in moves]
+        elif len(lo) == 1:
+            move_codes = [-1 if nxt == sentinel else nxt[0] - lo[0] for nxt in moves]
+        else:
+            move_codes = [-1 if nxt == sentinel else sum((v - l) * st for v, l, st in zip(nxt, lo, strides))
+                          for nxt in moves]
+        found = created = 0
+        for code in move_codes:
+            if code < 0:
+                flat.append(sentinel_slot)
+                found += 1
+            elif cells:
+                if seen[code]:
+                    found += 1
+                else:
+                    seen[code] = 1
+                    created += 1
+                flat.append(code)
+            else:
+                s = slot_of.get(code)
+                if s is None:
+                    # новые позиции внутри границ нетерминальны — таблицы дописываются после цикла
+                    s = slot_of[code] = cells + len(codes)
+                    codes.append(code)
+                    created += 1
+                else:
+                    found += 1
+                flat.append(s)
+        if created and not cells:
+            self._reserve(cells + len(codes))
+        self._positions += created
+        self._misses["slots"] += created
+        self._hits["slots"] += found
+
+    def _moves_s(self, slot: int) -> array:
+        """Ходы слота копией (для классификации стартов); горячие циклы идут по _moves_flat через _expand."""
+        off = self._expand(slot)
+        return self._moves_flat[off:off + self._moves_cnt[slot]]
+
+    def _w1_s(self, slot: int) -> bool:
+        cached = self._w1[slot]
+        if cached:
+            self._hits["w1"] += 1
+            return cached == 2
+        self._misses["w1"] += 1
+        off = self._expand(slot)
+        terminal, flat = self._terminal, self._moves_flat
+        res = any(terminal[flat[i]] for i in range(off, off + self._moves_cnt[slot]))
+        self._w1[slot] = 2 if res else 1
         return res
 
+    def _can_s(self, slot: int, k: int) -> bool:
+        if k < 8:
+            bit = 1 << k
+            if self._can_known[slot] & bit:
+                self._hits["can_win"] += 1
+                return bool(self._can_val[slot] & bit)
+        elif (slot, k) in self._can_deep:
+            self._hits["can_win"] += 1
+            return self._can_deep[(slot, k)]
+
+        self._misses["can_win"] += 1
+        res = False
+        terminal, flat, cnt, moves_off = self._terminal, self._moves_flat, self._moves_cnt, self._moves_off
+        if not terminal[slot] and k > 0:
+            off = self._expand(slot)
+            for i in range(off, off + cnt[slot]):
+                s1 = flat[i]
+                if terminal[s1]:
+                    res = True
+                    break
+                # ответы соперника: ходов нет — он проиграл; иначе каждый ответ должен вести к выигрышу за k-1
+                off1 = moves_off[s1]
+                if off1 < 0:
+                    off1 = self._expand(s1)
+                else:
+                    self._hits["moves"] += 1
+                for j in range(off1, off1 + cnt[s1]):
+                    if not self._can_s(flat[j], k - 1):
+                        break
+                else:
+                    res = True
+                    break
+
+        if k < 8:
+            self._can_known[slot] |= bit
+            if res:
+                self._can_val[slot] |= bit
+        else:
+            self._can_deep[(slot, k)] = res
+        return res
+
+    # ---------- Статистика ----------
+    def approx_bytes(self) -> int:
+        """Грубая оценка памяти кэшей позиций (словарь слотов, плоские таблицы, таблица/массивы методов)."""
+        total = (sys.getsizeof(self._slot_of) + sys.getsizeof(self._codes) + 32 * len(self._codes)
+                 + len(self._seen)
+                 + sys.getsizeof(self._can_deep) + 64 * len(self._can_deep)
+                 + len(self._terminal) + len(self._w1) + len(self._can_known) + len(self._can_val))
+        for arr in (self._moves_off, self._moves_cnt, self._moves_flat):
+            total += arr.buffer_info()[1] * arr.itemsize
+        if self._table is not None:
+            total += self._table.approx_bytes()
+        if self._space is not None:
+            total += self._space.approx_bytes()
+        return total
+
+    def _note_peaks(self) -> Dict[str, int]:
+        peak = self._peak
+        peak["positions"] = max(peak["positions"], self._positions)
+        peak["move_links"] = max(peak["move_links"], len(self._moves_flat))
+        peak["can_deep"] = max(peak["can_deep"], len(self._can_deep))
+        peak["table"] = max(peak["table"], len(self._table) if self._table is not None else 0)
+        peak["space"] = max(peak["space"], self._space.n if self._space is not None else 0)
+        peak["approx_bytes"] = max(peak["approx_bytes"], self.approx_bytes())
+        return peak
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Счётчики работы решателя (накопительные за всю сессию):
+        - caches: попадания/промахи кэшей слотов, ходов, W1 и «выигрыш за k»;
+          промах кэша ходов — раскрытие позиции (expanded);
+        - expanded: раскрыто позиций (recursive), плюс раскрытия таблицы (retrograde) или ячейки массивов (numpy);
+        - positions: позиций в кэше, таблице и массивах сейчас; peak: пиковые размеры; approx_bytes: память сейчас.
+        """
+        misses = dict(self._misses, moves=self._expanded)
+        caches = {}
+        for name, hits in self._hits.items():
+            miss = misses[name]
+            caches[name] = dict(hits=hits, misses=miss, hit_rate=hits / (hits + miss) if hits + miss else 0.0)
+        hits_all = sum(self._hits.values())
+        lookups = hits_all + sum(misses.values())
+        positions, expanded = self._positions, self._expanded
+        if self._table is not None:
+            positions += len(self._table)
+            expanded += self._table.expanded
+        if self._space is not None:
+            positions += self._space.n
+            expanded += self._space.n
+        return dict(
+            method=self.method,
+            positions=positions,
+            expanded=expanded,
+            caches=caches,
+            hit_rate=hits_all / lookups if lookups else 0.0,
+            peak=dict(self._note_peaks()),
+            approx_bytes=self.approx_bytes(),
+            bounded=self.bounds is not None,
+            symmetric=self.game.symmetric,
+        )
+
+    # ---------- Те же операции над кортежами ----------
+    def _moves(self, state: Tuple[int, ...]) -> Tuple[Tuple[int, ...], ...]:
+        """Настоящие ходы из позиции (не канонические и без свёртки терминалов) — для печати стратегий."""
+        return self.game.plain_successors(state)
+
     def _has_move_to_terminal(self, state: Tuple[int, ...]) -> bool:
-        cached = self._w1_cache.get(state)
-        if cached is not None:
-            return cached
-        for nxt in self._moves(state):
-            if self.game.is_terminal(nxt):
-                self._w1_cache[state] = True
-                return True
-        self._w1_cache[state] = False
-        return False
+        return self._w1_s(self._slot(state))
 
     def _can_win_in(self, state: Tuple[int, ...], k: int) -> bool:
         """
@@ -65,31 +471,26 @@ class EGESolver:
             * если s1 терминал -> True
             * иначе для всех ответов соперника s2: _can_win_in(s2, k-1) == True
         """
-        key = (state, k)
-        if key in self._can_cache:
-            return self._can_cache[key]
+        return self._can_s(self._slot(state), k)
 
-        if self.game.is_terminal(state):
-            self._can_cache[key] = False
-            return False
-        if k == 0:
-            self._can_cache[key] = False
-            return False
-
-        for s1 in self._moves(state):
-            if self.game.is_terminal(s1):
-                self._can_cache[key] = True
-                return True
-            opp_moves = self._moves(s1)
-            if not opp_moves:
-                self._can_cache[key] = True
-                return True
-            if all(self._can_win_in(s2, k - 1) for s2 in opp_moves):
-                self._can_cache[key] = True
-                return True
-
-        self._can_cache[key] = False
-        return False
+    def position_depths(self, state: Tuple[int, ...], max_k: int = 2) -> Tuple[Optional[int], Optional[int]]:
+        """
+        (win_depth, lose_depth) позиции для игрока, который из неё ходит, в пределах max_k — по кэшам решателя.
+        win_depth — минимальное k с _can_win_in(state, k); lose_depth — минимальное k, при котором
+        на любой ход соперник выигрывает за k (0 — терминал или нет ходов). Не найдено — None.
+        """
+        slot = self._slot(state)
+        if self._terminal[slot]:
+            return None, 0
+        moves = self._moves_s(slot)
+        if not moves:
+            return None, 0
+        for k in range(1, max_k + 1):
+            if self._can_s(slot, k):
+                return k, None
+            if all(self._can_s(s1, k) for s1 in moves):
+                return None, k
+        return None, None
 
     # ---------- Форматирование/стратегии ----------
     def fmt_state(self, st: Tuple[int, ...]) -> str:
@@ -99,10 +500,38 @@ class EGESolver:
         return self.game.describe_move(a, b)
 
     def _find_w1_move(self, state: Tuple[int, ...]) -> Optional[Tuple[int, ...]]:
+        if state in self._w1_move_memo:
+            return self._w1_move_memo[state]
+        found = None
         for nxt in self._moves(state):
             if self.game.is_terminal(nxt):
-                return nxt
-        return None
+                found = nxt
+                break
+        self._w1_move_memo[state] = found
+        return found
+
+    def _w2_witness_full(self, state: Tuple[int, ...]) -> Optional[Tuple[Tuple[int, ...], List[Tuple[Tuple[int, ...], Tuple[int, ...]]]]]:
+        """(первый_ход, все [(ответ_соперника, наш_ход_в_терминал)]) или None; запоминается по позиции."""
+        if state in self._w2_memo:
+            return self._w2_memo[state]
+        found = None
+        for s1 in self._moves(state):
+            if self.game.is_terminal(s1):
+                found = (s1, [])  # выигрыш сразу
+                break
+            opp_moves = self._moves(s1)
+            replies: List[Tuple[Tuple[int, ...], Tuple[int, ...]]] = []
+            for s2 in opp_moves:
+                # Ход соперника в терминал — его победа, даже если из терминала формально есть ходы
+                win_in_1 = None if self.game.is_terminal(s2) else self._find_w1_move(s2)
+                if not win_in_1:
+                    break
+                replies.append((s2, win_in_1))
+            else:
+                found = (s1, replies)
+                break
+        self._w2_memo[state] = found
+        return found
 
     def _find_w2_witness(
             self, state: Tuple[int, ...], limit_replies: int = 6
@@ -112,24 +541,11 @@ class EGESolver:
         Возвращает:
           (первый_ход, список_примеров[(ответ_соперника, наш_ход_в_терминал)], всего_ответов_соперника)
         """
-        for s1 in self._moves(state):
-            opp_moves = self._moves(s1)
-            if not opp_moves:
-                if self.game.is_terminal(s1):
-                    continue
-                return s1, [], 0
-            ok_for_all = True
-            examples: List[Tuple[Tuple[int, ...], Tuple[int, ...]]] = []
-            for s2 in opp_moves:
-                win_in_1 = self._find_w1_move(s2)
-                if not win_in_1:
-                    ok_for_all = False
-                    break
-                if len(examples) < limit_replies:
-                    examples.append((s2, win_in_1))
-            if ok_for_all:
-                return s1, examples, len(opp_moves)
-        return None
+        full = self._w2_witness_full(state)
+        if full is None:
+            return None
+        s1, replies = full
+        return s1, replies[:limit_replies], len(replies)
 
     def sample_strategy_19(self, S: int, limit_examples: int = 8) -> Optional[str]:
         start = self._start_from_S(S)
@@ -162,26 +578,25 @@ class EGESolver:
             return None
         if not self._can_win_in(start, 2):
             return None
-        for p1 in self._moves(start):
-            if self.game.is_terminal(p1):
-                continue
-            w2 = self._find_w2_witness(p1, limit_replies=limit_examples)
-            if not w2:
-                continue
-            first, examples, total = w2
-            lines = [f"Старт: {self.fmt_state(start)}",
-                     f"Петя (1-й ход): {self.describe_move(start, p1)} → {self.fmt_state(p1)}",
-                     "Далее при любом ходе Вани у Пети есть победный 2-й ход. Примеры:"]
-            shown = 0
-            for v1, p2 in examples:
-                lines.append(f"  Ваня: {self.describe_move(p1, v1)} → {self.fmt_state(v1)}")
-                lines.append(f"  Петя: {self.describe_move(v1, p2)} → {self.fmt_state(p2)} (терминал)")
-                shown += 1
-            hidden = total - shown
-            if hidden > 0:
-                lines.append(f"  … и ещё {hidden} вариантов ответов Вани, при которых Петя выигрывает вторым ходом.")
+        w2 = self._find_w2_witness(start, limit_replies=limit_examples)
+        if not w2:
+            return None
+        p1, examples, total = w2
+        lines = [f"Старт: {self.fmt_state(start)}",
+                 f"Петя (1-й ход): {self.describe_move(start, p1)} → {self.fmt_state(p1)}"]
+        if not total:
+            lines.append("У Вани нет ходов — Петя выиграл.")
             return "\n".join(lines)
-        return None
+        lines.append("Далее при любом ходе Вани у Пети есть победный 2-й ход. Примеры:")
+        shown = 0
+        for v1, p2 in examples:
+            lines.append(f"  Ваня: {self.describe_move(p1, v1)} → {self.fmt_state(v1)}")
+            lines.append(f"  Петя: {self.describe_move(v1, p2)} → {self.fmt_state(p2)} (терминал)")
+            shown += 1
+        hidden = total - shown
+        if hidden > 0:
+            lines.append(f"  … и ещё {hidden} вариантов ответов Вани, при которых Петя выигрывает вторым ходом.")
+        return "\n".join(lines)
 
     def sample_strategy_21(self, S: int, limit_examples: int = 6) -> Optional[str]:
         start = self._start_from_S(S)
@@ -212,46 +627,249 @@ class EGESolver:
             return "\n".join(lines)
         return None
 
+    def _tree_node(self, prev: Optional[Tuple[int, ...]], state: Tuple[int, ...], player: Optional[str]) -> Dict:
+        node: Dict = dict(state=list(state), terminal=self.game.is_terminal(state), children=[])
+        if prev is not None:
+            node.update(player=player, move=self.describe_move(prev, state))
+        return node
+
+    def _w2_subtree(self, node: Dict, state: Tuple[int, ...], me: str, opp: str) -> bool:
+        """Дописать к node выигрыш игрока me не более чем за 2 хода из state; False — такого нет."""
+        w1 = self._find_w1_move(state)
+        if w1 is not None:
+            node["children"].append(self._tree_node(state, w1, me))
+            return True
+        full = self._w2_witness_full(state)
+        if full is None:
+            return False
+        s1, replies = full
+        first = self._tree_node(state, s1, me)
+        for s2, finish in replies:
+            reply = self._tree_node(s1, s2, opp)
+            reply["children"].append(self._tree_node(s2, finish, me))
+            first["children"].append(reply)
+        node["children"].append(first)
+        return True
+
+    def strategy_tree(self, S: int, task: int) -> Optional[Dict]:
+        """
+        Полное дерево выигрышной стратегии для задания 19/20/21 и данного S (для экспорта в JSON).
+        Узел: {state, terminal, children[, player, move]}; у корня (старта) нет player/move.
+        Ходы победителя — по одному (выбранная стратегия), ходы проигрывающего — все.
+        None — если S не подходит под задание. Дерево запоминается.
+        """
+        key = (task, S)
+        if key in self._tree_memo:
+            return self._tree_memo[key]
+        start = self._start_from_S(S)
+        root = self._tree_node(None, start, None)
+        ok = False
+        if task == 19:
+            petya_moves = [pm for pm in self._moves(start) if not self.game.is_terminal(pm)]
+            ok = not self._has_move_to_terminal(start) and bool(petya_moves)
+            for pm in petya_moves if ok else ():
+                v1 = self._find_w1_move(pm)
+                if v1 is None:
+                    ok = False
+                    break
+                child = self._tree_node(start, pm, "Петя")
+                child["children"].append(self._tree_node(pm, v1, "Ваня"))
+                root["children"].append(child)
+        elif task == 20:
+            ok = (not self._has_move_to_terminal(start) and self._can_win_in(start, 2)
+                  and self._w2_subtree(root, start, "Петя", "Ваня"))
+        elif task == 21:
+            petya_moves = self._moves(start)
+            ok = (not any(self.game.is_terminal(pm) for pm in petya_moves)
+                  and any(not self._has_move_to_terminal(pm) for pm in petya_moves))
+            for pm in petya_moves if ok else ():
+                child = self._tree_node(start, pm, "Петя")
+                if not self._w2_subtree(child, pm, "Ваня", "Петя"):
+                    ok = False
+                    break
+                root["children"].append(child)
+        else:
+            raise ValueError("task должен быть 19, 20 или 21")
+        tree = dict(task=task, S=S, tree=root) if ok else None
+        self._tree_memo[key] = tree
+        return tree
+
     # ---------- Перебор ----------
-    def solve_all(
+    def set_range(self, s_min: int, s_max: int) -> None:
+        """
+        Сменить диапазон S. Кэши позиций и уже найденные ответы сохраняются.
+        Исключение — границы монотонной игры: если новые старты выходят за диапазон, для которого
+        они считались, границы пересчитываются на объединение диапазонов, а кэши позиций сбрасываются.
+        """
+        self.s_min = min(s_min, s_max)
+        self.s_max = max(s_min, s_max)
+        lo, hi = self._bounds_range
+        if self.bounds is not None and (self.s_min < lo or self.s_max > hi):
+            self._setup_game(min(lo, self.s_min), max(hi, self.s_max))
+
+    def pending_S(self) -> List[int]:
+        """S из текущего диапазона, для которых ответ ещё не считали."""
+        return [S for S in range(self.s_min, self.s_max + 1) if S not in self._answers]
+
+    def pending_ranges(self) -> List[Tuple[int, int]]:
+        """pending_S, сжатые в отрезки [lo, hi] подряд идущих значений."""
+        ranges: List[Tuple[int, int]] = []
+        for S in self.pending_S():
+            if ranges and ranges[-1][1] == S - 1:
+                ranges[-1] = (ranges[-1][0], S)
+            else:
+                ranges.append((S, S))
+        return ranges
+
+    def iter_task(self, bit: int) -> Iterator[int]:
+        """S текущего диапазона (по возрастанию), в ответе которых уже есть бит TASK_* (без копии списков)."""
+        answers = self._answers
+        return (S for S in range(self.s_min, self.s_max + 1) if answers.get(S, 0) & bit)
+
+    def iter_depths(self) -> Iterator[Tuple[Tuple[int, ...], Optional[int], Optional[int]]]:
+        """
+        Таблица глубин последнего расчёта методом retrograde или numpy: (позиция, win_depth, lose_depth).
+        Позиции — как в таблице (канонические при симметрии); позиция-страж свёрнутых терминалов пропускается.
+        """
+        if self._table is not None:
+            rows = self._table.iter_depths()
+        elif self._space is not None:
+            rows = self._space.iter_depths()
+        else:
+            raise ValueError("Таблица глубин есть только после расчёта методом retrograde или numpy")
+        sentinel = self.bounds.sentinel if self.bounds is not None else None
+        return (row for row in rows if row[0] != sentinel)
+
+    def remember(self, S_values: Iterable[int], s19: List[int], s20: List[int], s21: List[int]) -> None:
+        """Запомнить ответы, посчитанные для S_values (например, в другом процессе)."""
+        in19, in20, in21 = set(s19), set(s20), set(s21)
+        for S in S_values:
+            self._answers[S] = ((TASK_19 if S in in19 else 0)
+                                | (TASK_20 if S in in20 else 0)
+                                | (TASK_21 if S in in21 else 0))
+
+    def build_table(self, S_values: Iterable[int],
+                    cancel_cb: Optional[Callable[[], bool]] = None) -> RetrogradeTable:
+        """Ретроградная таблица глубин для стартов с данными S."""
+        starts = [self._start_from_S(S) for S in S_values]
+        self._table = RetrogradeTable(self.game, starts, max_depth=2, cancel_cb=cancel_cb)
+        return self._table
+
+    def outcome_table(self, S_values: Optional[Iterable[int]] = None,
+                      cancel_cb: Optional[Callable[[], bool]] = None,
+                      max_states: int = RETRO_MAX_STATES) -> RetrogradeTable:
+        """
+        Полный граф позиций от стартов с данными S (по умолчанию — весь диапазон) с метками win/lose/draw
+        и точными глубинами (RetrogradeTable с max_depth=None). Годится и для правил с циклами
+        (отрицательные сдвиги вместе с умножением или делением), где _can_win_in ограничен глубиной.
+        Если граф больше max_states позиций — ValueError.
+        """
+        if S_values is None:
+            S_values = range(self.s_min, self.s_max + 1)
+        starts = [self._start_from_S(S) for S in S_values]
+        self._outcomes = RetrogradeTable(self.game, starts, max_depth=None, cancel_cb=cancel_cb,
+                                         max_states=max_states)
+        return self._outcomes
+
+    def outcome(self, state: Tuple[int, ...]) -> Tuple[Optional[str], Optional[int]]:
+        """('win' | 'lose' | 'draw', глубина) позиции для игрока, который из неё ходит, по outcome_table."""
+        if self._outcomes is None:
+            raise ValueError("Сначала постройте полный граф (outcome_table)")
+        return self._outcomes.outcome(self.game.canonical(state))
+
+    def build_space(self, S_values: Iterable[int],
+                    cancel_cb: Optional[Callable[[], bool]] = None) -> ArrayStateSpace:
+        """Массивная таблица состояний для стартов с данными S."""
+        starts = [self._start_from_S(S) for S in S_values]
+        self._space = ArrayStateSpace(self.game, starts, max_depth=2, cancel_cb=cancel_cb)
+        return self._space
+
+    def _classify_numpy(
             self,
+            S_values: List[int],
             progress_cb: Optional[Callable[[int, int], None]] = None,
             cancel_cb: Optional[Callable[[], bool]] = None,
-    ) -> Tuple[List[int], List[int], List[int]]:
-        s_list_19: List[int] = []
-        s_list_20: List[int] = []
-        s_list_21: List[int] = []
+            answer_cb: Optional[Callable[[int, int], None]] = None,
+    ) -> None:
+        """Те же условия 19/20/21, что и в _classify, но сразу для всех S массивами."""
+        sp = self.build_space(S_values, cancel_cb)
+        starts = np.array([sp.index(self._start_from_S(S)) for S in S_values], dtype=np.int64)
+        masks = classify_space(sp, starts)
+        for S, mask in zip(S_values, masks.tolist()):
+            self._answers[S] = mask
+            if answer_cb:
+                answer_cb(S, mask)
+        if progress_cb:
+            progress_cb(len(S_values), len(S_values))
 
-        total = self.s_max - self.s_min + 1
-        for idx, S in enumerate(range(self.s_min, self.s_max + 1), start=1):
+    def _classify(
+            self,
+            S_values: List[int],
+            progress_cb: Optional[Callable[[int, int], None]] = None,
+            cancel_cb: Optional[Callable[[], bool]] = None,
+            answer_cb: Optional[Callable[[int, int], None]] = None,
+    ) -> None:
+        """Классифицировать S_values по одному; ответ каждого S сразу попадает в _answers и answer_cb."""
+        # Позиции внутри цикла — кортежи (retrograde) или слоты кэша (recursive)
+        if self.method == "retrograde":
+            table = self.build_table(S_values, cancel_cb)
+            node = self.game.canonical
+            is_terminal = self.game.terminal
+            moves = table.moves
+            has_move_to_terminal = table.has_move_to_terminal
+            can_win_in = table.can_win_in
+        else:
+            node = self._slot
+            is_terminal = self._terminal.__getitem__
+            moves = self._moves_s
+            has_move_to_terminal = self._w1_s
+            can_win_in = self._can_s
+
+        total = len(S_values)
+        for idx, S in enumerate(S_values, start=1):
             if cancel_cb and cancel_cb():
                 raise RuntimeError("CANCELLED")
             if progress_cb:
                 progress_cb(idx, total)
 
-            start = self._start_from_S(S)
+            mask = classify_start(node(self._start_from_S(S)), is_terminal, moves, has_move_to_terminal, can_win_in)
+            self._answers[S] = mask
+            if answer_cb:
+                answer_cb(S, mask)
 
-            # 19: Петя не выигрывает за 1; для любого хода Пети Ваня выигрывает за 1
-            w1_petya = self._has_move_to_terminal(start)
-            petya_moves = [pm for pm in self._moves(start) if not self.game.is_terminal(pm)]
-            all_vanya_w1 = bool(petya_moves) and all(self._has_move_to_terminal(pm) for pm in petya_moves)
-            if (not w1_petya) and all_vanya_w1:
-                s_list_19.append(S)
+    def solve_all(
+            self,
+            progress_cb: Optional[Callable[[int, int], None]] = None,
+            cancel_cb: Optional[Callable[[], bool]] = None,
+            answer_cb: Optional[Callable[[int, int], None]] = None,
+    ) -> Tuple[List[int], List[int], List[int]]:
+        """
+        Ответы 19/20/21 для [s_min, s_max]. Считаются только S, которых ещё нет в памяти решателя,
+        поэтому после set_range повторный вызов досчитывает лишь новые значения.
+        - answer_cb(S, биты TASK_*) вызывается для каждого нового S сразу после его классификации;
+        - cancel_cb проверяется и между S, и внутри перебора одного S.
+        Уже классифицированные S сохраняются и после отмены.
+        """
+        todo = self.pending_S()
+        if todo:
+            self._cancel_cb = cancel_cb
+            try:
+                if self.method == "numpy":
+                    self._classify_numpy(todo, progress_cb, cancel_cb, answer_cb)
+                else:
+                    self._classify(todo, progress_cb, cancel_cb, answer_cb)
+            finally:
+                self._cancel_cb = None
 
-            # 20: Петя не выигрывает за 1; выигрывает своим вторым при любой игре Вани
-            w2_petya = self._can_win_in(start, 2)
-            if (not w1_petya) and w2_petya:
+        s_list_19: List[int] = []
+        s_list_20: List[int] = []
+        s_list_21: List[int] = []
+        for S in range(self.s_min, self.s_max + 1):
+            mask = self._answers[S]
+            if mask & TASK_19:
+                s_list_19.append(S)
+            if mask & TASK_20:
                 s_list_20.append(S)
-
-            # 21: у Вани W2 при любой игре Пети; и нет гарантии W1
-            petya_moves_all = self._moves(start)
-            if any(self.game.is_terminal(pm) for pm in petya_moves_all):
-                ok_21 = False
-            else:
-                all_vanya_w2 = all(self._can_win_in(pm, 2) for pm in petya_moves_all)
-                exists_not_w1 = any(not self._has_move_to_terminal(pm) for pm in petya_moves_all)
-                ok_21 = all_vanya_w2 and exists_not_w1
-            if ok_21:
+            if mask & TASK_21:
                 s_list_21.append(S)
-
         return s_list_19, s_list_20, s_list_21
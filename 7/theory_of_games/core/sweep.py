@@ -0,0 +1,271 @@
+"""
+Перебор наборов правил (sweep): какие GameRules дают «красивые» ответы 19/20/21.
+
+Спецификация — словарь (или JSON-файл для python -m core.sweep):
+  {
+    "base": {"target_mode": "sum", "heaps": 2, "adds": [1], "mults": [2]},   # поля GameRules
+    "grid": {                                    # варьируемые поля: список значений или диапазон
+      "target": {"range": [40, 120]},            # [lo, hi] или [lo, hi, step], включительно
+      "mults": [[2], [3], [2, 3]]
+    },
+    "start_template": [5, null], "s_min": 1, "s_max": 100,
+    "method": "recursive",
+    "want": {"19": 1, "20": 2, "21": [1, 3]}    # число S для задания: точно или [min, max]
+  }
+
+Выход — JSONL, строка на вариант (в порядке готовности):
+  {"key": ..., "rules": {...}, "counts": {"19": .., "20": .., "21": ..}, "match": true/false,
+   "task19": [...], "task20": [...], "task21": [...]}  или  {"key": ..., "rules": {...}, "error": "..."}.
+При повторном запуске с тем же файлом уже посчитанные ключи пропускаются (resume).
+
+Варианты, отличающиеся только порогом, решаются в одном процессе с общим словарём ходов
+(ходы не зависят от порога — см. Game, параметр move_table).
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .parallel import mp_context
+from .rules import GameRules
+from .solver import EGESolver, METHODS
+
+Want = Dict[str, Any]
+Results = Tuple[List[int], List[int], List[int]]
+
+RULE_FIELDS = ("target_mode", "target", "finish_cmp", "heap_index", "adds", "mults", "divs", "heaps")
+
+# Сколько вариантов с общим словарём ходов отдаётся одному процессу за раз
+GROUP_CHUNK = 16
+
+
+def expand_values(spec: Any) -> List[Any]:
+    """Значения поля сетки: список как есть или {"range": [lo, hi(, step)]} включительно."""
+    if isinstance(spec, dict):
+        if "range" not in spec:
+            raise ValueError("Поле сетки задаётся списком значений или {\"range\": [lo, hi, step]}")
+        lo, hi, *rest = spec["range"]
+        step = rest[0] if rest else 1
+        if step == 0:
+            raise ValueError("step в range не может быть 0")
+        return list(range(lo, hi + (1 if step > 0 else -1), step))
+    if not isinstance(spec, (list, tuple)):
+        raise ValueError("Поле сетки задаётся списком значений или {\"range\": [lo, hi, step]}")
+    return list(spec)
+
+
+def iter_variants(base: Dict[str, Any], grid: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Все сочетания значений сетки поверх base (детерминированный порядок: поля по алфавиту, target — последним)."""
+    for name in list(base) + list(grid):
+        if name not in RULE_FIELDS:
+            raise ValueError(f"Неизвестное поле правил: {name}")
+    # target — внутренний цикл: соседние варианты попадают в одну группу с общим словарём ходов
+    names = sorted(grid, key=lambda n: (n == "target", n))
+    values = [expand_values(grid[n]) for n in names]
+    for combo in itertools.product(*values):
+        variant = dict(base)
+        variant.update(zip(names, combo))
+        yield variant
+
+
+def normalize_variant(variant: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Поля правил в нормальной форме GameRules.to_dict (списки ходов отсортированы, без повторов),
+    чтобы одинаковые правила, записанные по-разному, давали один ключ.
+    Вариант, из которого не собираются GameRules, остаётся как есть — он всё равно станет строкой с ошибкой.
+    """
+    try:
+        return GameRules(**variant).to_dict()
+    except (TypeError, ValueError):
+        return dict(variant)
+
+
+def variant_key(variant: Dict[str, Any], start_template: Sequence[Optional[int]], s_min: int, s_max: int) -> str:
+    """Стабильный ключ варианта (для resume): хэш нормализованных правил, шаблона старта и диапазона S."""
+    raw = json.dumps(dict(normalize_variant(variant), start_template=list(start_template), s_min=s_min, s_max=s_max),
+                     sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:24]
+
+
+def _group_key(variant: Dict[str, Any]) -> str:
+    """Всё, кроме порога: у таких вариантов одинаковые ходы."""
+    return json.dumps({k: v for k, v in variant.items() if k != "target"}, sort_keys=True)
+
+
+def answer_counts(results: Results) -> Dict[str, int]:
+    return {"19": len(results[0]), "20": len(results[1]), "21": len(results[2])}
+
+
+def matches(results: Results, want: Optional[Want]) -> bool:
+    """Ответы подходят под want: {"19": n | [min, max] | null, ...}; пустой want подходит всегда."""
+    if not want:
+        return True
+    counts = answer_counts(results)
+    for task, cond in want.items():
+        if cond is None:
+            continue
+        n = counts[str(task)]
+        if isinstance(cond, (list, tuple)):
+            lo, hi = cond
+            if not ((lo is None or n >= lo) and (hi is None or n <= hi)):
+                return False
+        elif n != cond:
+            return False
+    return True
+
+
+def _solve_group(variants: List[Tuple[str, Dict[str, Any]]], start_template: Tuple[Optional[int], ...],
+                 s_min: int, s_max: int, method: str, want: Optional[Want]) -> List[Dict[str, Any]]:
+    """Задача для процесса пула: варианты одной группы с общим словарём ходов."""
+    move_table: Dict[Tuple[int, ...], Tuple[Tuple[int, ...], ...]] = {}
+    out = []
+    for key, variant in variants:
+        row: Dict[str, Any] = {"key": key, "rules": variant}
+        try:
+            rules = GameRules(**variant)
+            results = EGESolver(rules, start_template, s_min, s_max, method=method,
+                                move_table=move_table).solve_all()
+            row.update(rules=rules.to_dict(), counts=answer_counts(results), match=matches(results, want),
+                       task19=results[0], task20=results[1], task21=results[2])
+        except Exception as e:
+            row["error"] = str(e)
+        out.append(row)
+    return out
+
+
+def done_keys(path: str) -> Set[str]:
+    """Ключи вариантов, уже записанных в файл результатов (битая последняя строка игнорируется)."""
+    keys: Set[str] = set()
+    if not os.path.exists(path):
+        return keys
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                keys.add(json.loads(line)["key"])
+            except (ValueError, KeyError):
+                continue
+    return keys
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _groups(todo: List[Tuple[str, Dict[str, Any]]]) -> List[List[Tuple[str, Dict[str, Any]]]]:
+    """Подряд идущие варианты с общими ходами — кусками не длиннее GROUP_CHUNK."""
+    groups: List[List[Tuple[str, Dict[str, Any]]]] = []
+    for _, items in itertools.groupby(todo, key=lambda kv: _group_key(kv[1])):
+        items = list(items)
+        for i in range(0, len(items), GROUP_CHUNK):
+            groups.append(items[i:i + GROUP_CHUNK])
+    return groups
+
+
+def run_sweep(
+        base: Dict[str, Any],
+        grid: Dict[str, Any],
+        start_template: Sequence[Optional[int]],
+        s_min: int,
+        s_max: int,
+        out_path: str,
+        want: Optional[Want] = None,
+        method: str = "recursive",
+        workers: Optional[int] = None,
+        resume: bool = True,
+        progress_cb: Optional[Callable[[int, int], None]] = None,
+        cancel_cb: Optional[Callable[[], bool]] = None,
+        match_cb: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Tuple[int, int]:
+    """
+    Перебрать сетку правил и дописывать результаты в out_path (JSONL) по мере готовности.
+    - resume: пропустить варианты, ключи которых уже есть в out_path (иначе файл перезаписывается);
+    - progress_cb(готово, всего) — по вариантам, с учётом уже посчитанных;
+    - match_cb(строка) — для каждого подходящего под want варианта.
+    Отмена — RuntimeError("CANCELLED"); всё, что уже досчитано, остаётся в файле.
+    Возвращает (число решённых сейчас вариантов, число подходящих среди них).
+    """
+    if method not in METHODS:
+        raise ValueError(f"method должен быть одним из: {', '.join(METHODS)}")
+    tmpl = tuple(start_template)
+    s_min, s_max = min(s_min, s_max), max(s_min, s_max)
+    # Варианты с одинаковыми нормализованными правилами решаются один раз
+    variants: List[Tuple[str, Dict[str, Any]]] = []
+    seen: Set[str] = set()
+    for v in iter_variants(base, grid):
+        key = variant_key(v, tmpl, s_min, s_max)
+        if key not in seen:
+            seen.add(key)
+            variants.append((key, v))
+    skip = done_keys(out_path) if resume else set()
+    todo = [kv for kv in variants if kv[0] not in skip]
+    total = len(variants)
+    done = total - len(todo)
+    solved = found = 0
+    if progress_cb:
+        progress_cb(done, total)
+    if not todo:
+        return 0, 0
+
+    folder = os.path.dirname(out_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    groups = _groups(todo)
+    with open(out_path, "a" if resume else "w", encoding="utf-8") as out:
+        if resume and out.tell() > 0 and not _ends_with_newline(out_path):
+            out.write("\n")  # прошлый запуск оборвался посреди строки
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(groups)), mp_context=mp_context())
+        try:
+            pending = {pool.submit(_solve_group, g, tmpl, s_min, s_max, method, want) for g in groups}
+            while pending:
+                if cancel_cb and cancel_cb():
+                    raise RuntimeError("CANCELLED")
+                finished, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    for row in fut.result():
+                        out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                        solved += 1
+                        if row.get("match"):
+                            found += 1
+                            if match_cb:
+                                match_cb(row)
+                    out.flush()
+                    done += len(fut.result())
+                    if progress_cb:
+                        progress_cb(done, total)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    return solved, found
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Перебор наборов правил с заданной формой ответов 19–21.")
+    ap.add_argument("spec", help="JSON-файл спецификации (см. описание модуля core.sweep)")
+    ap.add_argument("-o", "--output", required=True, help="файл JSONL для результатов (дописывается)")
+    ap.add_argument("-j", "--jobs", type=int, default=0, help="число процессов (0 — по числу ядер)")
+    ap.add_argument("--restart", action="store_true", help="начать заново, не продолжая файл")
+    args = ap.parse_args(argv)
+
+    with open(args.spec, encoding="utf-8") as f:
+        spec = json.load(f)
+
+    def report(row: Dict[str, Any]):
+        print(json.dumps({"rules": row["rules"], "counts": row["counts"]}, ensure_ascii=False))
+
+    solved, found = run_sweep(
+        spec.get("base", {}), spec.get("grid", {}), spec["start_template"], spec["s_min"], spec["s_max"],
+        args.output, want=spec.get("want"), method=spec.get("method", "recursive"),
+        workers=args.jobs or None, resume=not args.restart, match_cb=report,
+    )
+    print(f"Решено вариантов: {solved}, подходящих: {found}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+from typing import Callable, List, Optional, Tuple
+
+from PyQt6 import QtCore, QtGui
+
+State = Tuple[int, ...]
+# ('win' | 'lose' | 'draw' | None, глубина) для игрока, который ходит из позиции
+Outcome = Tuple[Optional[str], Optional[int]]
+
+# Сколько детей добавляется за один fetchMore (остальные — по мере прокрутки)
+FETCH_BATCH = 100
+
+_NOT_EVALUATED = object()
+
+VERDICT_COLORS = {"win": (30, 140, 60), "lose": (190, 50, 50), "draw": (120, 120, 200)}
+
+
+class _Node:
+    __slots__ = ("state", "parent", "row", "move", "terminal", "moves", "children", "outcome")
+
+    def __init__(self, state: State, parent: Optional["_Node"], row: int, move: str, terminal: bool):
+        self.state = state
+        self.parent = parent
+        self.row = row
+        self.move = move
+        self.terminal = terminal
+        self.moves: Optional[Tuple[State, ...]] = None  # ходы ещё не запрашивались
+        self.children: List["_Node"] = []
+        self.outcome = _NOT_EVALUATED
+
+    def depth(self) -> int:
+        """Номер полухода от корня (0 — стартовая позиция)."""
+        d, node = 0, self.parent
+        while node is not None and node.parent is not None:
+            d += 1
+            node = node.parent
+        return d
+
+
+class GameTreeModel(QtCore.QAbstractItemModel):
+    """
+    Дерево партии от стартовой позиции, раскрываемое по требованию.
+
+    - Ходы узла (iter_moves) запрашиваются только когда представление раскрывает этот узел
+      (canFetchMore/fetchMore), дети добавляются порциями по FETCH_BATCH.
+    - Оценка позиции (evaluate -> Outcome) считается при первом показе строки и запоминается в узле;
+      evaluate берёт значения из кэшей решателя (EGESolver.position_depths) или из полного графа
+      (EGESolver.outcome — там бывают и ничьи).
+
+    Столбцы: позиция, ход, кто сделал ход, оценка для игрока, который ходит из позиции.
+    """
+
+    HEADERS = ("Позиция", "Ход", "Ходил", "Оценка для ходящего")
+
+    def __init__(self, start: State, iter_moves: Callable[[State], Tuple[State, ...]],
+                 is_terminal: Callable[[State], bool], describe_move: Callable[[State, State], str],
+                 evaluate: Callable[[State], Outcome], players: Tuple[str, str] = ("Петя", "Ваня"),
+                 parent: Optional[QtCore.QObject] = None):
+        super().__init__(parent)
+        self._iter_moves = iter_moves
+        self._is_terminal = is_terminal
+        self._describe_move = describe_move
+        self._evaluate = evaluate
+        self._players = players
+        self._root = _Node((), None, 0, "", False)
+        self._root.moves = (start,)
+        self._root.children.append(_Node(start, self._root, 0, "", is_terminal(start)))
+
+    # ---------- Узлы ----------
+    def _node(self, index: QtCore.QModelIndex) -> _Node:
+        return index.internalPointer() if index.isValid() else self._root
+
+    def node_state(self, index: QtCore.QModelIndex) -> Optional[State]:
+        return self._node(index).state if index.isValid() else None
+
+    def index(self, row: int, column: int, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> QtCore.QModelIndex:
+        node = self._node(parent)
+        if 0 <= row < len(node.children) and 0 <= column < len(self.HEADERS):
+            return self.createIndex(row, column, node.children[row])
+        return QtCore.QModelIndex()
+
+    def parent(self, index: QtCore.QModelIndex = QtCore.QModelIndex()) -> QtCore.QModelIndex:
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self._root:
+            return QtCore.QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        if parent.column() > 0:
+            return 0
+        return len(self._node(parent).children)
+
+    def columnCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        return len(self.HEADERS)
+
+    def hasChildren(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> bool:
+        node = self._node(parent)
+        if node.moves is None:
+            return not node.terminal  # ходы ещё не считали: стрелку раскрытия показываем наугад
+        return bool(node.moves)
+
+    def canFetchMore(self, parent: QtCore.QModelIndex) -> bool:
+        node = self._node(parent)
+        if node.moves is None:
+            return not node.terminal
+        return len(node.children) < len(node.moves)
+
+    def fetchMore(self, parent: QtCore.QModelIndex) -> None:
+        node = self._node(parent)
+        if node.moves is None:
+            node.moves = tuple(self._iter_moves(node.state))
+            if not node.moves:
+                # Ходов нет — убрать стрелку раскрытия
+                self.dataChanged.emit(parent, parent)
+                return
+        first = len(node.children)
+        last = min(first + FETCH_BATCH, len(node.moves)) - 1
+        if last < first:
+            return
+        self.beginInsertRows(parent, first, last)
+        for row in range(first, last + 1):
+            nxt = node.moves[row]
+            node.children.append(_Node(nxt, node, row, self._describe_move(node.state, nxt),
+                                       self._is_terminal(nxt)))
+        self.endInsertRows()
+
+    # ---------- Данные ----------
+    def _outcome(self, node: _Node) -> Outcome:
+        if node.outcome is _NOT_EVALUATED:
+            node.outcome = self._evaluate(node.state)
+        return node.outcome
+
+    def _verdict(self, node: _Node) -> str:
+        if node.terminal:
+            return "конец игры"
+        kind, depth = self._outcome(node)
+        if kind == "win":
+            return f"выигрыш за {depth}"
+        if kind == "lose":
+            return "нет ходов" if depth == 0 else f"проигрыш за {depth}"
+        if kind == "draw":
+            return "ничья"
+        return "—"
+
+    def data(self, index: QtCore.QModelIndex, role: int = QtCore.Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node: _Node = index.internalPointer()
+        col = index.column()
+        if role == QtCore.Qt.ItemDataRole.DisplayRole:
+            if col == 0:
+                return "(" + ", ".join(map(str, node.state)) + ")"
+            if col == 1:
+                return node.move
+            if col == 2:
+                return self._players[(node.depth() - 1) % 2] if node.parent is not self._root else ""
+            return self._verdict(node)
+        if role == QtCore.Qt.ItemDataRole.ForegroundRole and col == 3 and not node.terminal:
+            color = VERDICT_COLORS.get(self._outcome(node)[0])
+            if color is not None:
+                return QtGui.QBrush(QtGui.QColor(*color))
+        if role == QtCore.Qt.ItemDataRole.ToolTipRole and col == 3:
+            return ("Для игрока, который ходит из этой позиции; «—» — ни выигрыша, ни проигрыша "
+                    "в пределах глубины оценки")
+        return None
+
+    def headerData(self, section: int, orientation: QtCore.Qt.Orientation,
+                   role: int = QtCore.Qt.ItemDataRole.DisplayRole):
+        if orientation == QtCore.Qt.Orientation.Horizontal and role == QtCore.Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
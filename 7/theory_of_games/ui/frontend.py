@@ -1,13 +1,23 @@
+import os
 import sys
 import time
 import json
-import csv
 import re
 from typing import List, Optional, Tuple, Dict
 from PyQt6 import QtWidgets, QtCore, QtGui
 
+from core.export import export as export_results, source_from_lists
+from core.grid import GRID_METHODS, HeapGrid, solve_grid
+from core.parallel import solve_all_parallel
+from core.result_cache import ResultCache, rules_fingerprint
 from core.rules import GameRules
-from core.solver import EGESolver
+from core.solver import EGESolver, TASK_19, TASK_20, TASK_21
+from ui.explorer import GameTreeModel
+from ui.heatmap import HeatmapWidget, MASK_COLORS
+
+
+# Полный граф для дерева игры (строится в OutcomeWorker) — не больше стольких позиций
+EXPLORE_MAX_STATES = 500_000
 
 
 def compress_ranges(nums: List[int]) -> str:
@@ -33,6 +43,26 @@ def compress_ranges(nums: List[int]) -> str:
     return ", ".join(ranges)
 
 
+def format_stats(stats: Optional[dict]) -> str:
+    """Краткая сводка EGESolver.stats() для строки состояния."""
+    if not stats:
+        return ""
+    def num(v: int) -> str:
+        return f"{v:,}".replace(",", " ")
+
+    return (f" | позиций: {num(stats['positions'])}, раскрыто: {num(stats['expanded'])}, "
+            f"попаданий в кэш: {stats['hit_rate'] * 100:.0f}%, "
+            f"≈{stats['approx_bytes'] / (1024 * 1024):.1f} МБ")
+
+
+def with_filter_ext(fname: str, selected_filter: str) -> str:
+    """Дописать к имени без расширения расширение из выбранного фильтра диалога: формат выбирается по нему."""
+    ext = re.search(r"\*(\.\w+)", selected_filter or "")
+    if ext and not os.path.splitext(fname)[1]:
+        fname += ext.group(1)
+    return fname
+
+
 def make_dark_palette() -> QtGui.QPalette:
     pal = QtGui.QPalette()
     pal.setColor(QtGui.QPalette.ColorRole.Window, QtGui.QColor(46, 46, 46))
@@ -172,61 +202,197 @@ class IntListEditor(QtWidgets.QWidget):
 
 
 class SolveWorker(QtCore.QObject):
+    """
+    Расчёт в отдельном потоке. Прогресс и найденные S отправляются не чаще чем раз в
+    EMIT_INTERVAL секунд (пачками), чтобы не заваливать очередь событий Qt на больших диапазонах.
+    """
+    EMIT_INTERVAL = 0.1
+
     started = QtCore.pyqtSignal()
     progress = QtCore.pyqtSignal(int, int)  # i, total
+    partial = QtCore.pyqtSignal(list, list, list)  # новые S для 19, 20, 21 с прошлой пачки
     finished = QtCore.pyqtSignal(list, list, list, float, object)  # s19, s20, s21, dt, meta
     error = QtCore.pyqtSignal(str)
 
-    def __init__(self, rules: GameRules, start_template, s_min: int, s_max: int, parent=None):
+    def __init__(self, rules: GameRules, start_template, s_min: int, s_max: int,
+                 method: str = "recursive", workers: int = 1,
+                 cache: Optional[ResultCache] = None,
+                 solver: Optional[EGESolver] = None, parent=None):
         super().__init__(parent)
         self.rules = rules
         self.start_template = start_template
         self.s_min = s_min
         self.s_max = s_max
+        self.method = method
+        self.workers = workers
+        self.cache = cache
+        # Сессия: решатель от прошлого расчёта с теми же правилами (кэши позиций и ответы по S)
+        self.solver = solver or EGESolver(rules, start_template, s_min, s_max, method=method)
         self._cancelled = False
+        self._last_emit = 0.0
+        self._last_progress: Optional[Tuple[int, int]] = None
+        self._pending: Tuple[List[int], List[int], List[int]] = ([], [], [])
 
     @QtCore.pyqtSlot()
     def cancel(self):
         self._cancelled = True
 
+    def _on_answer(self, S: int, mask: int):
+        if mask & TASK_19:
+            self._pending[0].append(S)
+        if mask & TASK_20:
+            self._pending[1].append(S)
+        if mask & TASK_21:
+            self._pending[2].append(S)
+
+    def _on_chunk(self, lo: int, hi: int, results):
+        self.solver.remember(range(lo, hi + 1), *results)
+        for bucket, found in zip(self._pending, results):
+            bucket.extend(found)
+
+    def _on_progress(self, i: int, total: int):
+        self._last_progress = (i, total)
+        now = time.perf_counter()
+        if i < total and now - self._last_emit < self.EMIT_INTERVAL:
+            return
+        self._last_emit = now
+        self._flush()
+
+    def _flush(self):
+        if self._last_progress is not None:
+            self.progress.emit(*self._last_progress)
+            self._last_progress = None
+        if any(self._pending):
+            self.partial.emit(*self._pending)
+            self._pending = ([], [], [])
+
     @QtCore.pyqtSlot()
     def run(self):
         try:
             self.started.emit()
-            solver = EGESolver(self.rules, self.start_template, self.s_min, self.s_max)
-
-            def cb_progress(i: int, total: int):
-                self.progress.emit(i, total)
 
             def cb_cancel() -> bool:
                 return self._cancelled
 
             t0 = time.perf_counter()
-            s19, s20, s21 = solver.solve_all(progress_cb=cb_progress, cancel_cb=cb_cancel)
+            solver = self.solver
+            solver.set_range(self.s_min, self.s_max)
+            cached = None if not solver.pending_S() else self._cache_get()
+            pooled = False
+            if cached is not None:
+                solver.remember(range(self.s_min, self.s_max + 1), *cached)
+            elif self.workers > 1:
+                pooled = bool(solver.pending_S())
+                # Досчитываем в пуле только недостающие куски диапазона
+                for lo, hi in solver.pending_ranges():
+                    solve_all_parallel(
+                        self.rules, self.start_template, lo, hi,
+                        method=self.method, workers=self.workers,
+                        progress_cb=self._on_progress, cancel_cb=cb_cancel, chunk_cb=self._on_chunk,
+                    )
+            s19, s20, s21 = solver.solve_all(progress_cb=self._on_progress, cancel_cb=cb_cancel,
+                                             answer_cb=self._on_answer)
+            self._flush()
             dt = time.perf_counter() - t0
             if self._cancelled:
                 raise RuntimeError("Расчёт отменён пользователем")
+            if cached is None:
+                self._cache_put((s19, s20, s21))
 
             meta = dict(
-                rules=dict(
-                    target_mode=self.rules.target_mode,
-                    target=self.rules.target,
-                    finish_cmp=self.rules.finish_cmp,
-                    heap_index=self.rules.heap_index,
-                    adds=self.rules.adds,
-                    mults=self.rules.mults,
-                    divs=self.rules.divs,
-                    heaps=self.rules.heaps,
-                ),
+                rules=self.rules.to_dict(),
                 start_template=self.start_template,
                 s_min=self.s_min,
                 s_max=self.s_max,
+                method=self.method,
+                workers=self.workers,
+                cached=cached is not None,
                 elapsed=dt,
+                # Счётчики решателя сессии; при расчёте в пуле работа процессов в них не попадает
+                stats=solver.stats(),
+                stats_partial=pooled,
             )
             self.finished.emit(s19, s20, s21, dt, meta)
         except Exception as e:
             self.error.emit(str(e))
 
+    def _cache_get(self):
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.get(self.rules, self.start_template, self.s_min, self.s_max)
+        except Exception:
+            return None  # испорченный/занятый файл кэша не должен мешать расчёту
+
+    def _cache_put(self, results):
+        if self.cache is None:
+            return
+        try:
+            self.cache.put(self.rules, self.start_template, self.s_min, self.s_max, results)
+        except Exception:
+            pass
+
+
+class GridWorker(QtCore.QObject):
+    """Расчёт двумерной сетки стартов (core.grid.solve_grid) в отдельном потоке."""
+
+    started = QtCore.pyqtSignal()
+    progress = QtCore.pyqtSignal(int, int)  # готово строк, всего строк
+    finished = QtCore.pyqtSignal(object, float)  # HeapGrid, dt
+    error = QtCore.pyqtSignal(str)
+
+    def __init__(self, rules: GameRules, rows: Tuple[int, int], cols: Tuple[int, int], method: str, parent=None):
+        super().__init__(parent)
+        self.rules = rules
+        self.rows = rows
+        self.cols = cols
+        self.method = method
+        self._cancelled = False
+
+    @QtCore.pyqtSlot()
+    def cancel(self):
+        self._cancelled = True
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        try:
+            self.started.emit()
+            t0 = time.perf_counter()
+            grid = solve_grid(self.rules, self.rows, self.cols, method=self.method,
+                              progress_cb=self.progress.emit, cancel_cb=lambda: self._cancelled)
+            self.finished.emit(grid, time.perf_counter() - t0)
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class OutcomeWorker(QtCore.QObject):
+    """Полный граф позиций от одного старта (EGESolver.outcome_table) для точного дерева игры — в отдельном потоке."""
+
+    started = QtCore.pyqtSignal()
+    finished = QtCore.pyqtSignal(object, object, float)  # решатель, его outcome_table, dt
+    error = QtCore.pyqtSignal(str)
+
+    def __init__(self, solver: EGESolver, S: int, parent=None):
+        super().__init__(parent)
+        self.solver = solver
+        self.S = S
+        self._cancelled = False
+
+    @QtCore.pyqtSlot()
+    def cancel(self):
+        self._cancelled = True
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        try:
+            self.started.emit()
+            t0 = time.perf_counter()
+            table = self.solver.outcome_table([self.S], cancel_cb=lambda: self._cancelled,
+                                              max_states=EXPLORE_MAX_STATES)
+            self.finished.emit(self.solver, table, time.perf_counter() - t0)
+        except Exception as e:
+            self.error.emit(str(e))
+
 
 class MainWindow(QtWidgets.QMainWindow):
     def __init__(self):
@@ -360,9 +526,25 @@ class MainWindow(QtWidgets.QMainWindow):
         self.sp_smax.setValue(130)
         start_layout.addWidget(self.sp_smax, 1, 3)
 
+        start_layout.addWidget(QtWidgets.QLabel("Метод:"), 2, 0)
+        self.cb_method = QtWidgets.QComboBox()
+        self.cb_method.addItems(["recursive", "retrograde", "numpy"])
+        self.cb_method.setToolTip(
+            "recursive — поиск в глубину отдельно для каждого S\n"
+            "retrograde — одна таблица глубин выигрыша на весь диапазон S (обратный анализ)\n"
+            "numpy — то же на плотных массивах NumPy (нужен пакет numpy)"
+        )
+        start_layout.addWidget(self.cb_method, 2, 1)
+        start_layout.addWidget(QtWidgets.QLabel("Процессов:"), 2, 2)
+        self.sp_workers = QtWidgets.QSpinBox()
+        self.sp_workers.setRange(1, os.cpu_count() or 1)
+        self.sp_workers.setValue(1)
+        self.sp_workers.setToolTip("Больше 1 — диапазон S делится на куски и решается в пуле процессов")
+        start_layout.addWidget(self.sp_workers, 2, 3)
+
         hint = QtWidgets.QLabel("Подсказка: при одной куче старт — (S). При двух — (фикс., S).")
         hint.setStyleSheet("color: gray;")
-        start_layout.addWidget(hint, 2, 0, 1, 4)
+        start_layout.addWidget(hint, 3, 0, 1, 4)
 
         main.addWidget(start_box)
 
@@ -375,13 +557,23 @@ class MainWindow(QtWidgets.QMainWindow):
         self.btn_copy_all = QtWidgets.QPushButton("Скопировать итоги")
         self.btn_export_json = QtWidgets.QPushButton("Экспорт JSON")
         self.btn_export_csv = QtWidgets.QPushButton("Экспорт CSV")
+        self.btn_export_bin = QtWidgets.QPushButton("Экспорт NPZ/биты")
+        self.btn_export_bin.setToolTip("Отсортированные массивы S в .npz или битовые маски по [S_min; S_max] в .bits")
         self.btn_reset = QtWidgets.QPushButton("Сброс")
+        self.chk_cache = QtWidgets.QCheckBox("Кэш на диске")
+        self.chk_cache.setChecked(True)
+        self.chk_cache.setToolTip("Брать готовые ответы из кэша для тех же правил и диапазона S (или шире)")
+        self.btn_clear_cache = QtWidgets.QToolButton()
+        self.btn_clear_cache.setText("Очистить кэш")
         actions.addWidget(self.btn_calc)
         actions.addWidget(self.btn_cancel)
         actions.addWidget(self.btn_copy_all)
         actions.addWidget(self.btn_export_json)
         actions.addWidget(self.btn_export_csv)
+        actions.addWidget(self.btn_export_bin)
         actions.addStretch(1)
+        actions.addWidget(self.chk_cache)
+        actions.addWidget(self.btn_clear_cache)
         actions.addWidget(self.btn_reset)
         main.addLayout(actions)
 
@@ -398,6 +590,10 @@ class MainWindow(QtWidgets.QMainWindow):
         tabs.addTab(self.tab_summary, "Итоги")
         tabs.addTab(self.tab_lists, "Списки S")
         tabs.addTab(self.tab_strategy, "Стратегия")
+        self.tab_explorer = QtWidgets.QWidget()
+        tabs.addTab(self.tab_explorer, "Дерево игры")
+        self.tab_grid = QtWidgets.QWidget()
+        tabs.addTab(self.tab_grid, "Сетка 2D")
         main.addWidget(tabs, 1)
 
         # Итоги
@@ -460,9 +656,13 @@ class MainWindow(QtWidgets.QMainWindow):
         self.btn_show_strat = QtWidgets.QPushButton("Показать")
         self.btn_copy_strat = QtWidgets.QToolButton()
         self.btn_copy_strat.setText("Копировать")
+        self.btn_export_tree = QtWidgets.QToolButton()
+        self.btn_export_tree.setText("Дерево в JSON")
+        self.btn_export_tree.setToolTip("Сохранить полное дерево стратегии для выбранного S")
         controls.addSpacing(10)
         controls.addWidget(self.btn_show_strat)
         controls.addWidget(self.btn_copy_strat)
+        controls.addWidget(self.btn_export_tree)
         controls.addStretch(1)
         strat_layout.addLayout(controls)
 
@@ -472,6 +672,75 @@ class MainWindow(QtWidgets.QMainWindow):
         self.txt_strategy.setPlaceholderText("Сначала рассчитайте S, затем выберите задание и S.")
         strat_layout.addWidget(self.txt_strategy, 1)
 
+        # Дерево игры: узлы раскрываются по требованию, оценки — из кэшей решателя
+        explorer_layout = QtWidgets.QVBoxLayout(self.tab_explorer)
+        ex_controls = QtWidgets.QHBoxLayout()
+        ex_controls.addWidget(QtWidgets.QLabel("S:"))
+        self.sp_explore_S = QtWidgets.QSpinBox()
+        self.sp_explore_S.setRange(-10**9, 10**9)
+        self.sp_explore_S.setValue(1)
+        ex_controls.addWidget(self.sp_explore_S)
+        ex_controls.addSpacing(10)
+        ex_controls.addWidget(QtWidgets.QLabel("Глубина оценки:"))
+        self.sp_explore_depth = QtWidgets.QSpinBox()
+        self.sp_explore_depth.setRange(1, 6)
+        self.sp_explore_depth.setValue(2)
+        self.sp_explore_depth.setToolTip("До скольких собственных ходов искать выигрыш или проигрыш в каждой позиции")
+        ex_controls.addWidget(self.sp_explore_depth)
+        self.chk_explore_exact = QtWidgets.QCheckBox("Точно (весь граф)")
+        self.chk_explore_exact.setToolTip("Построить весь граф позиций от старта: точные глубины и ничьи "
+                                          "для правил с циклами (граф должен быть конечным)")
+        ex_controls.addWidget(self.chk_explore_exact)
+        self.btn_explore = QtWidgets.QPushButton("Открыть")
+        ex_controls.addSpacing(10)
+        ex_controls.addWidget(self.btn_explore)
+        ex_controls.addStretch(1)
+        explorer_layout.addLayout(ex_controls)
+        self.tree_explorer = QtWidgets.QTreeView()
+        self.tree_explorer.setUniformRowHeights(True)
+        self.tree_explorer.setAlternatingRowColors(True)
+        self.tree_explorer.setFont(mono)
+        explorer_layout.addWidget(self.tree_explorer, 1)
+
+        # Сетка 2D: обе кучи меняются по диапазонам, ответы — по одной общей таблице глубин
+        grid_layout = QtWidgets.QVBoxLayout(self.tab_grid)
+        grid_controls = QtWidgets.QHBoxLayout()
+        self.sp_grid = []
+        for label in ("Куча 1: от", "до", "Куча 2: от", "до"):
+            grid_controls.addWidget(QtWidgets.QLabel(label))
+            sp = QtWidgets.QSpinBox()
+            sp.setRange(-10**6, 10**6)
+            self.sp_grid.append(sp)
+            grid_controls.addWidget(sp)
+        for sp, v in zip(self.sp_grid, (1, 60, 1, 60)):
+            sp.setValue(v)
+        grid_controls.addSpacing(10)
+        grid_controls.addWidget(QtWidgets.QLabel("Метод:"))
+        self.cb_grid_method = QtWidgets.QComboBox()
+        self.cb_grid_method.addItems(list(GRID_METHODS))
+        grid_controls.addWidget(self.cb_grid_method)
+        grid_controls.addSpacing(10)
+        grid_controls.addWidget(QtWidgets.QLabel("Показать:"))
+        self.cb_grid_task = QtWidgets.QComboBox()
+        self.cb_grid_task.addItems(["все", "19", "20", "21"])
+        grid_controls.addWidget(self.cb_grid_task)
+        self.btn_grid_calc = QtWidgets.QPushButton("Рассчитать сетку")
+        self.btn_grid_save = QtWidgets.QToolButton()
+        self.btn_grid_save.setText("Сохранить")
+        self.btn_grid_save.setToolTip("Массивы в .npz или матрица масок в .csv")
+        grid_controls.addSpacing(10)
+        grid_controls.addWidget(self.btn_grid_calc)
+        grid_controls.addWidget(self.btn_grid_save)
+        grid_controls.addStretch(1)
+        grid_layout.addLayout(grid_controls)
+        legend = "  ".join(f"<span style='color: rgb{MASK_COLORS[m]}'>■</span> {name}"
+                           for m, name in ((1, "19"), (2, "20"), (4, "21"), (3, "19+20"), (5, "19+21"),
+                                           (6, "20+21"), (7, "все")))
+        self.lbl_grid = QtWidgets.QLabel(legend)
+        grid_layout.addWidget(self.lbl_grid)
+        self.heatmap = HeatmapWidget()
+        grid_layout.addWidget(self.heatmap, 1)
+
         # — Сигналы
         self.rb_one.toggled.connect(self._on_heaps_change)
         self.cb_goal_mode.currentTextChanged.connect(self._on_goal_mode_change)
@@ -482,10 +751,17 @@ class MainWindow(QtWidgets.QMainWindow):
         self.btn_copy_all.clicked.connect(self.copy_summary)
         self.btn_export_json.clicked.connect(self.export_json)
         self.btn_export_csv.clicked.connect(self.export_csv)
+        self.btn_export_bin.clicked.connect(self.export_binary)
+        self.btn_clear_cache.clicked.connect(self.clear_cache)
 
         self.cb_task.currentTextChanged.connect(self._on_task_change)
         self.btn_show_strat.clicked.connect(self.on_show_strategy)
         self.btn_copy_strat.clicked.connect(self.copy_strategy)
+        self.btn_export_tree.clicked.connect(self.export_strategy_tree)
+        self.btn_explore.clicked.connect(self.open_explorer)
+        self.btn_grid_calc.clicked.connect(self.on_grid_calc)
+        self.btn_grid_save.clicked.connect(self.save_grid)
+        self.cb_grid_task.currentTextChanged.connect(self._on_grid_task_change)
         self.cb_theme.currentTextChanged.connect(self._on_theme_change)
 
         # начальные состояния + стили
@@ -496,6 +772,12 @@ class MainWindow(QtWidgets.QMainWindow):
         # Служебные поля
         self._last_results: Dict[int, List[int]] = {19: [], 20: [], 21: []}
         self._last_meta: Dict[str, object] = {}
+        self._cache: Optional[ResultCache] = None
+        # Долгоживущий решатель для текущих правил: при смене только диапазона S он переиспользуется
+        self._session: Optional[EGESolver] = None
+        self._session_key: Optional[Tuple[str, str]] = None
+        self._busy = False
+        self._grid: Optional[HeapGrid] = None
 
         # Настройки + тема
         self._load_settings()
@@ -610,18 +892,27 @@ class MainWindow(QtWidgets.QMainWindow):
             s_max = max(self.sp_smin.value(), self.sp_smax.value())
             start_template = self._collect_start_template()
 
+            self._close_explorer()
             self._set_busy(True, "Подготовка...")
+            for t in (self.txt19, self.txt20, self.txt21):
+                t.clear()
             self.worker_thread = QtCore.QThread(self)
-            self.worker = SolveWorker(rules, start_template, s_min, s_max)
+            cache = self._result_cache() if self.chk_cache.isChecked() else None
+            method = self.cb_method.currentText()
+            self.worker = SolveWorker(rules, start_template, s_min, s_max,
+                                      method=method, workers=self.sp_workers.value(),
+                                      cache=cache, solver=self._solver_session(rules, start_template, method))
             self.worker.moveToThread(self.worker_thread)
 
             self.worker.started.connect(lambda: self._set_busy(True, "Считаем..."))
             self.worker.progress.connect(self._on_progress)
+            self.worker.partial.connect(self._on_partial)
             self.worker.finished.connect(self._on_finished)
             self.worker.error.connect(self._on_error)
             self.worker_thread.started.connect(self.worker.run)
 
             self.worker.finished.connect(self.worker_thread.quit)
+            self.worker.error.connect(self.worker_thread.quit)
             self.worker.finished.connect(self.worker.deleteLater)
             self.worker_thread.finished.connect(self.worker_thread.deleteLater)
 
@@ -630,15 +921,42 @@ class MainWindow(QtWidgets.QMainWindow):
         except Exception as e:
             QtWidgets.QMessageBox.critical(self, "Ошибка", str(e))
 
+    def _solver_session(self, rules: GameRules, start_template, method: str) -> EGESolver:
+        """Решатель прошлого расчёта, если правила, шаблон старта и метод не менялись, иначе новый."""
+        key = (rules_fingerprint(rules, start_template), method)
+        if self._session is None or self._session_key != key:
+            self._session = EGESolver(rules, start_template, self.sp_smin.value(), self.sp_smax.value(),
+                                      method=method)
+            self._session_key = key
+        return self._session
+
+    def _result_cache(self) -> Optional[ResultCache]:
+        if self._cache is None:
+            try:
+                self._cache = ResultCache()
+            except Exception as e:
+                self.statusBar().showMessage(f"Кэш недоступен: {e}", 5000)
+                return None
+        return self._cache
+
+    def clear_cache(self):
+        cache = self._result_cache()
+        if cache is None:
+            return
+        cache.clear()
+        self.statusBar().showMessage("Кэш результатов очищен.", 4000)
+
     def on_cancel(self):
         if hasattr(self, "worker"):
             self.worker.cancel()
             self._set_busy(True, "Отмена...")
 
     def _set_busy(self, busy: bool, text: str = ""):
+        self._busy = busy
         self.progress.setVisible(busy)
         self.btn_calc.setEnabled(not busy)  # фикс
         self.btn_cancel.setEnabled(busy)
+        self.btn_grid_calc.setEnabled(not busy)
         if busy:
             self.progress.setRange(0, 0)
             self.progress.setFormat(text)
@@ -653,6 +971,13 @@ class MainWindow(QtWidgets.QMainWindow):
         self.progress.setValue(i)
         self.progress.setFormat(f"Идёт расчёт... {i}/{total} ({(i / total * 100):.0f}%)")
 
+    def _on_partial(self, s19: List[int], s20: List[int], s21: List[int]):
+        """Найденные по ходу расчёта S дописываются в списки; итоговый вид — в _on_finished."""
+        for txt, found in ((self.txt19, s19), (self.txt20, s20), (self.txt21, s21)):
+            if found:
+                txt.moveCursor(QtGui.QTextCursor.MoveOperation.End)
+                txt.insertPlainText(", ".join(map(str, found)) + ", ")
+
     def _on_finished(self, s19: List[int], s20: List[int], s21: List[int], dt: float, meta: dict):
         self._set_busy(False)
         self._last_results = {19: s19, 20: s20, 21: s21}
@@ -689,9 +1014,11 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self._refresh_strategy_inputs()
 
+        source = " (из кэша)" if meta.get("cached") else ""
         self.statusBar().showMessage(
-            f"Готово за {dt:.3f} сек. Найдено: 19={len(s19)}, 20={len(s20)}, 21={len(s21)}",
-            8000
+            f"Готово за {dt:.3f} сек{source}. Найдено: 19={len(s19)}, 20={len(s20)}, 21={len(s21)}"
+            f"{format_stats(meta.get('stats'))}",
+            15000
         )
 
     def _refresh_strategy_inputs(self):
@@ -748,6 +1075,8 @@ class MainWindow(QtWidgets.QMainWindow):
         self.sp_fixed.setValue(5)
         self.sp_smin.setValue(1)
         self.sp_smax.setValue(130)
+        self.cb_method.setCurrentText("recursive")
+        self.sp_workers.setValue(1)
 
         self.out19.setText("—")
         self.out20.setText("—")
@@ -756,67 +1085,73 @@ class MainWindow(QtWidgets.QMainWindow):
         self.txt20.clear()
         self.txt21.clear()
         self.txt_strategy.clear()
+        self._close_explorer()
         self._last_results = {19: [], 20: [], 21: []}
         self._last_meta = {}
+        self._session = None
+        self._session_key = None
         self._refresh_strategy_inputs()
         self.statusBar().clearMessage()
 
     # ---------- Экспорт ----------
-    def export_json(self):
+    def _export_results(self, title: str, default_name: str, filters: str) -> None:
+        """Сохранить последние ответы через core.export (формат — по расширению выбранного файла)."""
         if not any(self._last_results.values()):
-            QtWidgets.QMessageBox.information(self, "Экспорт JSON", "Сначала выполните расчёт.")
+            QtWidgets.QMessageBox.information(self, title, "Сначала выполните расчёт.")
             return
-        fname, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Сохранить JSON", "results.json", "JSON (*.json)")
+        fname, selected = QtWidgets.QFileDialog.getSaveFileName(self, title, default_name, filters)
         if not fname:
             return
-        payload = dict(
-            meta=self._last_meta,
-            results=dict(
-                task19=self._last_results[19],
-                task20=self._last_results[20],
-                task21=self._last_results[21],
-            )
-        )
-        with open(fname, "w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2)
-        self.statusBar().showMessage(f"JSON сохранён: {fname}", 5000)
+        fname = with_filter_ext(fname, selected)
+        source = source_from_lists(*(sorted(self._last_results[t]) for t in (19, 20, 21)))
+        try:
+            meta = self._last_meta
+            export_results(fname, source, meta["s_min"], meta["s_max"], meta=meta)
+        except (OSError, ValueError, RuntimeError) as e:
+            QtWidgets.QMessageBox.critical(self, title, str(e))
+            return
+        self.statusBar().showMessage(f"Сохранено: {fname}", 5000)
+
+    def export_json(self):
+        self._export_results("Сохранить JSON", "results.json", "JSON (*.json)")
 
     def export_csv(self):
-        if not any(self._last_results.values()):
-            QtWidgets.QMessageBox.information(self, "Экспорт CSV", "Сначала выполните расчёт.")
-            return
-        fname, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Сохранить CSV", "results.csv", "CSV (*.csv)")
-        if not fname:
-            return
-        s19, s20, s21 = (sorted(self._last_results[19]), sorted(self._last_results[20]), sorted(self._last_results[21]))
-        L = max(len(s19), len(s20), len(s21))
-        with open(fname, "w", encoding="utf-8", newline="") as f:
-            w = csv.writer(f, delimiter=";")
-            w.writerow(["S19", "S20", "S21"])
-            for i in range(L):
-                row = [
-                    s19[i] if i < len(s19) else "",
-                    s20[i] if i < len(s20) else "",
-                    s21[i] if i < len(s21) else "",
-                ]
-                w.writerow(row)
-        self.statusBar().showMessage(f"CSV сохранён: {fname}", 5000)
+        self._export_results("Сохранить CSV", "results.csv", "CSV (*.csv)")
+
+    def export_binary(self):
+        self._export_results("Сохранить в двоичном виде", "results.npz",
+                             "NumPy (*.npz);;Битовые маски (*.bits)")
 
     # ---------- Стратегии ----------
-    def on_show_strategy(self):
+    def _strategy_query(self, title: str) -> Optional[Tuple[EGESolver, int, int]]:
+        """(решатель, задание, S) для запроса стратегии или None (сообщение уже показано)."""
         if not any(self._last_results.values()):
-            QtWidgets.QMessageBox.information(self, "Стратегия", "Сначала выполните расчёт.")
-            return
+            QtWidgets.QMessageBox.information(self, title, "Сначала выполните расчёт.")
+            return None
         task = int(self.cb_task.currentText())
         try:
             S = int(self.cb_S.currentText())
         except ValueError:
-            QtWidgets.QMessageBox.warning(self, "Стратегия", "Выберите корректное S.")
-            return
-
+            QtWidgets.QMessageBox.warning(self, title, "Выберите корректное S.")
+            return None
+        return self._strategy_solver(), task, S
+
+    def _strategy_solver(self) -> EGESolver:
+        """
+        Решатель последнего расчёта — его кэши позиций и стратегий уже прогреты.
+        Пока идёт расчёт, сессией пользуется поток воркера, поэтому тогда — отдельный решатель.
+        """
         rules = self._collect_rules()
         start_template = self._collect_start_template()
-        solver = EGESolver(rules, start_template, S, S)
+        if self._busy:
+            return EGESolver(rules, start_template, self.sp_smin.value(), self.sp_smax.value())
+        return self._solver_session(rules, start_template, self.cb_method.currentText())
+
+    def on_show_strategy(self):
+        query = self._strategy_query("Стратегия")
+        if query is None:
+            return
+        solver, task, S = query
 
         if task == 19:
             text = solver.sample_strategy_19(S)
@@ -835,6 +1170,165 @@ class MainWindow(QtWidgets.QMainWindow):
         QtWidgets.QApplication.clipboard().setText(self.txt_strategy.toPlainText())
         self.statusBar().showMessage("Стратегия скопирована.", 4000)
 
+    def export_strategy_tree(self):
+        query = self._strategy_query("Дерево стратегии")
+        if query is None:
+            return
+        solver, task, S = query
+        tree = solver.strategy_tree(S, task)
+        if tree is None:
+            QtWidgets.QMessageBox.information(self, "Дерево стратегии",
+                                              "Для выбранного S и задания стратегии нет.")
+            return
+        fname, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Сохранить дерево стратегии",
+                                                         f"strategy_{task}_S{S}.json", "JSON (*.json)")
+        if not fname:
+            return
+        payload = dict(rules=solver.rules.to_dict(), start_template=list(solver.start_tmpl), **tree)
+        with open(fname, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        self.statusBar().showMessage(f"Дерево стратегии сохранено: {fname}", 5000)
+
+    # ---------- Дерево игры ----------
+    def open_explorer(self):
+        """Показать дерево партии от старта с выбранным S; ходы и оценки считаются только для раскрытых узлов."""
+        S = self.sp_explore_S.value()
+        if self.chk_explore_exact.isChecked():
+            self._start_outcome_worker(S)
+            return
+        try:
+            solver = self._strategy_solver()
+            if not solver.s_min <= S <= solver.s_max:
+                # Диапазон решателя сессии не трогаем — для S вне него отдельный решатель
+                solver = EGESolver(solver.rules, solver.start_tmpl, S, S)
+        except ValueError as e:
+            QtWidgets.QMessageBox.warning(self, "Дерево игры", str(e))
+            return
+        max_k = self.sp_explore_depth.value()
+
+        def bounded(st):
+            win, lose = solver.position_depths(st, max_k)
+            return ("win", win) if win is not None else ("lose", lose) if lose is not None else (None, None)
+
+        self._show_explorer(solver, S, bounded)
+
+    def _start_outcome_worker(self, S: int):
+        """Точный режим: весь граф от старта строится в потоке на отдельном решателе, дерево — по готовности."""
+        if self._busy:
+            QtWidgets.QMessageBox.information(self, "Дерево игры", "Дождитесь окончания текущего расчёта.")
+            return
+        try:
+            solver = EGESolver(self._collect_rules(), self._collect_start_template(), S, S)
+        except ValueError as e:
+            QtWidgets.QMessageBox.warning(self, "Дерево игры", str(e))
+            return
+        self._set_busy(True, "Граф позиций: подготовка...")
+        self.worker_thread = QtCore.QThread(self)
+        self.worker = OutcomeWorker(solver, S)
+        self.worker.moveToThread(self.worker_thread)
+
+        self.worker.started.connect(lambda: self._set_busy(True, f"Строим граф позиций от S={S}..."))
+        self.worker.finished.connect(self._on_outcome_finished)
+        self.worker.error.connect(self._on_error)
+        self.worker_thread.started.connect(self.worker.run)
+
+        self.worker.finished.connect(self.worker_thread.quit)
+        self.worker.error.connect(self.worker_thread.quit)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.worker_thread.finished.connect(self.worker_thread.deleteLater)
+
+        self.worker_thread.start()
+
+    def _on_outcome_finished(self, solver: EGESolver, table, dt: float):
+        self._set_busy(False)
+        S = solver.s_min
+        counts = table.counts()
+        self.statusBar().showMessage(
+            f"Граф от S={S} за {dt:.3f} сек: позиций {len(table)}, выигрышных {counts['win']}, "
+            f"проигрышных {counts['lose']}, ничьих {counts['draw']}", 10000)
+        self._show_explorer(solver, S, solver.outcome)
+
+    def _show_explorer(self, solver: EGESolver, S: int, evaluate):
+        model = GameTreeModel(
+            tuple(S if x is None else x for x in solver.start_tmpl),
+            iter_moves=solver.game.iter_moves,
+            is_terminal=solver.game.is_terminal,
+            describe_move=solver.describe_move,
+            evaluate=evaluate,
+            parent=self,
+        )
+        self.tree_explorer.setModel(model)
+        self.tree_explorer.expand(model.index(0, 0))
+        self.tree_explorer.resizeColumnToContents(0)
+
+    def _close_explorer(self):
+        """Дерево держит решатель сессии — перед новым расчётом (он идёт в другом потоке) его убираем."""
+        model = self.tree_explorer.model()
+        if model is not None:
+            self.tree_explorer.setModel(None)
+            model.deleteLater()
+
+    # ---------- Сетка 2D ----------
+    def on_grid_calc(self):
+        try:
+            rules = self._collect_rules()
+            if rules.heaps != 2:
+                raise ValueError("Сетка 2D — для игры с двумя кучами.")
+        except ValueError as e:
+            QtWidgets.QMessageBox.warning(self, "Сетка 2D", str(e))
+            return
+        a0, a1, b0, b1 = (sp.value() for sp in self.sp_grid)
+        self._set_busy(True, "Сетка: подготовка...")
+        self.worker_thread = QtCore.QThread(self)
+        self.worker = GridWorker(rules, (a0, a1), (b0, b1), self.cb_grid_method.currentText())
+        self.worker.moveToThread(self.worker_thread)
+
+        self.worker.started.connect(lambda: self._set_busy(True, "Считаем сетку..."))
+        self.worker.progress.connect(self._on_progress)
+        self.worker.finished.connect(self._on_grid_finished)
+        self.worker.error.connect(self._on_error)
+        self.worker_thread.started.connect(self.worker.run)
+
+        self.worker.finished.connect(self.worker_thread.quit)
+        self.worker.error.connect(self.worker_thread.quit)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.worker_thread.finished.connect(self.worker_thread.deleteLater)
+
+        self.worker_thread.start()
+
+    def _grid_task(self) -> Optional[int]:
+        txt = self.cb_grid_task.currentText()
+        return int(txt) if txt.isdigit() else None
+
+    def _on_grid_finished(self, grid: HeapGrid, dt: float):
+        self._set_busy(False)
+        self._grid = grid
+        self.heatmap.set_grid(grid, self._grid_task())
+        counts = grid.counts()
+        rows, cols = grid.shape
+        self.statusBar().showMessage(
+            f"Сетка {rows}×{cols} готова за {dt:.3f} сек. Стартов: 19={counts['19']}, 20={counts['20']}, "
+            f"21={counts['21']}", 15000)
+
+    def _on_grid_task_change(self, _txt: str):
+        self.heatmap.set_task(self._grid_task())
+
+    def save_grid(self):
+        if self._grid is None:
+            QtWidgets.QMessageBox.information(self, "Сетка 2D", "Сначала рассчитайте сетку.")
+            return
+        fname, selected = QtWidgets.QFileDialog.getSaveFileName(self, "Сохранить сетку", "grid.npz",
+                                                                "NumPy (*.npz);;CSV (*.csv)")
+        if not fname:
+            return
+        fname = with_filter_ext(fname, selected)
+        try:
+            self._grid.save(fname)
+        except (OSError, ValueError, RuntimeError) as e:
+            QtWidgets.QMessageBox.critical(self, "Сетка 2D", str(e))
+            return
+        self.statusBar().showMessage(f"Сетка сохранена: {fname}", 5000)
+
     # ---------- Тема ----------
     def _on_theme_change(self, name: str):
         self._apply_theme(name)
@@ -875,6 +1369,9 @@ class MainWindow(QtWidgets.QMainWindow):
         self.sp_fixed.setValue(int(s.value("fixed", 5)))
         self.sp_smin.setValue(int(s.value("smin", 1)))
         self.sp_smax.setValue(int(s.value("smax", 130)))
+        self.cb_method.setCurrentText(s.value("method", "recursive"))
+        self.sp_workers.setValue(int(s.value("workers", 1)))
+        self.chk_cache.setChecked(str(s.value("use_cache", "true")).lower() == "true")
 
     def _safe_set_list(self, editor: IntListEditor, raw: object):
         try:
@@ -896,4 +1393,7 @@ class MainWindow(QtWidgets.QMainWindow):
         s.setValue("fixed", self.sp_fixed.value())
         s.setValue("smin", self.sp_smin.value())
         s.setValue("smax", self.sp_smax.value())
+        s.setValue("method", self.cb_method.currentText())
+        s.setValue("workers", self.sp_workers.value())
+        s.setValue("use_cache", self.chk_cache.isChecked())
         s.setValue("theme", self.cb_theme.currentText())
@@ -0,0 +1,107 @@
+from typing import Dict, Optional, Tuple
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+from core.grid import HeapGrid, TASK_BITS
+
+# Цвета ячеек в режиме «все задания»: по маске битов TASK_19 | TASK_20 | TASK_21
+MASK_COLORS: Dict[int, Tuple[int, int, int]] = {
+    0: (235, 235, 235),
+    1: (66, 133, 244),    # 19
+    2: (52, 168, 83),     # 20
+    3: (0, 150, 160),     # 19 и 20
+    4: (234, 67, 53),     # 21
+    5: (150, 80, 200),    # 19 и 21
+    6: (240, 160, 30),    # 20 и 21
+    7: (60, 60, 60),      # все три
+}
+ON_COLOR = (52, 120, 200)
+OFF_COLOR = (235, 235, 235)
+
+
+class HeatmapWidget(QtWidgets.QWidget):
+    """
+    Теплокарта HeapGrid: строки — первая куча (сверху вниз), столбцы — вторая.
+    task = 19/20/21 — закрашены подходящие старты; task = None — цвет по сочетанию заданий (MASK_COLORS).
+    Картинка строится один раз на сетку и режим и масштабируется при отрисовке; подсказка — старт под курсором.
+    """
+
+    MARGIN = 36
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMouseTracking(True)
+        self.setMinimumSize(240, 240)
+        self._grid: Optional[HeapGrid] = None
+        self._task: Optional[int] = None
+        self._image: Optional[QtGui.QImage] = None
+
+    def set_grid(self, grid: Optional[HeapGrid], task: Optional[int] = None):
+        self._grid = grid
+        self._task = task
+        self._image = self._build_image() if grid is not None else None
+        self.update()
+
+    def set_task(self, task: Optional[int]):
+        self.set_grid(self._grid, task)
+
+    def _build_image(self) -> QtGui.QImage:
+        grid = self._grid
+        h, w = grid.shape
+        if self._task is None:
+            palette = [bytes((b, g, r, 255)) for r, g, b in (MASK_COLORS[m] for m in range(8))]
+        else:
+            bit = TASK_BITS[self._task]
+            on = bytes((ON_COLOR[2], ON_COLOR[1], ON_COLOR[0], 255))
+            off = bytes((OFF_COLOR[2], OFF_COLOR[1], OFF_COLOR[0], 255))
+            palette = [on if m & bit else off for m in range(8)]
+        self._pixels = b"".join(palette[m] for m in grid.masks)  # буфер должен жить, пока жива картинка
+        return QtGui.QImage(self._pixels, w, h, 4 * w, QtGui.QImage.Format.Format_ARGB32)
+
+    def _plot_rect(self) -> QtCore.QRectF:
+        m = self.MARGIN
+        return QtCore.QRectF(m, m / 2, max(1, self.width() - m * 1.5), max(1, self.height() - m * 1.5))
+
+    def _cell_at(self, pos: QtCore.QPointF) -> Optional[Tuple[int, int]]:
+        if self._grid is None:
+            return None
+        rect = self._plot_rect()
+        if not rect.contains(pos):
+            return None
+        h, w = self._grid.shape
+        i = min(h - 1, int((pos.y() - rect.top()) / rect.height() * h))
+        j = min(w - 1, int((pos.x() - rect.left()) / rect.width() * w))
+        return self._grid.rows[0] + i, self._grid.cols[0] + j
+
+    def paintEvent(self, event: QtGui.QPaintEvent):
+        p = QtGui.QPainter(self)
+        if self._image is None:
+            p.drawText(self.rect(), QtCore.Qt.AlignmentFlag.AlignCenter, "Рассчитайте сетку")
+            return
+        rect = self._plot_rect()
+        p.setRenderHint(QtGui.QPainter.RenderHint.SmoothPixmapTransform, False)
+        p.drawImage(rect, self._image)
+        p.setPen(self.palette().color(QtGui.QPalette.ColorRole.WindowText))
+        p.drawRect(rect)
+        g = self._grid
+        fm = p.fontMetrics()
+        p.drawText(QtCore.QPointF(rect.left(), rect.bottom() + fm.height()), str(g.cols[0]))
+        right = str(g.cols[1])
+        p.drawText(QtCore.QPointF(rect.right() - fm.horizontalAdvance(right), rect.bottom() + fm.height()), right)
+        p.drawText(QtCore.QRectF(0, rect.top(), self.MARGIN - 4, fm.height()),
+                   QtCore.Qt.AlignmentFlag.AlignRight, str(g.rows[0]))
+        p.drawText(QtCore.QRectF(0, rect.bottom() - fm.height(), self.MARGIN - 4, fm.height()),
+                   QtCore.Qt.AlignmentFlag.AlignRight, str(g.rows[1]))
+        p.drawText(QtCore.QRectF(rect.left(), rect.bottom() + 2, rect.width(), fm.height()),
+                   QtCore.Qt.AlignmentFlag.AlignHCenter, "вторая куча →")
+
+    def mouseMoveEvent(self, event: QtGui.QMouseEvent):
+        cell = self._cell_at(event.position())
+        if cell is None:
+            QtWidgets.QToolTip.hideText()
+            return
+        a, b = cell
+        mask = self._grid.mask(a, b)
+        tasks = [str(t) for t, bit in TASK_BITS.items() if mask & bit]
+        QtWidgets.QToolTip.showText(event.globalPosition().toPoint(),
+                                    f"({a}, {b}): {', '.join(tasks) if tasks else 'нет заданий'}", self)
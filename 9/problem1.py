@@ -1,16 +1,19 @@
 import sys
 import json
-import itertools
+import time
+from contextlib import contextmanager
+from bisect import bisect_left
 from heapq import heappush, heappop
 
-from PySide6.QtCore import Qt, QRectF, QLineF, QPointF, Signal, QObject
+from PySide6.QtCore import (Qt, QRectF, QLineF, QPointF, Signal, QObject, QRunnable, QThreadPool, QTimer,
+                            QAbstractTableModel, QModelIndex)
 from PySide6.QtGui import QPen, QBrush, QColor, QPainterPathStroker, QAction, QFont, QPainter, QPalette
 from PySide6.QtWidgets import (QApplication, QGraphicsView, QGraphicsScene,
                                QGraphicsItem, QGraphicsEllipseItem, QGraphicsLineItem, 
                                QGraphicsTextItem, QMainWindow, QWidget, QHBoxLayout, 
-                               QVBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView,
+                               QVBoxLayout, QTableView, QHeaderView,
                                QFileDialog, QMessageBox, QLabel, QPushButton, 
-                               QInputDialog, QGroupBox, QComboBox)
+                               QInputDialog, QGroupBox, QComboBox, QProgressBar, QDoubleSpinBox)
 
 VISUALS = {
     'bg': "#2b2b2b",
@@ -26,21 +29,140 @@ VISUALS = {
     'radius': 18
 }
 
-class SolverEngine:
+# How many search steps pass between cancel/time-budget checks and progress reports
+SEARCH_TICK = 1024
+# How often the window polls a running search (ms)
+SOLVE_POLL_MS = 50
+
+
+class SearchStopped(Exception):
+    pass
+
+class GraphModel:
+    # Plain-Python mirror of the scene: vertices in sorted uid order, uid -> index,
+    # raw edge labels (as typed) and numeric weights (as used by the solvers)
+    def __init__(self):
+        self.order = []
+        self.index = {}
+        self.labels = {}
+        self.weights = {}
+        self._observers = []
+        self._batch = 0
+        self._unsorted = False
+
+    def subscribe(self, observer):
+        # observer gets vertex_inserted(i, uid), vertex_removed(i, uid), edge_changed(i, j) and graph_reset()
+        self._observers.append(observer)
+
+    def begin_batch(self):
+        # Inside a batch vertices are appended unsorted and observers stay silent;
+        # end_batch sorts once, rebuilds indexes and sends a single graph_reset
+        self._batch += 1
+
+    def end_batch(self):
+        self._batch -= 1
+        if self._batch: return
+        if self._unsorted:
+            self.order.sort()
+            self._reindex(0)
+            self._unsorted = False
+        self._notify("graph_reset")
+
+    def _notify(self, event, *args):
+        if self._batch: return
+        for o in self._observers:
+            getattr(o, event)(*args)
+
     @staticmethod
-    def get_isomorphism(scene_nodes, table_data):
-        nodes_sorted = sorted(scene_nodes, key=lambda x: x.uid)
-        
-        g_map = {n.uid: {} for n in nodes_sorted}
-        for n in nodes_sorted:
-            for link in n.links:
-                target = link.end if link.start == n else link.start
-                try:
-                    w = int(link.val) if link.val.isdigit() else 1
-                except:
-                    w = 1
-                g_map[n.uid][target.uid] = w
+    def parse_weight(val):
+        return int(val) if val.isdigit() else 1
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, uid):
+        return uid in self.index
+
+    def clear(self):
+        self.order.clear()
+        self.index.clear()
+        self.labels.clear()
+        self.weights.clear()
+        self._notify("graph_reset")
+
+    def _reindex(self, start):
+        for i in range(start, len(self.order)):
+            self.index[self.order[i]] = i
+
+    def add_vertex(self, uid):
+        if uid in self.index:
+            raise ValueError(f"Vertex {uid} already exists")
+        if self._batch:
+            i = len(self.order)
+            self.order.append(uid)
+            self.index[uid] = i
+            self._unsorted = True
+        else:
+            i = bisect_left(self.order, uid)
+            self.order.insert(i, uid)
+            self._reindex(i)
+        self.labels[uid] = {}
+        self.weights[uid] = {}
+        self._notify("vertex_inserted", i, uid)
+        return i
+
+    def remove_vertex(self, uid):
+        i = self.index.pop(uid)
+        del self.order[i]
+        self._reindex(i)
+        for t in self.labels.pop(uid):
+            del self.labels[t][uid]
+            del self.weights[t][uid]
+        del self.weights[uid]
+        self._notify("vertex_removed", i, uid)
+        return i
+
+    def set_edge(self, u, v, val):
+        w = self.parse_weight(val)
+        self.labels[u][v] = self.labels[v][u] = val
+        self.weights[u][v] = self.weights[v][u] = w
+        if not self._batch:
+            self._notify("edge_changed", self.index[u], self.index[v])
+
+    def remove_edge(self, u, v):
+        if v not in self.labels[u]: return
+        for a, b in ((u, v), (v, u)):
+            del self.labels[a][b]
+            del self.weights[a][b]
+        self._notify("edge_changed", self.index[u], self.index[v])
+
+    def index_of(self, uid):
+        return self.index.get(uid)
+
+    def uid_at(self, i):
+        return self.order[i]
+
+    def value(self, u, v):
+        return self.labels[u].get(v, "")
+
+    def has_edge(self, u, v):
+        return v in self.labels[u]
+
+    def edges(self):
+        # Each edge once, as (u, v, label) with index[u] < index[v]
+        for u in self.order:
+            iu = self.index[u]
+            for v, val in self.labels[u].items():
+                if self.index[v] > iu:
+                    yield u, v, val
+
+    def adjacency(self):
+        return {u: dict(self.weights[u]) for u in self.order}
+
 
+class SolverEngine:
+    @staticmethod
+    def matrix_adjacency(table_data, weighted=True):
         dim = len(table_data)
         m_map = {i: {} for i in range(dim)}
         for r in range(dim):
@@ -48,86 +170,172 @@ class SolverEngine:
                 raw = table_data[r][c]
                 if raw and raw.isdigit():
                     val = int(raw)
-                    if val > 0: m_map[r][c] = val
-
-        graph_weighted = any(any(w > 1 for w in adj.values()) for adj in g_map.values())
-        if not graph_weighted:
-            for r in m_map:
-                for c in m_map[r]: m_map[r][c] = 1
-
-        g_degs = {k: len(v) for k, v in g_map.items()}
-        m_degs = {k: len(v) for k, v in m_map.items()}
+                    if val > 0: m_map[r][c] = val if weighted else 1
+        return m_map
 
-        if sorted(g_degs.values()) != sorted(m_degs.values()):
-            return None
-        
-        g_names = list(g_map.keys())
-        m_idxs = list(m_map.keys())
+    @staticmethod
+    def refine_colors(g_map, m_map):
+        # Weisfeiler-Lehman colour refinement run on both graphs with a shared palette,
+        # so equal colours mean "indistinguishable so far" across the two graphs
+        keys = [('g', k) for k in g_map] + [('m', k) for k in m_map]
+        adj = {('g', k): v for k, v in g_map.items()}
+        adj.update({('m', k): v for k, v in m_map.items()})
+
+        def relabel(signatures):
+            palette = {s: i for i, s in enumerate(sorted(set(signatures.values())))}
+            return {k: palette[s] for k, s in signatures.items()}
+
+        colors = relabel({k: (len(adj[k]), tuple(sorted(adj[k].values()))) for k in keys})
+        n_classes = len(set(colors.values()))
+        while True:
+            colors = relabel({
+                k: (colors[k], tuple(sorted((colors[(k[0], t)], w) for t, w in adj[k].items())))
+                for k in keys
+            })
+            n_new = len(set(colors.values()))
+            if n_new == n_classes:
+                break
+            n_classes = n_new
+
+        g_col = {k: colors[('g', k)] for k in g_map}
+        m_col = {k: colors[('m', k)] for k in m_map}
+        return g_col, m_col
 
-        if len(g_names) != len(m_idxs):
-            return None
+    @staticmethod
+    def component_sizes(adj):
+        seen = set()
+        sizes = []
+        for start in adj:
+            if start in seen: continue
+            seen.add(start)
+            stack = [start]
+            size = 0
+            while stack:
+                u = stack.pop()
+                size += 1
+                for t in adj[u]:
+                    if t not in seen:
+                        seen.add(t)
+                        stack.append(t)
+            sizes.append(size)
+        return sorted(sizes)
 
-        g_groups = {}
-        for k, d in g_degs.items():
-            g_groups.setdefault(d, []).append(k)
-        
-        m_groups = {}
-        for k, d in m_degs.items():
-            m_groups.setdefault(d, []).append(k)
+    @staticmethod
+    def iter_isomorphisms(g_map, m_map, tick=None):
+        # Lazily yields every mapping g-vertex -> m-vertex that preserves adjacency and weights;
+        # tick(steps) is called every SEARCH_TICK search steps and may raise SearchStopped
+        if len(g_map) != len(m_map):
+            return
+        g_col, m_col = SolverEngine.refine_colors(g_map, m_map)
+        if sorted(g_col.values()) != sorted(m_col.values()):
+            return
+        if SolverEngine.component_sizes(g_map) != SolverEngine.component_sizes(m_map):
+            return
 
-        for d in g_groups:
-            if d not in m_groups or len(g_groups[d]) != len(m_groups[d]):
-                return None
-        
-        ordered_degrees = sorted(g_groups.keys())
-        clusters = [(g_groups[d], m_groups[d]) for d in ordered_degrees]
+        m_by_color = {}
+        for k, c in m_col.items():
+            m_by_color.setdefault(c, []).append(k)
+        class_size = {c: len(v) for c, v in m_by_color.items()}
+
+        # Matching order: start from the rarest colour, then always take the vertex
+        # with most already-ordered neighbours, so constraints bite as early as possible
+        order = []
+        placed = set()
+        links_to_placed = {k: 0 for k in g_map}
+        while len(order) < len(g_map):
+            u = min((k for k in g_map if k not in placed),
+                    key=lambda k: (-links_to_placed[k], class_size[g_col[k]], -len(g_map[k]), str(k)))
+            order.append(u)
+            placed.add(u)
+            for t in g_map[u]:
+                links_to_placed[t] += 1
+
+        # For each step: neighbours of order[i] that were mapped earlier, with edge weights
+        back_edges = []
+        pos = {u: i for i, u in enumerate(order)}
+        for i, u in enumerate(order):
+            back_edges.append([(t, w) for t, w in g_map[u].items() if pos[t] < i])
+
+        mapping = {}
+        used = set()
+        steps = [0]
+
+        def feasible(u, cand, back):
+            m_adj = m_map[cand]
+            for t, w in back:
+                if m_adj.get(mapping[t]) != w:
+                    return False
+            # No extra edges: cand must not touch more mapped vertices than u does
+            return sum(1 for t in m_adj if t in used) == len(back)
+
+        def candidates(i):
+            # As in VF2: a vertex with a mapped neighbour can only go next to that neighbour's image;
+            # only the first vertex of each component is tried against its whole colour class
+            u = order[i]
+            back = back_edges[i]
+            color = g_col[u]
+            if back:
+                pool = m_map[mapping[back[0][0]]]
+                return [c for c in pool if c not in used and m_col[c] == color]
+            return [c for c in m_by_color[color] if c not in used]
+
+        n = len(order)
+        if n == 0:
+            yield {}
+            return
+        # Iterative depth-first search: stack[i] holds the untried candidates for order[i]
+        stack = [iter(candidates(0))]
+        while stack:
+            i = len(stack) - 1
+            u = order[i]
+            if u in mapping:
+                used.discard(mapping.pop(u))
+            for cand in stack[i]:
+                steps[0] += 1
+                if tick and steps[0] % SEARCH_TICK == 0:
+                    tick(steps[0])
+                if feasible(u, cand, back_edges[i]):
+                    break
+            else:
+                stack.pop()
+                continue
+            mapping[u] = cand
+            used.add(cand)
+            if i + 1 == n:
+                yield dict(mapping)
+            else:
+                stack.append(iter(candidates(i + 1)))
 
-        def backtrack(cluster_idx, mapping):
-            if cluster_idx == len(clusters):
-                return validate(mapping)
-            
-            vars_g, vars_m = clusters[cluster_idx]
-            for perm in itertools.permutations(vars_m):
-                temp_map = mapping.copy()
-                for i, g_node in enumerate(vars_g):
-                    temp_map[g_node] = perm[i]
-                
-                if backtrack(cluster_idx + 1, temp_map):
-                    return temp_map
-            return None
+    @staticmethod
+    def prepare_isomorphism(graph, table_data):
+        # Plain-data snapshot of both graphs, safe to hand over to a worker thread
+        g_map = graph.adjacency()
+        graph_weighted = any(any(w > 1 for w in adj.values()) for adj in g_map.values())
+        m_map = SolverEngine.matrix_adjacency(table_data, graph_weighted)
+        return g_map, m_map
 
-        def validate(mapping):
-            for u, neighbors in g_map.items():
-                u_mapped = mapping[u]
-                for v, w in neighbors.items():
-                    v_mapped = mapping[v]
-                    if v_mapped not in m_map[u_mapped]:
-                        return False
-                    if w != m_map[u_mapped][v_mapped]:
-                        return False
-            return True
-
-        res = backtrack(0, {})
+    @staticmethod
+    def first_isomorphism(g_map, m_map, tick=None):
+        res = next(SolverEngine.iter_isomorphisms(g_map, m_map, tick), None)
         return {k: v + 1 for k, v in res.items()} if res else None
 
     @staticmethod
-    def dijkstra(nodes, start, end):
-        adj = {n: {} for n in nodes}
-        for n in nodes:
-            for link in n.links:
-                target = link.end if link.start == n else link.start
-                w = int(link.val) if link.val.isdigit() else 1
-                old_w = adj[n].get(target, float('inf'))
-                adj[n][target] = min(old_w, w)
-        
-        min_dist = {n: float('inf') for n in nodes}
+    def get_isomorphism(graph, table_data):
+        g_map, m_map = SolverEngine.prepare_isomorphism(graph, table_data)
+        return SolverEngine.first_isomorphism(g_map, m_map)
+
+    @staticmethod
+    def dijkstra(graph, start, end):
+        adj = graph.weights
+        
+        min_dist = {n: float('inf') for n in graph.order}
         min_dist[start] = 0
-        prev = {n: None for n in nodes}
+        prev = {n: None for n in graph.order}
         
-        queue = [(0, id(start), start)]
+        queue = [(0, start)]
 
         while queue:
-            d, _, curr = heappop(queue)
+            d, curr = heappop(queue)
             if d > min_dist[curr]: continue
             if curr == end: break
 
@@ -136,7 +344,7 @@ class SolverEngine:
                 if new_dist < min_dist[neighbor]:
                     min_dist[neighbor] = new_dist
                     prev[neighbor] = curr
-                    heappush(queue, (new_dist, id(neighbor), neighbor))
+                    heappush(queue, (new_dist, neighbor))
 
         if min_dist[end] == float('inf'):
             return None
@@ -149,6 +357,82 @@ class SolverEngine:
         return path[::-1]
 
 
+class SolveTask(QRunnable):
+    # Runs in the thread pool and only writes plain attributes;
+    # SolveWatcher turns them into signals on the GUI thread
+    def __init__(self, g_map, m_map, budget=None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self._g_map = g_map
+        self._m_map = m_map
+        self._budget = budget
+        self._deadline = None
+        self._cancelled = False
+        self.steps = 0
+        self.result = None
+        self.message = ""
+        self.state = "running"
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def _tick(self, steps):
+        self.steps = steps
+        if self._cancelled:
+            raise SearchStopped("cancelled")
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            raise SearchStopped("timeout")
+
+    def run(self):
+        self._deadline = time.monotonic() + self._budget if self._budget else None
+        try:
+            self.result = SolverEngine.first_isomorphism(self._g_map, self._m_map, self._tick)
+        except SearchStopped as e:
+            self.message = str(e)
+            self.state = "stopped"
+            return
+        except Exception as e:
+            self.message = str(e)
+            self.state = "failed"
+            return
+        self.state = "done"
+
+
+class SolveWatcher(QObject):
+    progress = Signal(int)
+    finished = Signal(object)
+    stopped = Signal(str)
+    failed = Signal(str)
+
+    def __init__(self, task, parent=None):
+        super().__init__(parent)
+        self.task = task
+        self._timer = QTimer(self)
+        self._timer.setInterval(SOLVE_POLL_MS)
+        self._timer.timeout.connect(self._poll)
+
+    def start(self, pool):
+        pool.start(self.task)
+        self._timer.start()
+
+    def _poll(self):
+        t = self.task
+        if t.state == "running":
+            self.progress.emit(t.steps)
+            return
+        self._timer.stop()
+        if t.state == "done":
+            self.finished.emit(t.result)
+        elif t.state == "stopped":
+            self.stopped.emit(t.message)
+        else:
+            self.failed.emit(t.message)
+
+
 class Link(QGraphicsLineItem):
     def __init__(self, n1, n2, val="", scene_ref=None):
         super().__init__()
@@ -173,7 +457,8 @@ class Link(QGraphicsLineItem):
         self.lbl.setDefaultTextColor(QColor(VISUALS['text_weight']))
         self.lbl.setFont(QFont("Segoe UI", 11, QFont.Bold))
         
-        self.sync_pos()
+        if not (scene_ref and scene_ref.in_batch):
+            self.sync_pos()
 
     def sync_pos(self):
         p1 = self.start.scenePos()
@@ -260,7 +545,7 @@ class Vertex(QGraphicsEllipseItem):
         self.sol_txt.setPlainText(f"[{val}]" if val else "")
 
     def itemChange(self, change, val):
-        if change == QGraphicsItem.ItemPositionHasChanged and self.scene():
+        if change == QGraphicsItem.ItemPositionHasChanged and self.scene() and not self.scene().in_batch:
             for l in self.links: l.sync_pos()
         return super().itemChange(change, val)
 
@@ -277,40 +562,81 @@ class EditorScene(QGraphicsScene):
         self._name_counter = 0
         self._link_source = None
         self._block_signals = False
+        
+        self.graph = GraphModel()
+        self._vertices = {}
+        self._links = {}
+        self._batch_depth = 0
+        self._batch_blocked = False
+
+    @property
+    def in_batch(self):
+        return self._batch_depth > 0
+
+    @contextmanager
+    def batch_update(self):
+        # Bulk edits: no per-item signals or link geometry syncs, the graph index is
+        # rebuilt once, and a single structure_changed is emitted at the end
+        if not self._batch_depth:
+            self._batch_blocked = self._block_signals
+            self._block_signals = True
+        self._batch_depth += 1
+        self.graph.begin_batch()
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            self.graph.end_batch()
+            if not self._batch_depth:
+                for l in self._links.values(): l.sync_pos()
+                self._block_signals = self._batch_blocked
+                if not self._block_signals:
+                    self.structure_changed.emit()
 
     def get_vertex_list(self):
-        items = [i for i in self.items() if isinstance(i, Vertex)]
-        return sorted(items, key=lambda x: x.uid)
+        return [self._vertices[uid] for uid in self.graph.order]
+
+    def vertex(self, uid):
+        return self._vertices.get(uid)
+
+    def link_between(self, u_uid, v_uid):
+        return self._links.get(frozenset((u_uid, v_uid)))
 
     def _next_name(self):
-        n = self._name_counter
-        res = ""
-        while n >= 0:
-            res = chr(ord('A') + (n % 26)) + res
-            n = n // 26 - 1
-        self._name_counter += 1
-        return res
+        while True:
+            n = self._name_counter
+            res = ""
+            while n >= 0:
+                res = chr(ord('A') + (n % 26)) + res
+                n = n // 26 - 1
+            self._name_counter += 1
+            if res not in self.graph: return res
 
     def add_vertex(self, pos, name=None):
         if not name: name = self._next_name()
+        if name in self.graph: return self._vertices[name]
         v = Vertex(name, pos.x(), pos.y())
         self.addItem(v)
+        self.graph.add_vertex(name)
+        self._vertices[name] = v
         if not self._block_signals:
             self.structure_changed.emit()
         return v
 
     def add_link(self, v1, v2, w=""):
         if v1 == v2: return
-        for l in v1.links:
-            if (l.start == v1 and l.end == v2) or (l.start == v2 and l.end == v1):
-                if l.val != w:
-                    l.update_val(w)
-                return
+        l = self.link_between(v1.uid, v2.uid)
+        if l:
+            if l.val != w:
+                l.update_val(w)
+            return
         
         lnk = Link(v1, v2, w, scene_ref=self)
         self.addItem(lnk)
         v1.add_link(lnk)
         v2.add_link(lnk)
+        self._links[frozenset((v1.uid, v2.uid))] = lnk
+        self.graph.set_edge(v1.uid, v2.uid, w)
         
         if not self._block_signals:
             self.link_data_changed.emit(v1.uid, v2.uid, w)
@@ -323,6 +649,8 @@ class EditorScene(QGraphicsScene):
             for l in list(item.links): 
                 self.remove_element(l)
             self.removeItem(item)
+            self.graph.remove_vertex(item.uid)
+            del self._vertices[item.uid]
             structure_affected = True
             
         elif isinstance(item, Link):
@@ -330,6 +658,8 @@ class EditorScene(QGraphicsScene):
             item.start.remove_link(item)
             item.end.remove_link(item)
             self.removeItem(item)
+            self._links.pop(frozenset((u, v)), None)
+            self.graph.remove_edge(u, v)
             if not self._block_signals:
                 self.link_data_changed.emit(u, v, "")
             
@@ -340,16 +670,22 @@ class EditorScene(QGraphicsScene):
             self.structure_changed.emit()
 
     def notify_link_changed(self, link):
+        self.graph.set_edge(link.start.uid, link.end.uid, link.val)
         if not self._block_signals:
             self.link_data_changed.emit(link.start.uid, link.end.uid, link.val)
 
     def reset(self):
+        blocked = self._block_signals
         self._block_signals = True
         self.clear()
+        self.graph.clear()
+        self._vertices.clear()
+        self._links.clear()
         self._name_counter = 0
         self._link_source = None
-        self._block_signals = False
-        self.structure_changed.emit()
+        self._block_signals = blocked
+        if not blocked:
+            self.structure_changed.emit()
 
     def keyReleaseEvent(self, e):
         if e.key() == Qt.Key_Shift and self._link_source:
@@ -401,102 +737,105 @@ class EditorScene(QGraphicsScene):
             if target: self.remove_element(target)
 
 
-class MatrixGrid(QTableWidget):
+class AdjacencyTableModel(QAbstractTableModel):
+    # Cells are read straight from GraphModel; the model only reports what changed.
+    # Row/column uids are kept separately so that rows and columns can be announced
+    # one after the other while the graph itself is already updated
+    cell_edited = Signal(int, int, str)
+
+    def __init__(self, graph, parent=None):
+        super().__init__(parent)
+        self._graph = graph
+        self._rows = list(graph.order)
+        self._cols = list(graph.order)
+        self._bg_cell = QColor(VISUALS['table_bg'])
+        self._bg_diag = QColor(VISUALS['dia_bg'])
+        graph.subscribe(self)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._cols)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid(): return None
+        r, c = index.row(), index.column()
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            u, v = self._rows[r], self._cols[c]
+            if u == v: return ""
+            return self._graph.labels.get(u, {}).get(v, "")
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignCenter)
+        if role == Qt.BackgroundRole:
+            return self._bg_diag if r == c else self._bg_cell
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole: return None
+        uids = self._cols if orientation == Qt.Horizontal else self._rows
+        return uids[section] if 0 <= section < len(uids) else None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if index.row() == index.column():
+            return Qt.ItemIsEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid(): return False
+        r, c = index.row(), index.column()
+        if r == c: return False
+        txt = str(value).strip()
+        if txt and not txt.isdigit(): return False
+        if txt != self.data(index): self.cell_edited.emit(r, c, txt)
+        return True
+
+    # --- GraphModel observer ---
+    def vertex_inserted(self, i, uid):
+        self.beginInsertRows(QModelIndex(), i, i)
+        self._rows.insert(i, uid)
+        self.endInsertRows()
+        self.beginInsertColumns(QModelIndex(), i, i)
+        self._cols.insert(i, uid)
+        self.endInsertColumns()
+
+    def vertex_removed(self, i, uid):
+        self.beginRemoveRows(QModelIndex(), i, i)
+        del self._rows[i]
+        self.endRemoveRows()
+        self.beginRemoveColumns(QModelIndex(), i, i)
+        del self._cols[i]
+        self.endRemoveColumns()
+
+    def edge_changed(self, r, c):
+        for a, b in ((r, c), (c, r)):
+            idx = self.index(a, b)
+            self.dataChanged.emit(idx, idx, [Qt.DisplayRole, Qt.EditRole])
+
+    def graph_reset(self):
+        self.beginResetModel()
+        self._rows = list(self._graph.order)
+        self._cols = list(self._graph.order)
+        self.endResetModel()
+
+
+class MatrixGrid(QTableView):
     cell_value_changed = Signal(int, int, str)
 
-    def __init__(self):
+    def __init__(self, graph):
         super().__init__()
         self.setStyleSheet(f"background-color: {VISUALS['table_bg']}; color: white; gridline-color: #666;")
         self.horizontalHeader().setDefaultSectionSize(40)
         self.verticalHeader().setDefaultSectionSize(30)
-        self.itemChanged.connect(self._on_item_changed)
-        self._internal_change = False
-
-    def resize_grid(self, nodes):
-        self._internal_change = True
-        n = len(nodes)
-        
-        self.setRowCount(n)
-        self.setColumnCount(n)
-        
-        labels = [node.uid for node in nodes]
-        self.setHorizontalHeaderLabels(labels)
-        self.setVerticalHeaderLabels(labels)
-
-        for r in range(n):
-            for c in range(n):
-                val = ""
-                u = nodes[r]
-                v = nodes[c]
-                for l in u.links:
-                    if l.end == v or l.start == v:
-                        val = l.val
-                        break
-                
-                it = QTableWidgetItem(val)
-                it.setTextAlignment(Qt.AlignCenter)
-                
-                if r == c:
-                    it.setFlags(Qt.ItemIsEnabled)
-                    it.setBackground(QColor(VISUALS['dia_bg']))
-                else:
-                    it.setBackground(QColor(VISUALS['table_bg']))
-                
-                self.setItem(r, c, it)
-        
-        self._internal_change = False
-
-    def _on_item_changed(self, it):
-        if self._internal_change: return
-        
-        r, c = it.row(), it.column()
-        if r == c: return
-        
-        txt = it.text()
-        if txt and not txt.isdigit():
-            if txt != "":
-                self._internal_change = True
-                it.setText("")
-                self._internal_change = False
-                return
-            
-        self._internal_change = True
-        mirror = self.item(c, r)
-        if mirror: mirror.setText(txt)
-        self._internal_change = False
-        
-        self.cell_value_changed.emit(r, c, txt)
+        self._graph = graph
+        self.setModel(AdjacencyTableModel(graph, self))
+        self.model().cell_edited.connect(self.cell_value_changed)
 
     def get_raw_data(self):
-        rows = self.rowCount()
-        res = []
-        for r in range(rows):
-            row_vals = []
-            for c in range(rows):
-                it = self.item(r, c)
-                row_vals.append(it.text() if it else "")
-            res.append(row_vals)
-        return res
-    
-    def update_cell_from_graph(self, r, c, val):
-        if r >= self.rowCount() or c >= self.columnCount(): return
-        
-        self._internal_change = True
-        it1 = self.item(r, c)
-        it2 = self.item(c, r)
-        if it1: it1.setText(val)
-        if it2: it2.setText(val)
-        self._internal_change = False
-
-    def load_matrix(self, data):
-        self._internal_change = True
-        for r in range(len(data)):
-            for c in range(len(data)):
-                if r < self.rowCount() and c < self.columnCount():
-                    val = data[r][c]
-                    it = self.item(r, c)
-                    if it: it.setText(val)
-        self._internal_change = False
+        graph = self._graph
+        return [[graph.value(u, v) if u != v else "" for v in graph.order] for u in graph.order]
 
 
 class AppWindow(QMainWindow):
@@ -510,48 +849,31 @@ class AppWindow(QMainWindow):
         self.view.setRenderHint(QPainter.Antialiasing)
         self.view.setDragMode(QGraphicsView.ScrollHandDrag)
         
-        self.grid = MatrixGrid()
+        self.grid = MatrixGrid(self.scene.graph)
         
-        self.scene.structure_changed.connect(self._sync_graph_to_matrix_structure)
-        self.scene.link_data_changed.connect(self._sync_graph_to_matrix_data)
+        self.scene.structure_changed.connect(self._refresh_combos)
         self.grid.cell_value_changed.connect(self._sync_matrix_to_graph)
         
+        self._pool = QThreadPool.globalInstance()
+        self._task = None
+        self._watcher = None
+        
         self._build_ui()
         self._build_menu()
 
-    def _sync_graph_to_matrix_structure(self):
-        nodes = self.scene.get_vertex_list()
-        self.grid.resize_grid(nodes)
-        self._refresh_combos()
-
-    def _sync_graph_to_matrix_data(self, u_uid, v_uid, val):
-        nodes = self.scene.get_vertex_list()
-        try:
-            r = next(i for i, n in enumerate(nodes) if n.uid == u_uid)
-            c = next(i for i, n in enumerate(nodes) if n.uid == v_uid)
-            self.grid.update_cell_from_graph(r, c, val)
-        except StopIteration:
-            pass
-
     def _sync_matrix_to_graph(self, r, c, val):
-        nodes = self.scene.get_vertex_list()
-        if r < len(nodes) and c < len(nodes):
-            u = nodes[r]
-            v = nodes[c]
+        graph = self.scene.graph
+        if r < len(graph) and c < len(graph):
+            u = self.scene.vertex(graph.uid_at(r))
+            v = self.scene.vertex(graph.uid_at(c))
             
             self.scene._block_signals = True
             
-            existing_link = None
-            for l in u.links:
-                if l.end == v or l.start == v:
-                    existing_link = l
-                    break
+            existing_link = self.scene.link_between(u.uid, v.uid)
             
             if val == "":
                 if existing_link:
-                    self.scene.removeItem(existing_link)
-                    u.remove_link(existing_link)
-                    v.remove_link(existing_link)
+                    self.scene.remove_element(existing_link)
             else:
                 if existing_link:
                     existing_link.update_val(val)
@@ -591,10 +913,34 @@ class AppWindow(QMainWindow):
         
         l_ctrl.addSpacing(15)
         
-        btn_run = QPushButton("FIND ISOMORPHISM")
-        btn_run.setStyleSheet("background-color: #27ae60; color: white; padding: 10px; font-weight: bold;")
-        btn_run.clicked.connect(self._run_solver)
-        l_ctrl.addWidget(btn_run)
+        self.btn_run = QPushButton("FIND ISOMORPHISM")
+        self.btn_run.setStyleSheet("background-color: #27ae60; color: white; padding: 10px; font-weight: bold;")
+        self.btn_run.clicked.connect(self._run_solver)
+        l_ctrl.addWidget(self.btn_run)
+        
+        solve_row = QHBoxLayout()
+        self.sp_budget = QDoubleSpinBox()
+        self.sp_budget.setRange(0, 3600)
+        self.sp_budget.setValue(10)
+        self.sp_budget.setSuffix(" s")
+        self.sp_budget.setSpecialValueText("no limit")
+        self.sp_budget.setToolTip("Time budget for the search (0 = no limit)")
+        self.progress = QProgressBar()
+        self.progress.setRange(0, 1)
+        self.progress.setValue(0)
+        self.progress.setTextVisible(False)
+        self.btn_cancel = QPushButton("Cancel")
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self._cancel_solver)
+        solve_row.addWidget(QLabel("Budget:"))
+        solve_row.addWidget(self.sp_budget)
+        solve_row.addWidget(self.progress, 1)
+        solve_row.addWidget(self.btn_cancel)
+        l_ctrl.addLayout(solve_row)
+        
+        self.lbl_status = QLabel("")
+        self.lbl_status.setStyleSheet("color: #95a5a6;")
+        l_ctrl.addWidget(self.lbl_status)
         
         btn_clr_res = QPushButton("Reset Solution Labels")
         btn_clr_res.clicked.connect(self._reset_labels)
@@ -639,7 +985,7 @@ class AppWindow(QMainWindow):
         fm.addAction(a_wipe)
 
     def _refresh_combos(self):
-        nodes = sorted([n.uid for n in self.scene.get_vertex_list()])
+        nodes = list(self.scene.graph.order)
         s_curr = self.cb_start.currentText()
         e_curr = self.cb_end.currentText()
         
@@ -666,41 +1012,87 @@ class AppWindow(QMainWindow):
         
         if s_txt == "-" or e_txt == "-" or s_txt == e_txt: return
         
-        v_list = self.scene.get_vertex_list()
-        start = next((x for x in v_list if x.uid == s_txt), None)
-        end = next((x for x in v_list if x.uid == e_txt), None)
+        graph = self.scene.graph
+        if s_txt not in graph or e_txt not in graph: return
         
-        if not start or not end: return
-        
-        path = SolverEngine.dijkstra(v_list, start, end)
+        path = SolverEngine.dijkstra(graph, s_txt, e_txt)
         if path:
             for i in range(len(path) - 1):
-                u, v = path[i], path[i+1]
-                for l in u.links:
-                    if l.start == v or l.end == v:
-                        l.set_path_style(True)
-                        break
+                l = self.scene.link_between(path[i], path[i+1])
+                if l: l.set_path_style(True)
 
     def _run_solver(self):
-        nodes = self.scene.get_vertex_list()
+        if self._task: return
         data = self.grid.get_raw_data()
         
-        if not nodes:
+        if not self.scene.graph:
             QMessageBox.warning(self, "Warning", "Graph is empty")
             return
 
-        res = SolverEngine.get_isomorphism(nodes, data)
+        g_map, m_map = SolverEngine.prepare_isomorphism(self.scene.graph, data)
+        watcher = SolveWatcher(SolveTask(g_map, m_map, self.sp_budget.value() or None), self)
+        watcher.progress.connect(self._on_solver_progress)
+        watcher.finished.connect(self._on_solver_finished)
+        watcher.stopped.connect(self._on_solver_stopped)
+        watcher.failed.connect(self._on_solver_failed)
+        self._task = watcher.task
+        self._watcher = watcher
+        self._set_solving(True)
+        watcher.start(self._pool)
+
+    def _cancel_solver(self):
+        if self._task:
+            self._task.cancel()
+            self.lbl_status.setText("Cancelling...")
+
+    def _set_solving(self, active):
+        self.btn_run.setEnabled(not active)
+        self.btn_cancel.setEnabled(active)
+        self.sp_budget.setEnabled(not active)
+        self.progress.setRange(0, 0 if active else 1)
+        self.lbl_status.setText("Searching..." if active else "")
+
+    def _finish_solver(self):
+        self._task = None
+        if self._watcher:
+            self._watcher.deleteLater()
+            self._watcher = None
+        self._set_solving(False)
+
+    def _on_solver_progress(self, steps):
+        if steps and not self._task.cancelled:
+            self.lbl_status.setText(f"Searching... {steps} steps")
+
+    def _on_solver_finished(self, res):
+        self._finish_solver()
         if res:
             txt = "Solution Found:\n"
             for k in sorted(res.keys()):
                 val = res[k]
                 txt += f"{k} -> {val}\n"
-                for n in nodes:
-                    if n.uid == k: n.set_result(str(val))
+                n = self.scene.vertex(k)
+                if n: n.set_result(str(val))
             QMessageBox.information(self, "Result", txt)
         else:
             QMessageBox.critical(self, "Fail", "No isomorphism found.")
 
+    def _on_solver_stopped(self, reason):
+        self._finish_solver()
+        if reason == "timeout":
+            QMessageBox.warning(self, "Timeout", "Time budget exceeded, search stopped.")
+        else:
+            self.lbl_status.setText("Search cancelled")
+
+    def _on_solver_failed(self, msg):
+        self._finish_solver()
+        QMessageBox.critical(self, "Error", msg)
+
+    def closeEvent(self, e):
+        if self._task:
+            self._task.cancel()
+            self._pool.waitForDone()
+        super().closeEvent(e)
+
     def _reset_labels(self):
         for n in self.scene.get_vertex_list(): n.set_result(None)
 
@@ -715,22 +1107,11 @@ class AppWindow(QMainWindow):
         path, _ = QFileDialog.getSaveFileName(self, "Save", "", "JSON (*.json)")
         if not path: return
         
+        graph = self.scene.graph
         v_list = self.scene.get_vertex_list()
-        v_map = {v: i for i, v in enumerate(v_list)}
         
         nodes_js = [{"id": i, "name": v.uid, "x": v.x(), "y": v.y()} for i, v in enumerate(v_list)]
-        edges_js = []
-        
-        seen_links = set()
-        for v in v_list:
-            for l in v.links:
-                if l in seen_links: continue
-                seen_links.add(l)
-                edges_js.append({
-                    "u": v_map[l.start],
-                    "v": v_map[l.end],
-                    "w": l.val
-                })
+        edges_js = [{"u": graph.index[u], "v": graph.index[v], "w": val} for u, v, val in graph.edges()]
         
         blob = {
             "graph": {
@@ -752,28 +1133,22 @@ class AppWindow(QMainWindow):
         try:
             with open(path, 'r') as f: blob = json.load(f)
             
-            self.scene._block_signals = True
-            self.scene.reset()
-            self.scene._block_signals = False
-            
-            g = blob.get("graph", {})
-            self.scene._name_counter = g.get("counter", 0)
-            
-            id_to_node = {}
-            for n_obj in g.get("nodes", []):
-                v = self.scene.add_vertex(QPointF(n_obj['x'], n_obj['y']), n_obj['name'])
-                id_to_node[n_obj['id']] = v
-            
-            for e_obj in g.get("edges", []):
-                v1 = id_to_node.get(e_obj['u'])
-                v2 = id_to_node.get(e_obj['v'])
-                if v1 and v2:
-                    self.scene.add_link(v1, v2, e_obj.get('w', ""))
-            
-            if "matrix" in blob:
-                self.grid.load_matrix(blob.get("matrix", []))
-            
-            self._sync_graph_to_matrix_structure()
+            with self.scene.batch_update():
+                self.scene.reset()
+                
+                g = blob.get("graph", {})
+                self.scene._name_counter = g.get("counter", 0)
+                
+                id_to_node = {}
+                for n_obj in g.get("nodes", []):
+                    v = self.scene.add_vertex(QPointF(n_obj['x'], n_obj['y']), n_obj['name'])
+                    id_to_node[n_obj['id']] = v
+                
+                for e_obj in g.get("edges", []):
+                    v1 = id_to_node.get(e_obj['u'])
+                    v2 = id_to_node.get(e_obj['v'])
+                    if v1 and v2:
+                        self.scene.add_link(v1, v2, e_obj.get('w', ""))
             
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))